@@ -0,0 +1,30 @@
+import sys
+import time
+
+from ASVG import *
+
+
+def nested(depth, width=1):
+    a = Axis((100, 100))
+    cur = a
+    for i in range(depth):
+        c = ComposedElement((10, 10), 0, Attrib(opacity=1) if i % 2 else Attrib())
+        for j in range(width):
+            rect(c, 0, j, j, 1, 1)
+        cur.addElement(c, (1, 1))
+        cur = c
+    return a
+
+
+def measure(a):
+    start = time.perf_counter()
+    size = sum(len(l) + 1 for l in a.iterSVG())
+    return size, time.perf_counter() - start
+
+
+print(f"recursion limit: {sys.getrecursionlimit()}")
+print(f"{'depth':>8} {'width':>6} {'bytes':>12} {'time (s)':>10} {'ns/byte':>8}")
+for depth, width in [(500, 1), (1000, 1), (2000, 1), (4000, 1), (8000, 1),
+                     (10, 1000), (10, 10000), (10, 100000)]:
+    size, t = measure(nested(depth, width))
+    print(f"{depth:>8} {width:>6} {size:>12} {t:>10.3f} {t / size * 1e9:>8.2f}")
@@ -0,0 +1,207 @@
+import argparse
+import atexit
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from ASVG import *
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SCENARIOS = {}
+
+
+def scenario(name, n):
+    # A scenario builds its input for size n, and returns the function that
+    # is measured.
+    def register(f):
+        SCENARIOS[name] = (f, n)
+        return f
+    return register
+
+
+def flat(n):
+    a = Axis((1000, 1000))
+    for i in range(n):
+        if i % 2:
+            rect(a, i % 3, i % 1000, i // 1000, 1, 1, fill="red")
+        else:
+            circle(a, i % 3, i % 1000, i // 1000, 0.5, fill="blue", stroke="black")
+    return a
+
+
+def nested(depth, width):
+    a = Axis((100, 100))
+    cur = a
+    for i in range(depth):
+        c = ComposedElement((10, 10), 0, Attrib(opacity=1) if i % 2 else Attrib())
+        for j in range(width):
+            rect(c, 0, j, j, 1, 1)
+        cur.addElement(c, (1, 1))
+        cur = c
+    return a
+
+
+def tree(fanout, depth, leaves):
+    a = Axis((1000, 1000))
+    level = [a]
+    for d in range(depth):
+        nextLevel = []
+        for parent in level:
+            for i in range(fanout):
+                c = ComposedElement((100, 100), d, Attrib(fill="green") if i % 2 else Attrib())
+                for j in range(leaves):
+                    circle(c, 0, j, j, 1)
+                parent.addElement(c, (i * 10, i * 10))
+                nextLevel.append(c)
+        level = nextLevel
+    return a
+
+
+@scenario("rect-create", 100000)
+def rectCreate(n):
+    def run():
+        a = Axis((1000, 1000))
+        for i in range(n):
+            rect(a, 0, i % 1000, i // 1000, 1, 1, fill="red")
+    return run
+
+
+@scenario("circle-create", 100000)
+def circleCreate(n):
+    def run():
+        a = Axis((1000, 1000))
+        for i in range(n):
+            circle(a, 0, i % 1000, i // 1000, 0.5, fill="blue")
+    return run
+
+
+@scenario("serialize-flat", 100000)
+def serializeFlat(n):
+    a = flat(n)
+    return a.makeSVG
+
+
+@scenario("serialize-deep", 2000)
+def serializeDeep(n):
+    a = nested(n, 2)
+    return a.makeSVG
+
+
+@scenario("serialize-tree", 100000)
+def serializeTree(n):
+    # 10 + 100 + 1000 ComposedElements share the n circles.
+    a = tree(10, 3, max(n // 1110, 1))
+    return a.makeSVG
+
+
+@scenario("text-spans", 5000)
+def textSpans(n):
+    def run():
+        a = Axis((1000, 1000))
+        for i in range(n):
+            s = ("Line %d\n" % i + TextSpan("bold\n", font_weight="bold", fill="#00ffff")
+                 + "mid " + TextSpan("small", font_size=8) + "\nend")
+            text(a, 0, s, i % 1000, i // 1000, 12)
+        return a.makeSVG()
+    return run
+
+
+@scenario("polyarrow-graph", 5000)
+def polyArrowGraph(n):
+    def run():
+        a = Axis((1000, 1000))
+        for i in range(n):
+            x, y = i % 100 * 10, i // 100 * 10
+            polyArrow(a, 0, [(x, y), (x + 5, y), (x + 5, y + 8)], stroke="black")
+        return a.makeSVG()
+    return run
+
+
+@scenario("painter-file", 100000)
+def painterFile(n):
+    a = flat(n)
+    fd, file = tempfile.mkstemp(suffix=".svg")
+    os.close(fd)
+    atexit.register(os.remove, file)
+
+    def run():
+        DefaultPainter()(a, file)
+    return run
+
+
+def measure(run, repeat):
+    # The first run is kept apart as the cold time: later runs of the same
+    # scene find the memoized texts, bounds and keys of the first one.
+    times = []
+    for _ in range(max(repeat, 1) + 1):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    run()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return times[0], min(times[1:]), peak
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Time and peak memory of the hot paths.")
+    parser.add_argument("names", nargs="*", help="scenarios to run, all by default")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplies every scene size")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs after the cold one, the best is kept")
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument("--save", action="store_true", help="store the results as the baseline")
+    parser.add_argument("--threshold", type=float, default=1.25,
+                        help="flag time or memory above this ratio to the baseline")
+    args = parser.parse_args(argv)
+
+    names = args.names or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)}")
+
+    baseline = {}
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as fin:
+            stored = json.load(fin)
+        if stored.get("scale") == args.scale:
+            baseline = stored["results"]
+        else:
+            print(f"baseline was measured at scale {stored.get('scale')}, not compared")
+
+    print(f"{'scenario':<18} {'n':>8} {'cold (ms)':>10} {'time (ms)':>10} {'peak (MB)':>10} "
+          f"{'cold':>7} {'time':>7} {'peak':>7}")
+    results = {}
+    regressions = []
+    for name in names:
+        build, n = SCENARIOS[name]
+        n = max(int(n * args.scale), 1)
+        cold, best, peak = measure(build(n), args.repeat)
+        results[name] = {"n": n, "cold": cold, "time": best, "peak": peak}
+        line = f"{name:<18} {n:>8} {cold * 1e3:>10.1f} {best * 1e3:>10.1f} {peak / 2 ** 20:>10.2f}"
+        base = baseline.get(name)
+        if base is not None and base["n"] == n and "cold" in base:
+            coldRatio = cold / base["cold"]
+            timeRatio = best / base["time"]
+            peakRatio = peak / max(base["peak"], 1)
+            line += f" {coldRatio:>6.2f}x {timeRatio:>6.2f}x {peakRatio:>6.2f}x"
+            if max(coldRatio, timeRatio, peakRatio) > args.threshold:
+                line += "  REGRESSION"
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        with open(args.baseline, "w", encoding="utf-8") as fout:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                       "scale": args.scale, "results": results}, fout, indent=2)
+            fout.write("\n")
+        print(f"baseline written to {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
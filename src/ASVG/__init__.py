@@ -1,8 +1,15 @@
-from ASVG.painter import draw
-from ASVG.core import Attrib, Axis, ComposedElement
+from ASVG.painter import draw, BasePainter, DefaultPainter, StreamingPainter
+from ASVG.core import Attrib, Axis, ComposedElement, StyleRef
 from ASVG.basicElements import rect, circle, ellipse, \
-    line, polyline, polygon, path, PathD
+    line, polyline, polygon, path, PathD, Points
 from ASVG.text import text, TextGroup, TextSpan
+from ASVG.batch import rects, circles, ellipses, lines, BatchElement
 
 from ASVG.util import *
-from ASVG.link import arrowTip, arrow, polyArrow
+from ASVG.link import arrowTip, arrow, polyArrow, arrows, arrowMarker
+from ASVG.frames import renderFrames, FrameTiming
+from ASVG.animation import animate
+from ASVG.profiling import Profile
+from ASVG.load import load
+from ASVG.restyle import restyle
+from ASVG.cached import asvgCached, defaultDirectory
@@ -0,0 +1,213 @@
+from typing import Any, List, Optional, Sequence, Tuple
+
+from . import core
+from .batch import BatchElement, asColumn, isColumn
+from .painter import Output, openOutput
+from .serializer import Node, Serializer
+
+
+class Timeline:
+    # Turns per-frame values into SMIL tracks. Only the frames where a value
+    # changes are kept, with their start as keyTimes; discrete tracks hold
+    # each value until the next one.
+    def __init__(self, count: int, duration: float, loop: bool = True):
+        self.count = count
+        self.duration = duration
+        self.loop = loop
+
+    def runs(self, values: Sequence[str]) -> List[Tuple[int, str]]:
+        runs = [(0, values[0])]
+        for i, v in enumerate(values):
+            if v != runs[-1][1]:
+                runs.append((i, v))
+        return runs
+
+    def track(self, name: str, values: Sequence[str]) -> Node:
+        runs = self.runs(values)
+        if not self.loop and len(runs) == 2:
+            start, v = runs[1]
+            return Node("set", core.Attrib(
+                attributeName=name, to=v, begin=self.time(start), fill="freeze"), leaf=True)
+        attrib = core.Attrib(
+            attributeName=name,
+            values=";".join(v for _, v in runs),
+            keyTimes=";".join(self.number(i / self.count) for i, _ in runs),
+            dur=self.time(self.count),
+            calcMode="discrete")
+        if self.loop:
+            attrib.repeatCount = "indefinite"
+        else:
+            attrib.fill = "freeze"
+        return Node("animate", attrib, leaf=True)
+
+    def time(self, frames: int) -> str:
+        return self.number(self.duration * frames / self.count) + "s"
+
+    def number(self, v: float) -> str:
+        s = f"{v:.6f}".rstrip("0").rstrip(".")
+        return s or "0"
+
+
+def batchRows(element: BatchElement) -> List[Node]:
+    columns = [(k, asColumn(v) if isColumn(v) else None, v) for k, v in element.attrib.items()]
+    removed = getattr(element, "_removed", ())
+    rows = []
+    for i in range(element._rowCount()):
+        if i in removed:
+            continue
+        row = core.Attrib()
+        row.update({k: column[i] if column is not None else v for k, column, v in columns})
+        for k in [k for k, v in row.items() if v is None]:
+            row.pop(k)
+        rows.append(Node(element.SVGType, row, leaf=True))
+    return rows
+
+
+class Animator:
+    def __init__(self, serializer: Serializer, timeline: Timeline):
+        self.timeline = timeline
+        # Subtrees are compared by their text; cached fragments make the
+        # text of unchanged elements cheap.
+        self.plain = serializer.variant(cache=True, dedup=False, styles=False, cull=False,
+                                        raster=None)
+
+    def text(self, node: Any) -> str:
+        if isinstance(node, str):
+            return node
+        return "\n".join(self.plain.iterLines(node))
+
+    def variants(self, nodes: Sequence[Any]) -> List[Any]:
+        # Every distinct version of the subtree is written once and shown
+        # only in its frames.
+        versions = {}
+        for i, node in enumerate(nodes):
+            versions.setdefault(self.text(node), (node, []))[1].append(i)
+        groups = []
+        for node, frames in versions.values():
+            shown = [False] * len(nodes)
+            for i in frames:
+                shown[i] = True
+            display = ["inline" if s else "none" for s in shown]
+            groups.append(Node("g", core.Attrib(display=display[0]),
+                               [node, self.timeline.track("display", display)]))
+        return groups
+
+    def open(self, nodes: Sequence[Any]):
+        # Returns (tag, attrib, tracks, children of every frame), or None
+        # when the frames differ in structure.
+        first = nodes[0]
+        if any(isinstance(n, str) for n in nodes):
+            return None
+        if all(isinstance(n, BatchElement) for n in nodes):
+            if any(n.SVGType != first.SVGType for n in nodes):
+                return None
+            children = [batchRows(n) for n in nodes]
+            if any(len(c) != len(children[0]) for c in children):
+                return None
+            return None, None, [], children
+        if any(n.svgOpaque for n in nodes):
+            return None
+        tags = [n.svgTag() for n in nodes]
+        tag = tags[0]
+        if tag is None:
+            if any(t is not None for t in tags):
+                return None
+        elif any(t is None or t[0] != tag[0] or (t[1] is None) != (tag[1] is None)
+                 for t in tags):
+            return None
+        if any(n.svgLeaf != first.svgLeaf for n in nodes):
+            return None
+        tracks = []
+        attrib = None
+        if tag is not None and tag[1] is not None:
+            keys = set(tag[1])
+            if any(set(t[1]) != keys for t in tags):
+                return None
+            attrib = tag[1].copy()
+            value = self.plain.value
+            base = str(tag[1])
+            same = all(str(t[1]) == base for t in tags)
+            for k in () if same else tag[1]:
+                values = [value(k, t[1].get(k)) for t in tags]
+                if all(s == values[0] for s in values):
+                    continue
+                if any(";" in s for s in values):
+                    return None
+                tracks.append((k, values))
+        children = [[] if n.svgLeaf else list(n.svgChildren()) for n in nodes]
+        if any(len(c) != len(children[0]) for c in children):
+            return None
+        return tag, attrib, tracks, children
+
+    def merge(self, frames: Sequence[core.SVGMaker]) -> core.SVGMaker:
+        opened = self.open(frames)
+        if opened is None:
+            tag = frames[0].svgTag()
+            return Node("svg", tag[1] if tag is not None else None, self.variants(frames))
+        # Every entry is [frames' nodes, opened, next child index, merged
+        # children, changed, inside text]. A subtree without changes is kept
+        # as the node of the first frame.
+        stack = [[frames, opened, 0, [], False, False]]
+        while True:
+            entry = stack[-1]
+            nodes, (tag, attrib, tracks, children), i, merged, changed, inText = entry
+            if i < len(children[0]):
+                entry[2] += 1
+                childNodes = [c[i] for c in children]
+                first = childNodes[0]
+                if all(n is first for n in childNodes):
+                    merged.append(first)
+                    continue
+                opened = self.open(childNodes)
+                if opened is not None:
+                    childTag = opened[0]
+                    stack.append([childNodes, opened, 0, [], False,
+                                  inText or (childTag is not None and childTag[0] == "text")])
+                    continue
+                texts = [self.text(n) for n in childNodes]
+                if all(t == texts[0] for t in texts):
+                    merged.append(first)
+                    continue
+                if not inText:
+                    merged.extend(self.variants(childNodes))
+                    entry[4] = True
+                    continue
+                # Groups can not show and hide parts of a text, so the
+                # whole text element gets its versions.
+                while stack[-1][5]:
+                    entry = stack.pop()
+                stack[-1][3].extend(self.variants(entry[0]))
+                stack[-1][4] = True
+                continue
+            stack.pop()
+            changed = changed or bool(tracks)
+            if not changed:
+                result = nodes[0]
+            else:
+                for k, values in tracks:
+                    merged.append(self.timeline.track(core.svgName(k), values))
+                result = Node(tag and tag[0], attrib, merged, leaf=not merged)
+                result.svgIndentChildren = nodes[0].svgIndentChildren
+            if not stack:
+                return result
+            stack[-1][3].append(result)
+            stack[-1][4] = stack[-1][4] or changed
+
+
+def animate(
+    frames: Sequence[core.SVGMaker],
+    duration: float,
+    file: Optional[Output] = None,
+    loop: bool = True,
+    compress: Optional[bool] = None,
+    **options
+) -> str:
+    if not frames:
+        raise ValueError("animate needs at least one frame")
+    serializer = Serializer(**options)
+    root = Animator(serializer, Timeline(len(frames), duration, loop)).merge(frames)
+    s = serializer.newline.join(serializer.iterLines(root))
+    if file is not None:
+        with openOutput(file, compress) as fout:
+            fout.write(s)
+    return s
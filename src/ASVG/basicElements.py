@@ -1,25 +1,75 @@
-from typing import List, Tuple, Optional, Union
+import math
+import re
+from array import array
+from itertools import groupby
+from typing import Any, List, Tuple, Optional, Union
 
-from . import core
-
-
-def makeBasicElement(name: str, indent: int, attrib: core.Attrib) -> core.SVGLines:
-    return [" " * indent + f"<{name} {attrib} />"]
+from . import bounds, core
+from .columnar import addRow
 
 
 class BasicElement(core.Element):
-    def __init__(self, **kwargs):
-        if isinstance(kwargs["axis"], core.ComposedElement):
-            kwargs["axis"] = kwargs["axis"].axis
-        super(BasicElement, self).__init__(
-            kwargs["axis"], kwargs["level"], kwargs["attrib"])
-        self.SVGType = kwargs["SVGType"]
-        for k, v in kwargs.items():
-            if k not in {"SVGType", "axis", "level", "attrib"}:
-                self.attrib.__dict__[k] = v
+    svgLeaf = True
+
+    def __new__(cls, **kwargs):
+        axis = kwargs.get("axis")
+        if isinstance(axis, core.ComposedElement):
+            axis = axis.axis
+        if cls is BasicElement and getattr(axis, "columnar", False):
+            values = dict(kwargs.pop("attrib").items())
+            SVGType = kwargs.pop("SVGType")
+            level = kwargs.pop("level")
+            del kwargs["axis"]
+            values.update(kwargs)
+            return addRow(axis, level, SVGType, values)
+        return super(BasicElement, cls).__new__(cls)
 
-    def makeSVG(self, indent: int = 0) -> core.SVGLines:
-        return makeBasicElement(self.SVGType, indent, self.attrib)
+    def __init__(self, **kwargs):
+        SVGType = kwargs.pop("SVGType")
+        axis = kwargs.pop("axis")
+        level = kwargs.pop("level")
+        attrib = kwargs.pop("attrib")
+        if isinstance(axis, core.ComposedElement):
+            axis = axis.axis
+        super(BasicElement, self).__init__(axis, level, attrib, **kwargs)
+        self.SVGType = SVGType
+
+    def svgTag(self) -> Optional[Tuple[str, core.Attrib]]:
+        return self.SVGType, self.attrib
+
+    def _bounds(self) -> Optional[bounds.BBox]:
+        return shapeBounds(self.SVGType, self.attrib)
+
+
+def shapeBounds(SVGType: str, attrib) -> Optional[bounds.BBox]:
+    get = attrib.get
+    num = bounds.number
+    if SVGType == "rect":
+        x, y = num(get("x", 0)), num(get("y", 0))
+        return x, y, x + num(get("width")), y + num(get("height"))
+    if SVGType == "circle":
+        cx, cy, r = num(get("cx", 0)), num(get("cy", 0)), num(get("r"))
+        return cx - r, cy - r, cx + r, cy + r
+    if SVGType == "ellipse":
+        cx, cy = num(get("cx", 0)), num(get("cy", 0))
+        rx, ry = num(get("rx")), num(get("ry"))
+        return cx - rx, cy - ry, cx + rx, cy + ry
+    if SVGType == "line":
+        x1, y1 = num(get("x1", 0)), num(get("y1", 0))
+        x2, y2 = num(get("x2", 0)), num(get("y2", 0))
+        return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+    if SVGType in ("polyline", "polygon"):
+        points = get("points")
+        if hasattr(points, "bounds"):
+            return points.bounds()
+        numbers = [float(v) for v in _PATH_TOKEN.findall(points)]
+        return bounds.pointsBounds(numbers[0::2], numbers[1::2])
+    if SVGType == "path":
+        d = get("d")
+        if not isinstance(d, PathD):
+            d = PathD.fromCommands(d)
+        return d.bounds()
+    return None
 
 
 def rect(
@@ -116,11 +166,33 @@ def line(
     )
 
 
+# Lists of pairs up to this length are written to a string at once, as it is
+# kept with the attributes and costs less than formatting Points every time.
+SHORT_POINTS = 32
+
+
+def _points(
+    axis: Union[core.Axis, core.ComposedElement],
+    points,
+    decimate: Optional[str]
+) -> Union["Points", str]:
+    if decimate is None:
+        cls = points.__class__
+        if cls is str:
+            return points
+        if (cls is list or cls is tuple) and len(points) <= SHORT_POINTS:
+            return ", ".join([f"{x} {y}" for x, y in points])
+        return Points(points)
+    from .decimate import decimated
+    return Points(decimated(points, axis, decimate))
+
+
 def polyline(
     axis: Union[core.Axis, core.ComposedElement],
     level: int,
-    points: List[Tuple[float, float]],
+    points: Union[List[Tuple[float, float]], "Points", Any],
     attrib: core.Attrib = core.Attrib(),
+    decimate: Optional[str] = None,
     **kwargs
 ):
     if not hasattr(attrib, "fill") and "fill" not in kwargs:
@@ -129,7 +201,7 @@ def polyline(
         SVGType="polyline",
         axis=axis,
         level=level,
-        points=", ".join([f"{x} {y}"for x, y in points]),
+        points=_points(axis, points, decimate),
         attrib=attrib,
         **kwargs
     )
@@ -138,72 +210,286 @@ def polyline(
 def polygon(
     axis: Union[core.Axis, core.ComposedElement],
     level: int,
-    points: List[Tuple[float, float]],
+    points: Union[List[Tuple[float, float]], "Points", Any],
     attrib: core.Attrib = core.Attrib(),
+    decimate: Optional[str] = None,
     **kwargs
 ):
     return BasicElement(
         SVGType="polygon",
         axis=axis,
         level=level,
-        points=", ".join([f"{x} {y}"for x, y in points]),
+        points=_points(axis, points, decimate),
         attrib=attrib,
         **kwargs
     )
 
 
+_PATH_ARITY = {
+    "M": 2, "L": 2, "H": 1, "V": 1, "C": 6, "S": 4, "Q": 4, "T": 2, "A": 7, "Z": 0}
+_PATH_ARITY.update({k.lower(): v for k, v in _PATH_ARITY.items()})
+
+_PATH_TEMPLATES = {
+    "C": "C {} {}, {} {}, {} {}",
+    "S": "S {} {}, {} {}",
+    "Q": "Q {} {}, {} {}",
+}
+
+_PATH_TOKEN = re.compile(r"[A-Za-z]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_NEGATIVE_ZERO = re.compile(r"(?<![\d.])-0(?![\d.])")
+
+
+def _pathTemplate(op: str, number: str) -> str:
+    template = _PATH_TEMPLATES.get(op.upper())
+    if template is None:
+        template = " ".join([op] + ["{}"] * _PATH_ARITY[op])
+    else:
+        template = op + template[1:]
+    return template.replace("{}", number)
+
+
+def trimNumbers(s: str, precision: Optional[int] = None) -> str:
+    # Numbers formatted with %r or %.Nf always carry a fractional part, so
+    # stripping zeros before a separator never reaches the integer digits.
+    separators = (" ", ",", "\n")
+    s += " "
+    if precision is None:
+        for sep in separators:
+            s = s.replace(".0" + sep, sep)
+    else:
+        for _ in range(precision):
+            for sep in separators:
+                s = s.replace("0" + sep, sep)
+        for sep in separators:
+            s = s.replace("." + sep, sep)
+    if "-0" in s:
+        s = _NEGATIVE_ZERO.sub("0", s)
+    return s[:-1]
+
+
+_LEADING_ZERO = re.compile(r"(^|[ ,])(-?)0\.")
+
+
+def _shortestDoubles(flat):
+    # The doubles of the shortest decimals that round to the same float32 or
+    # float16 values, so they are written as they print in NumPy: every value
+    # is rounded to 1, 2, ... significant digits until it round-trips.
+    import numpy as np
+    wide = flat.astype("float64")
+    todo = np.flatnonzero(np.isfinite(wide) & (wide != 0))
+    digits = 1
+    while len(todo) and digits <= 9:
+        x = wide[todo]
+        exponent = digits - 1 - np.floor(np.log10(np.abs(x))).astype(np.int64)
+        scale = 10.0 ** np.abs(exponent)
+        up = exponent >= 0
+        rounded = np.where(up, np.round(x * scale) / scale, np.round(x / scale) * scale)
+        with np.errstate(over="ignore"):
+            done = rounded.astype(flat.dtype) == flat[todo]
+        wide[todo[done]] = rounded[done]
+        todo = todo[~done]
+        digits += 1
+    return wide
+
+
+class Points:
+    # The points of a polyline or polygon, kept as numbers and written when
+    # the picture is drawn. (x, y) pairs keep their values as given, e.g.
+    # ints; N x 2 NumPy arrays and other buffers of numbers, or flat ones
+    # of x, y, x, y..., are kept as doubles. NumPy float32 and float16 values
+    # are kept as the shortest decimals they print as; other buffers of
+    # floats are widened.
+    __slots__ = ("coords",)
+
+    def __init__(self, points=()):
+        if isinstance(points, Points):
+            coords = points.coords
+        elif hasattr(points, "reshape"):
+            flat = points.reshape(-1)
+            kind = flat.dtype.kind
+            if kind == "b":
+                raise TypeError("points cannot be booleans")
+            if kind in "iu":
+                coords = tuple(flat.tolist())
+            else:
+                if kind == "f" and flat.dtype.itemsize < 8:
+                    flat = _shortestDoubles(flat)
+                coords = array("d")
+                coords.frombytes(flat.astype("float64").tobytes())
+        elif isinstance(points, (array, memoryview)):
+            view = memoryview(points)
+            if view.format == "?":
+                raise TypeError("points cannot be booleans")
+            coords = array("d", view.cast("B").cast(view.format) if view.ndim > 1 else view)
+        else:
+            coords = tuple([v for point in points for v in point])
+        if len(coords) % 2 != 0:
+            raise ValueError("coordinates must come in (x, y) pairs")
+        self.coords = coords
+
+    def __len__(self) -> int:
+        return len(self.coords) // 2
+
+    def __getitem__(self, i: int) -> Tuple[float, float]:
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("point index out of range")
+        return self.coords[2 * i], self.coords[2 * i + 1]
+
+    def bounds(self) -> Optional[bounds.BBox]:
+        return bounds.pointsBounds(self.coords[0::2], self.coords[1::2])
+
+    def format(self, precision: Optional[int] = None, minify: bool = False) -> str:
+        # One %-template for all points, like the batches; numbers are then
+        # trimmed as the serializer writes them.
+        n = len(self)
+        if precision is None:
+            number = "%s" if self.coords.__class__ is tuple else "%r"
+        else:
+            number = f"%.{precision}f"
+        separator = "," if minify else ", "
+        s = separator.join([f"{number} {number}"] * n) % tuple(self.coords)
+        if precision is not None or minify:
+            s = trimNumbers(s, precision)
+        if minify:
+            s = _LEADING_ZERO.sub(r"\1\2.", s)
+        return s
+
+    def svgFormat(self, serializer) -> str:
+        if serializer.precision is None and not serializer.minify:
+            return str(self)
+        return self.format(serializer.precision, serializer.minify)
+
+    def __str__(self) -> str:
+        return self.format()
+
+
 class PathD:
-    def __init__(self, isClosed: bool = False, commands: List[str] = []):
+    def __init__(
+        self,
+        isClosed: bool = False,
+        *,
+        commands: Optional[List[str]] = None,
+        precision: Optional[int] = None
+    ):
+        if isinstance(isClosed, (list, tuple, str)):
+            raise TypeError("use PathD.fromCommands() or PathD(commands=...) for commands")
         self.isClosed = isClosed
-        self.commands = commands
+        self.precision = precision
+        self.ops = bytearray()
+        self.coords = array("d")
+        for command in commands or []:
+            self.append(command)
+
+    @classmethod
+    def fromCommands(
+        cls,
+        commands: Union[str, List[str]],
+        isClosed: bool = False,
+        precision: Optional[int] = None
+    ) -> "PathD":
+        if isinstance(commands, str):
+            commands = [commands]
+        return cls(isClosed, commands=commands, precision=precision)
+
+    def __len__(self) -> int:
+        return len(self.ops)
+
+    def append(self, command: str):
+        op = None
+        args = []
+        for token in _PATH_TOKEN.findall(command):
+            if token.isalpha():
+                if op is not None:
+                    self._add(op, args)
+                op = token
+                args = []
+            else:
+                args.append(float(token))
+        if op is not None:
+            self._add(op, args)
+
+    def _add(self, op: str, args):
+        n = _PATH_ARITY[op]
+        if n == 0:
+            self.ops.append(ord(op))
+            return
+        if len(args) == 0 or len(args) % n != 0:
+            raise ValueError(f"path command {op} takes {n} numbers, got {len(args)}")
+        self.ops.extend(op.encode() * (len(args) // n))
+        self.coords.extend(args)
+
+    def _addMany(self, op: str, xy):
+        if hasattr(xy, "reshape"):
+            flat = xy.reshape(-1)
+            if flat.dtype != "float64":
+                flat = flat.astype("float64")
+            if len(flat) % 2 != 0:
+                raise ValueError("coordinates must come in (x, y) pairs")
+            self.coords.frombytes(flat.tobytes())
+            n = len(flat) // 2
+        else:
+            n = 0
+            for x, y in xy:
+                self.coords.append(x)
+                self.coords.append(y)
+                n += 1
+        self.ops.extend(op.encode() * n)
 
     def moveTo(self, x: float, y: float):
-        self.commands.append(f"M {x} {y}")
+        self._add("M", (x, y))
 
     def moveFor(self, dx: float, dy: float):
-        self.commands.append(f"m {dx} {dy}")
+        self._add("m", (dx, dy))
 
     def lineTo(self, x: float, y: float):
-        self.commands.append(f"L {x} {y}")
+        self._add("L", (x, y))
 
     def lineFor(self, dx: float, dy: float):
-        self.commands.append(f"l {dx} {dy}")
+        self._add("l", (dx, dy))
+
+    def lineToMany(self, xy):
+        self._addMany("L", xy)
+
+    def lineForMany(self, dxy):
+        self._addMany("l", dxy)
 
     def hlineTo(self, x: float):
-        self.commands.append(f"H {x}")
+        self._add("H", (x,))
 
     def hlineFor(self, dx: float):
-        self.commands.append(f"h {dx}")
+        self._add("h", (dx,))
 
     def vlineTo(self, y: float):
-        self.commands.append(f"V {y}")
+        self._add("V", (y,))
 
     def vlineFor(self, dy: float):
-        self.commands.append(f"v {dy}")
+        self._add("v", (dy,))
 
     def curveTo(self, x1: float, y1: float, x2: float, y2: float, x: float, y: float):
-        self.commands.append(f"C {x1} {y1}, {x2} {y2}, {x} {y}")
+        self._add("C", (x1, y1, x2, y2, x, y))
 
     def curveFor(self, dx1: float, dy1: float, dx2: float, dy2: float, dx: float, dy: float):
-        self.commands.append(f"c {dx1} {dy1}, {dx2} {dy2}, {dx} {dy}")
+        self._add("c", (dx1, dy1, dx2, dy2, dx, dy))
 
     def STo(self, x2: float, y2: float, x: float, y: float):
-        self.commands.append(f"S {x2} {y2}, {x} {y}")
+        self._add("S", (x2, y2, x, y))
 
     def SFor(self, dx2: float, dy2: float, dx: float, dy: float):
-        self.commands.append(f"s {dx2} {dy2}, {dx} {dy}")
+        self._add("s", (dx2, dy2, dx, dy))
 
     def QTo(self, x2: float, y2: float, x: float, y: float):
-        self.commands.append(f"Q {x2} {y2}, {x} {y}")
+        self._add("Q", (x2, y2, x, y))
 
     def QFor(self, dx2: float, dy2: float, dx: float, dy: float):
-        self.commands.append(f"q {dx2} {dy2}, {dx} {dy}")
+        self._add("q", (dx2, dy2, dx, dy))
 
     def TTo(self, x: float, y: float):
-        self.commands.append(f"T {x} {y}")
+        self._add("T", (x, y))
 
     def TFor(self, dx: float, dy: float):
-        self.commands.append(f"t {dx} {dy}")
+        self._add("t", (dx, dy))
 
     def arcTo(
         self,
@@ -215,8 +501,7 @@ class PathD:
         x: float,
         y: float
     ):
-        self.commands.append(
-            f"A {rx} {ry} {xAxisRotation} {int(largeArc)} {int(sweep)} {x} {y}")
+        self._add("A", (rx, ry, xAxisRotation, int(largeArc), int(sweep), x, y))
 
     def arcFor(
         self,
@@ -228,8 +513,7 @@ class PathD:
         dx: float,
         dy: float
     ):
-        self.commands.append(
-            f"a {rx} {ry} {xAxisRotation} {int(largeArc)} {int(sweep)} {dx} {dy}")
+        self._add("a", (rx, ry, xAxisRotation, int(largeArc), int(sweep), dx, dy))
 
     def close(self):
         self.isClosed = True
@@ -237,12 +521,79 @@ class PathD:
     def open(self):
         self.isClosed = False
 
-    def __str__(self) -> str:
-        s = " ".join(self.commands).strip()
-        if s[-1] != 'Z' and s[-1] != 'z' and self.isClosed:
-            s += " Z"
+    def bounds(self) -> Optional[bounds.BBox]:
+        # Control points of curves are included, which bounds the curve.
+        # An arc is bounded by the circle through its start point with the
+        # larger radius, or half the chord when the radii are too small.
+        coords = self.coords
+        xs = []
+        ys = []
+        x = y = 0.0
+        startX = startY = 0.0
+        i = 0
+        for op in self.ops:
+            op = chr(op)
+            n = _PATH_ARITY[op]
+            args = coords[i:i + n]
+            i += n
+            upper = op.upper()
+            relative = op != upper
+            if upper == "Z":
+                x, y = startX, startY
+                continue
+            if upper == "H":
+                x = args[0] + (x if relative else 0)
+            elif upper == "V":
+                y = args[0] + (y if relative else 0)
+            elif upper == "A":
+                endX = args[5] + (x if relative else 0)
+                endY = args[6] + (y if relative else 0)
+                r = max(abs(args[0]), abs(args[1]), math.hypot(endX - x, endY - y) / 2)
+                xs.extend((x - 2 * r, x + 2 * r))
+                ys.extend((y - 2 * r, y + 2 * r))
+                x, y = endX, endY
+            else:
+                baseX, baseY = (x, y) if relative else (0.0, 0.0)
+                for k in range(0, n, 2):
+                    xs.append(args[k] + baseX)
+                    ys.append(args[k + 1] + baseY)
+                x, y = xs[-1], ys[-1]
+            if upper == "M":
+                startX, startY = x, y
+            xs.append(x)
+            ys.append(y)
+        return bounds.pointsBounds(xs, ys)
+
+    @property
+    def commands(self) -> List[str]:
+        return self.format(separator="\n").split("\n")
+
+    def format(self, precision: Optional[int] = None, separator: str = " ") -> str:
+        if precision is None:
+            precision = self.precision
+        number = "%r" if precision is None else f"%.{precision}f"
+        parts = []
+        i = 0
+        for op, run in groupby(self.ops):
+            op = chr(op)
+            count = len(list(run))
+            n = _PATH_ARITY[op] * count
+            template = separator.join([_pathTemplate(op, number)] * count)
+            parts.append(template % tuple(self.coords[i:i + n]))
+            i += n
+        s = trimNumbers(separator.join(parts), precision)
+        if self.isClosed and s[-1:] not in ("Z", "z"):
+            s = s + separator + "Z" if s else "Z"
         return s
 
+    def svgFormat(self, serializer) -> str:
+        if serializer.precision is None:
+            return self.format()
+        return self.format(serializer.precision)
+
+    def __str__(self) -> str:
+        return self.format()
+
 
 def path(
     axis: Union[core.Axis, core.ComposedElement],
@@ -252,7 +603,7 @@ def path(
     **kwargs
 ):
     return BasicElement(
-        SVGType="polygon",
+        SVGType="path",
         axis=axis,
         level=level,
         d=d,
@@ -0,0 +1,206 @@
+from operator import add, sub
+from typing import Any, Dict, Iterable, Optional, Union
+
+from . import bounds, core
+
+
+def isColumn(v: Any) -> bool:
+    if isinstance(v, (str, bytes)) or getattr(v, "ndim", 1) == 0:
+        return False
+    return hasattr(v, "__len__")
+
+
+def asColumn(v: Any) -> Iterable:
+    if hasattr(v, "tolist"):
+        return v.tolist()
+    return v
+
+
+def columnCount(values: Dict[str, Any]) -> int:
+    count = None
+    for k, v in values.items():
+        if isColumn(v):
+            if count is None:
+                count = len(v)
+            elif len(v) != count:
+                raise ValueError(
+                    f"column {k} has {len(v)} items, expected {count}")
+    return 1 if count is None else count
+
+
+class BatchElement(core.Element):
+    svgOpaque = True
+
+    def __init__(self, **kwargs):
+        SVGType = kwargs.pop("SVGType")
+        axis = kwargs.pop("axis")
+        level = kwargs.pop("level")
+        attrib = kwargs.pop("attrib")
+        columnCount(kwargs)
+        if isinstance(axis, core.ComposedElement):
+            axis = axis.axis
+        super(BatchElement, self).__init__(axis, level, attrib, **kwargs)
+        self.SVGType = SVGType
+
+    def __len__(self) -> int:
+        return columnCount(self.attrib)
+
+    def _rowCount(self) -> int:
+        return columnCount(self.attrib)
+
+    def _columnValues(self, k: str, default: Any = None) -> list:
+        v = self.attrib.get(k, default)
+        if isColumn(v):
+            return asColumn(v)
+        return [v] * self._rowCount()
+
+    def _bounds(self) -> Optional[bounds.BBox]:
+        col = self._columnValues
+        num = bounds.number
+        if self.SVGType == "rect":
+            x, y = col("x", 0), col("y", 0)
+            return (num(min(x)), num(min(y)),
+                    num(max(map(add, x, col("width")))), num(max(map(add, y, col("height")))))
+        if self.SVGType in ("circle", "ellipse"):
+            cx, cy = col("cx", 0), col("cy", 0)
+            if self.SVGType == "circle":
+                rx = ry = col("r")
+            else:
+                rx, ry = col("rx"), col("ry")
+            return (num(min(map(sub, cx, rx))), num(min(map(sub, cy, ry))),
+                    num(max(map(add, cx, rx))), num(max(map(add, cy, ry))))
+        if self.SVGType == "line":
+            xs = col("x1", 0) + col("x2", 0)
+            ys = col("y1", 0) + col("y2", 0)
+            return num(min(xs)), num(min(ys)), num(max(xs)), num(max(ys))
+        from .basicElements import shapeBounds
+        columns = [(k, col(k)) for k in self.attrib]
+        return bounds.union(
+            shapeBounds(self.SVGType, {k: c[i] for k, c in columns if c[i] is not None})
+            for i in range(len(columns[0][1]) if columns else 0))
+
+    def svgStyleAttrib(self) -> core.Attrib:
+        return core.Attrib(**{k: v for k, v in self.attrib.items()
+                              if not isColumn(v)})
+
+    def svgLines(self, serializer, indent: int) -> Iterable[str]:
+        count = len(self)
+        parts = []
+        columns = []
+        items = list(self.attrib.items())
+        if serializer.styles:
+            name, rest = serializer.splitStyle(kv for kv in items if not isColumn(kv[1]))
+            if name is not None:
+                rest = serializer.withClass(rest, name)
+                items = [kv for kv in items if isColumn(kv[1])] + rest
+        for k, v in items:
+            replacedk = core.svgName(k)
+            if isColumn(v):
+                parts.append(f'{replacedk}="%s"')
+                column = asColumn(v)
+                if not serializer.plain:
+                    column = [serializer.value(k, x) for x in column]
+                columns.append(column)
+            else:
+                parts.append(f'{replacedk}="{serializer.value(k, v)}"'.replace("%", "%%"))
+        template = serializer.leafLine(self.SVGType, " ".join(parts), indent)
+        if not columns:
+            return [template % ()] * count
+        return map(template.__mod__, zip(*columns))
+
+
+Column = Union[float, Iterable[float]]
+
+
+def rects(
+    axis: Union[core.Axis, core.ComposedElement],
+    level: int,
+    x: Column,
+    y: Column,
+    width: Column,
+    height: Column,
+    rx: Column = 0.0,
+    ry: Column = 0.0,
+    attrib: core.Attrib = core.Attrib(),
+    **kwargs
+):
+    return BatchElement(
+        SVGType="rect",
+        axis=axis,
+        level=level,
+        x=x,
+        y=y,
+        width=width,
+        height=height,
+        rx=rx,
+        ry=ry,
+        attrib=attrib,
+        **kwargs
+    )
+
+
+def circles(
+    axis: Union[core.Axis, core.ComposedElement],
+    level: int,
+    cx: Column,
+    cy: Column,
+    r: Column,
+    attrib: core.Attrib = core.Attrib(),
+    **kwargs
+):
+    return BatchElement(
+        SVGType="circle",
+        axis=axis,
+        level=level,
+        cx=cx,
+        cy=cy,
+        r=r,
+        attrib=attrib,
+        **kwargs
+    )
+
+
+def ellipses(
+    axis: Union[core.Axis, core.ComposedElement],
+    level: int,
+    cx: Column,
+    cy: Column,
+    rx: Column,
+    ry: Column,
+    attrib: core.Attrib = core.Attrib(),
+    **kwargs
+):
+    return BatchElement(
+        SVGType="ellipse",
+        axis=axis,
+        level=level,
+        cx=cx,
+        cy=cy,
+        rx=rx,
+        ry=ry,
+        attrib=attrib,
+        **kwargs
+    )
+
+
+def lines(
+    axis: Union[core.Axis, core.ComposedElement],
+    level: int,
+    x1: Column,
+    y1: Column,
+    x2: Column,
+    y2: Column,
+    attrib: core.Attrib = core.Attrib(),
+    **kwargs
+):
+    return BatchElement(
+        SVGType="line",
+        axis=axis,
+        level=level,
+        x1=x1,
+        y1=y1,
+        x2=x2,
+        y2=y2,
+        attrib=attrib,
+        **kwargs
+    )
@@ -0,0 +1,203 @@
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+BBox = Tuple[float, float, float, float]
+
+# Attributes that can move the drawn shape away from its geometry in ways
+# that are not tracked, so elements with any of them have unknown bounds.
+UNBOUNDED = {"transform", "filter"}
+MARKERS = ("marker_start", "marker_mid", "marker_end", "marker-start", "marker-mid", "marker-end")
+
+
+def number(v: Any) -> float:
+    if v.__class__ is float or v.__class__ is int:
+        return v
+    return float(v)
+
+
+def union(boxes: Iterable[Optional[BBox]]) -> Optional[BBox]:
+    x0 = y0 = math.inf
+    x1 = y1 = -math.inf
+    for box in boxes:
+        if box is None:
+            return None
+        if box[0] < x0:
+            x0 = box[0]
+        if box[1] < y0:
+            y0 = box[1]
+        if box[2] > x1:
+            x1 = box[2]
+        if box[3] > y1:
+            y1 = box[3]
+    if x0 > x1:
+        return None
+    return x0, y0, x1, y1
+
+
+def shift(box: Optional[BBox], dx: float, dy: float) -> Optional[BBox]:
+    if box is None:
+        return None
+    return box[0] + dx, box[1] + dy, box[2] + dx, box[3] + dy
+
+
+def grow(box: Optional[BBox], d: float) -> Optional[BBox]:
+    if box is None:
+        return None
+    return box[0] - d, box[1] - d, box[2] + d, box[3] + d
+
+
+def strokeWidth(v: Any) -> float:
+    if hasattr(v, "__len__") and not isinstance(v, str):
+        return max(map(number, v), default=0)
+    return number(v)
+
+
+def strokeBounds(box: BBox, attrib: Any,
+                 markerExtents: Optional[Dict[str, float]] = None) -> Optional[BBox]:
+    # Miter joins reach at most miterlimit / 2 stroke widths out, which is
+    # two widths for the default miter limit of 4. markerExtents tells how
+    # far the markers known by url reach out from the vertex they are on.
+    if attrib is None:
+        return box
+    extent = 0.0
+    for k in MARKERS:
+        marker = attrib.get(k)
+        if marker is not None:
+            if markerExtents is None or marker not in markerExtents:
+                return None
+            extent = max(extent, markerExtents[marker])
+    width = attrib.get("stroke_width", attrib.get("stroke-width"))
+    if width is not None:
+        try:
+            width = strokeWidth(width)
+            limit = number(attrib.get("stroke_miterlimit", 4))
+        except (TypeError, ValueError):
+            return None
+        extent = max(extent, width * max(limit, 1) / 2)
+    return grow(box, extent) if extent else box
+
+
+def clip(a: BBox, b: BBox) -> Optional[BBox]:
+    box = max(a[0], b[0]), max(a[1], b[1]), min(a[2], b[2]), min(a[3], b[3])
+    if box[0] > box[2] or box[1] > box[3]:
+        return None
+    return box
+
+
+def intersects(a: BBox, b: BBox) -> bool:
+    return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+
+def pointsBounds(xs: Iterable[float], ys: Iterable[float]) -> Optional[BBox]:
+    xs = list(xs)
+    ys = list(ys)
+    if not xs or not ys:
+        return None
+    return min(xs), min(ys), max(xs), max(ys)
+
+
+class GridIndex:
+    # Uniform grid over the axis. Elements are stored in every cell their
+    # ink box covers; very large elements and elements without a known box
+    # are kept aside and checked on every query.
+    maxCells = 64
+    # The grid is rebuilt with smaller cells once it holds this many times
+    # the elements it was sized for.
+    growth = 4
+
+    def __init__(self, elements: Iterable, size: Tuple[float, float]):
+        # size is the extent of the axis in user units, the units of the
+        # element boxes.
+        self.size = size
+        self._build(list(elements))
+
+    def _build(self, elements: list):
+        w, h = self.size
+        cell = math.sqrt(max(w * h, 1.0) / max(len(elements), 1))
+        self.cell = max(cell, 1e-9)
+        self.regridAt = self.growth * max(len(elements), 16)
+        self.cells: Dict[Tuple[int, int], list] = {}
+        self.large = set()
+        self.unbounded = set()
+        self.where: Dict[Any, Optional[Tuple[int, int, int, int]]] = {}
+        self.boxes: Dict[Any, Optional[BBox]] = {}
+        self.stale = set()
+        for e in elements:
+            self._insert(e)
+
+    def _span(self, box: BBox) -> Tuple[int, int, int, int]:
+        c = self.cell
+        return (math.floor(box[0] / c), math.floor(box[1] / c),
+                math.floor(box[2] / c), math.floor(box[3] / c))
+
+    def _insert(self, e):
+        box = e.inkBBox()
+        self.boxes[e] = box
+        if box is None:
+            self.unbounded.add(e)
+            self.where[e] = None
+            return
+        span = self._span(box)
+        i0, j0, i1, j1 = span
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > self.maxCells:
+            self.large.add(e)
+            self.where[e] = None
+            return
+        self.where[e] = span
+        cells = self.cells
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                bucket = cells.get((i, j))
+                if bucket is None:
+                    cells[i, j] = [e]
+                else:
+                    bucket.append(e)
+
+    def remove(self, e):
+        self.stale.discard(e)
+        if e not in self.where:
+            return
+        span = self.where.pop(e)
+        del self.boxes[e]
+        if span is None:
+            self.large.discard(e)
+            self.unbounded.discard(e)
+            return
+        i0, j0, i1, j1 = span
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                bucket = self.cells[i, j]
+                bucket.remove(e)
+                if not bucket:
+                    del self.cells[i, j]
+
+    def update(self, e):
+        self.stale.add(e)
+
+    def _refresh(self):
+        stale, self.stale = self.stale, set()
+        for e in stale:
+            self.remove(e)
+            self._insert(e)
+        if len(self.where) > self.regridAt:
+            self._build(list(self.where))
+
+    def query(self, box: BBox) -> List:
+        if self.stale:
+            self._refresh()
+        found = set(self.unbounded)
+        for e in self.large:
+            if intersects(self.boxes[e], box):
+                found.add(e)
+        i0, j0, i1, j1 = self._span(box)
+        cells = self.cells
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(cells):
+            candidates = (e for bucket in cells.values() for e in bucket)
+        else:
+            candidates = (e for i in range(i0, i1 + 1) for j in range(j0, j1 + 1)
+                          for e in cells.get((i, j), ()))
+        boxes = self.boxes
+        for e in candidates:
+            if e not in found and intersects(boxes[e], box):
+                found.add(e)
+        return list(found)
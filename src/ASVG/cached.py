@@ -0,0 +1,288 @@
+import hashlib
+import inspect
+import os
+import pickle
+from array import array
+from collections import OrderedDict
+from functools import partial, wraps
+from types import CodeType
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from . import bounds, core
+from .text import TextRepresent
+
+# Part of every key, to be raised when the output of the library changes.
+VERSION = 1
+_SUFFIX = ".asvgc"
+
+
+def defaultDirectory() -> str:
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.environ.get("ASVG_CACHE") or os.path.join(base, "asvg")
+
+
+def canonical(v: Any) -> Any:
+    # A value built of tuples and plain values that is equal for arguments
+    # making the same picture; its repr is hashed into the key.
+    cls = v.__class__
+    if v is None or cls in (bool, int, float, str, bytes):
+        return v
+    if cls is list or cls is tuple:
+        return cls.__name__, tuple(map(canonical, v))
+    if cls is dict:
+        return "dict", tuple((canonical(k), canonical(x)) for k, x in v.items())
+    if isinstance(v, core.Attrib):
+        # The order of the attributes is the order they are written in.
+        return "Attrib", tuple((k, canonical(x)) for k, x in v.items())
+    if isinstance(v, core.StyleRef):
+        return "StyleRef", v.name, canonical(v.default)
+    if isinstance(v, (bytearray, array)):
+        return cls.__name__, getattr(v, "typecode", ""), bytes(v)
+    if hasattr(v, "dtype") and hasattr(v, "tobytes"):
+        return "ndarray", str(v.dtype), v.shape, v.tobytes()
+    if inspect.ismethod(v):
+        return "method", canonical(v.__self__), canonical(v.__func__)
+    if isinstance(v, type) or inspect.isroutine(v):
+        name = getattr(v, "__qualname__", repr(v))
+        if "<lambda>" not in name and "<locals>" not in name:
+            return "ref", getattr(v, "__module__", None), name
+        # Lambdas and closures of one name are told apart by their code and
+        # the values they captured.
+        if getattr(v, "__code__", None) is None:
+            raise TypeError(f"{name} cannot be cached, it is not defined at module level")
+        return "code", factoryKey(v), tuple(
+            "self" if cell.cell_contents is v else canonical(cell.cell_contents)
+            for cell in v.__closure__ or ())
+    if isinstance(v, core.SVGMaker) and not isinstance(v, TextRepresent):
+        raise TypeError(f"a {cls.__name__} argument cannot be cached")
+    state = getattr(v, "__dict__", None)
+    if state is None:
+        raise TypeError(f"a {cls.__name__} argument cannot be cached")
+    return (f"{cls.__module__}.{cls.__qualname__}",
+            tuple((k, canonical(x)) for k, x in state.items() if not k.startswith("_")))
+
+
+def _codeKey(code: CodeType) -> tuple:
+    consts = tuple(_codeKey(c) if isinstance(c, CodeType) else repr(c) for c in code.co_consts)
+    return code.co_code, consts, code.co_names
+
+
+def factoryKey(f: Callable) -> tuple:
+    # A factory is known by its name, code and defaults, so editing it starts
+    # a new set of entries. Helpers it calls are not looked into.
+    code = getattr(f, "__code__", None)
+    return (f.__module__, f.__qualname__, _codeKey(code) if code is not None else None,
+            canonical(getattr(f, "__defaults__", None)),
+            canonical(getattr(f, "__kwdefaults__", None)))
+
+
+class FragmentStore:
+    # An LRU of entries in memory, in front of one file per entry in
+    # directory. Files are evicted, least recently used first, once they
+    # take more than maxBytes.
+    def __init__(self, directory: Optional[str], maxEntries: int = 1024, maxBytes: int = 256 << 20):
+        self.directory = directory
+        self.maxEntries = maxEntries
+        self.maxBytes = maxBytes
+        self.memory: "OrderedDict[str, dict]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._size = None
+
+    def file(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key: str) -> Optional[dict]:
+        entry = self.memory.get(key)
+        if entry is not None:
+            self.memory.move_to_end(key)
+            return entry
+        if self.directory is None:
+            return None
+        file = self.file(key)
+        try:
+            with open(file, "rb") as fin:
+                entry = pickle.load(fin)
+            os.utime(file)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        self.remember(key, entry)
+        return entry
+
+    def remember(self, key: str, entry: dict):
+        self.memory[key] = entry
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.maxEntries:
+            self.memory.popitem(last=False)
+
+    def put(self, key: str, entry: dict):
+        self.remember(key, entry)
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        file = self.file(key)
+        tmp = f"{file}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as fout:
+            pickle.dump(entry, fout, pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(tmp)
+        try:
+            size -= os.path.getsize(file)
+        except OSError:
+            pass
+        os.replace(tmp, file)
+        if self._size is None:
+            self._size = sum(size for _, size, _ in self._files())
+        else:
+            self._size += size
+        if self._size > self.maxBytes:
+            self.evict()
+
+    def _files(self) -> List[tuple]:
+        found = []
+        for entry in os.scandir(self.directory):
+            if entry.name.endswith(_SUFFIX):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, stat.st_size, entry.path))
+        return found
+
+    def evict(self):
+        # Down to three quarters of the budget, so that a full store is not
+        # scanned on every write.
+        files = sorted(self._files())
+        total = sum(size for _, size, _ in files)
+        for _, size, path in files:
+            if total <= self.maxBytes * 3 // 4:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+        self._size = total
+
+    def clear(self):
+        self.memory.clear()
+        self.hits = 0
+        self.misses = 0
+        if self.directory is not None and os.path.isdir(self.directory):
+            for _, _, path in self._files():
+                os.remove(path)
+        self._size = None
+
+
+class _CachedBody(core.SVGMaker):
+    svgOpaque = True
+
+    def __init__(self, element: "CachedElement"):
+        self.element = element
+
+    def svgLines(self, serializer, indent: int) -> Iterable[str]:
+        return self.element.bodyLines(serializer, indent)
+
+    def svgExpand(self) -> Iterable[core.SVGMaker]:
+        return self.element.source().svgChildren()
+
+
+class CachedElement(core.ComposedElement):
+    # Stands for the ComposedElement made by a factory, with its content
+    # written from the cache. It is placed like any ComposedElement; its
+    # content is built again only for a format that is not cached yet.
+    def __init__(self, entry: dict, store: FragmentStore, key: str,
+                 build: Callable[[], core.ComposedElement],
+                 source: Optional[core.ComposedElement] = None):
+        # Made without adding the element to its own axis and taking it out
+        # again, as ComposedElement does, which is most of the work here.
+        meta = entry["meta"]
+        axis = self.axis = core.Axis(meta["size"])
+        axis.attrib = core.Attrib(**meta["axis"])
+        axis.attrib._setOwner(axis)
+        axis._owner = self
+        self._level = meta["level"]
+        self.attrib = core.Attrib(**meta["attrib"])
+        self.attrib._setOwner(self)
+        self._entry = entry
+        self._store = store
+        self._key = key
+        self._build = build
+        self._source = source
+        self._body = _CachedBody(self)
+
+    def contentBBox(self) -> Optional[bounds.BBox]:
+        return self._entry["meta"]["content"]
+
+    def svgChildren(self) -> Iterable[core.SVGMaker]:
+        return (self._body,)
+
+    def source(self) -> core.ComposedElement:
+        # The element made by the factory, built again if it is not kept.
+        if self._source is None:
+            self._source = self._build()
+        return self._source
+
+    def bodyLines(self, serializer, indent: int) -> List[str]:
+        # Symbols, style classes, culling and rasterizing do not reach into
+        # the content, which is written as it is serialized on its own.
+        formatKey = (serializer.indent, serializer.minify, serializer.precision,
+                     repr(serializer.themeKey), indent)
+        lines = self._entry["lines"].get(formatKey)
+        if lines is None:
+            alone = serializer.variant(cache=False, dedup=False, styles=False, cull=False,
+                                       raster=None)
+            lines = []
+            for child in self.source().svgChildren():
+                lines.extend(alone.iterLines(child, indent))
+            self._entry["lines"][formatKey] = lines
+            self._store.put(self._key, self._entry)
+        return lines
+
+
+def _meta(e: core.ComposedElement) -> Dict[str, Any]:
+    return {"size": (e.axis.w, e.axis.h), "level": e.level,
+            "attrib": dict(e.attrib.items()), "axis": dict(e.axis.attrib.items()),
+            "content": e.contentBBox()}
+
+
+def asvgCached(
+    factory: Optional[Callable[..., core.ComposedElement]] = None,
+    directory: Optional[str] = None,
+    maxEntries: int = 1024,
+    maxBytes: int = 256 << 20
+):
+    # Caches the pictures of a factory returning a ComposedElement, e.g.
+    # labeledRect, by the factory and its arguments. Used as @asvgCached or
+    # @asvgCached(directory=..., ...). Entries are kept in memory, and in
+    # directory only when one is given: they are unpickled from it.
+
+    def decorate(f: Callable[..., core.ComposedElement]):
+        store = FragmentStore(directory, maxEntries, maxBytes)
+        identity = hashlib.blake2b(repr((VERSION, factoryKey(f))).encode("utf-8")).digest()
+
+        @wraps(f)
+        def cached(*args, **kwargs) -> CachedElement:
+            # Arguments are keyed as given, so f(1) and f(x=1) are separate
+            # entries of the same picture.
+            key = hashlib.blake2b(repr((canonical(args), canonical(kwargs))).encode("utf-8"),
+                                  digest_size=20, key=identity).hexdigest()
+            entry = store.get(key)
+            source = None
+            if entry is None:
+                store.misses += 1
+                source = f(*args, **kwargs)
+                if not isinstance(source, core.ComposedElement):
+                    raise TypeError(f"{f.__qualname__} returned a {type(source).__name__}, "
+                                    "not a ComposedElement")
+                entry = {"meta": _meta(source), "lines": {}}
+                store.remember(key, entry)
+            else:
+                store.hits += 1
+            return CachedElement(entry, store, key, partial(f, *args, **kwargs), source)
+
+        cached.cache = store
+        return cached
+
+    if factory is not None:
+        return decorate(factory)
+    return decorate
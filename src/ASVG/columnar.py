@@ -0,0 +1,288 @@
+from array import array
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+from . import bounds, core
+from .batch import BatchElement
+
+
+_CONSTANTS = {str, int, float}
+
+
+def _isColumn(v: Any) -> bool:
+    return v.__class__ is array or v.__class__ is list
+
+
+class ColumnTable(BatchElement):
+    # Every key is stored either as a constant shared by all rows, or as a
+    # column with one value per row: array("d") while every value is a float,
+    # a list otherwise. None marks a value missing from a row.
+    def __init__(self, axis: core.Axis, level: int, SVGType: str, values: Dict[str, Any]):
+        self.rows = 1
+        self._removed = set()
+        self._sparse = False
+        core.Element.__init__(self, axis, level, core.Attrib(**{
+            k: v if v.__class__ in _CONSTANTS else [v] for k, v in values.items()}))
+        self.SVGType = SVGType
+        self.signature = SVGType, tuple(values)
+        # Every row has a sequence number of the axis, as if it was an
+        # element: the one of the table, counting up from (first row, seq)
+        # runs that start where other elements were added in between.
+        # Rows moved to other tables are forwarded to their ColumnRow.
+        self._stamps = None
+        self._lastStamp = axis.elements.seq(self)
+        self._forward = None
+
+    def __len__(self) -> int:
+        return self.rows - len(self._removed)
+
+    def _rowCount(self) -> int:
+        return self.rows
+
+    def appendRow(self, values: Dict[str, Any]) -> int:
+        items = self.attrib.__dict__
+        for k, v in values.items():
+            column = items[k]
+            cls = column.__class__
+            if cls is array:
+                if v.__class__ is not float:
+                    column = self._column(k, listed=True)
+            elif cls is not list:
+                if v.__class__ is cls and v == column:
+                    continue
+                column = self._column(k, listed=v.__class__ is not float)
+            column.append(v)
+        self.rows += 1
+        self._invalidate()
+        return self.rows - 1
+
+    def _copy(self, parent: Optional[core.Axis]) -> "ColumnTable":
+        # Rows are changed in place, so the copy gets its own columns.
+        table = super(ColumnTable, self)._copy(parent)
+        table.attrib.update({k: v[:] for k, v in self.attrib.items() if _isColumn(v)})
+        table._removed = set(self._removed)
+        if self._stamps is not None:
+            table._stamps = list(self._stamps)
+        table._forward = None
+        return table
+
+    def stampRow(self, index: int, seq: int):
+        if seq != self._lastStamp + 1:
+            if self._stamps is None:
+                self._stamps = []
+            self._stamps.append((index, seq))
+        self._lastStamp = seq
+
+    def rowSeq(self, index: int) -> int:
+        first, seq = 0, self.axis.elements.seq(self)
+        for run in self._stamps or ():
+            if run[0] > index:
+                break
+            first, seq = run
+        return seq + index - first
+
+    def _splitAfter(self, seq: int):
+        # Moves the rows added after seq to tables of their own, so that an
+        # element can be placed between them.
+        moved = [(index, self.rowSeq(index)) for index in range(self.rows)
+                 if index not in self._removed and self.rowSeq(index) > seq]
+        self._removed.update(index for index, _ in moved)
+        self._stamps = [run for run in self._stamps if run[0] < moved[0][0]] or None
+        self._lastStamp = self.rowSeq(moved[0][0] - 1)
+        self._invalidate()
+        if self._forward is None:
+            self._forward = {}
+        table = None
+        for index, rowSeq in moved:
+            row = _insertRow(self.axis, self.level, self.SVGType, self.rowValues(index), rowSeq, table)
+            self._forward[index] = row
+            table = row.table
+
+    def _column(self, k: str, listed: bool = False):
+        column = self.attrib.get(k)
+        if _isColumn(column):
+            column = column.tolist() if listed and column.__class__ is array else column
+        elif column.__class__ is float and not listed:
+            column = array("d", (column,)) * self.rows
+        else:
+            column = [column] * self.rows
+        self.attrib.update({k: column})
+        return column
+
+    def value(self, index: int, k: str) -> Any:
+        column = self.attrib.get(k)
+        return column[index] if _isColumn(column) else column
+
+    def setValue(self, index: int, k: str, v: Any):
+        if k not in self.attrib:
+            self.attrib.update({k: None})
+            self._sparse = True
+        column = self._column(k, listed=v.__class__ is not float)
+        column[index] = v
+        if v is None:
+            self._sparse = True
+        self._invalidate()
+
+    def rowValues(self, index: int) -> Dict[str, Any]:
+        values = {}
+        for k, column in self.attrib.items():
+            v = column[index] if _isColumn(column) else column
+            if v is not None:
+                values[k] = v
+        return values
+
+    def removeRow(self, index: int):
+        self._removed.add(index)
+        self._invalidate()
+        if len(self) == 0:
+            self.axis.removeElement(self)
+
+    def svgLines(self, serializer, indent: int) -> Iterable[str]:
+        if not self._sparse and not self._removed:
+            return super(ColumnTable, self).svgLines(serializer, indent)
+        return self._rowLines(serializer, indent)
+
+    def _rowLines(self, serializer, indent: int) -> Iterator[str]:
+        for index in range(self.rows):
+            if index not in self._removed:
+                attrib = core.Attrib(**self.rowValues(index))
+                yield serializer.leafTag(self.SVGType, attrib, indent)
+
+
+class RowAttrib:
+    __slots__ = ("_row",)
+
+    def __init__(self, row: "ColumnRow"):
+        object.__setattr__(self, "_row", row)
+
+    def __getattr__(self, k):
+        row = self._row
+        v = row.table.value(row.index, k)
+        if v is None:
+            raise AttributeError(k)
+        return v
+
+    def __setattr__(self, k, v):
+        row = self._row
+        row.table.setValue(row.index, k, v)
+
+    def __delattr__(self, k):
+        row = self._row
+        if row.table.value(row.index, k) is None:
+            raise AttributeError(k)
+        row.table.setValue(row.index, k, None)
+
+    def __contains__(self, k) -> bool:
+        row = self._row
+        return row.table.value(row.index, k) is not None
+
+    def items(self):
+        row = self._row
+        return row.table.rowValues(row.index).items()
+
+    def __str__(self) -> str:
+        return str(core.Attrib(**dict(self.items())))
+
+
+class ColumnRow:
+    __slots__ = ("_table", "_index")
+
+    def __init__(self, table: ColumnTable, index: int):
+        self._table = table
+        self._index = index
+
+    def _follow(self):
+        forward = self._table._forward
+        while forward is not None and self._index in forward:
+            row = forward[self._index]
+            self._table, self._index = row._table, row._index
+            forward = self._table._forward
+
+    @property
+    def table(self) -> ColumnTable:
+        self._follow()
+        return self._table
+
+    @property
+    def index(self) -> int:
+        self._follow()
+        return self._index
+
+    @property
+    def axis(self) -> core.Axis:
+        return self.table.axis
+
+    @property
+    def SVGType(self) -> str:
+        return self.table.SVGType
+
+    @property
+    def attrib(self) -> RowAttrib:
+        return RowAttrib(self)
+
+    @property
+    def level(self) -> int:
+        return self.table.level
+
+    @level.setter
+    def level(self, level: int):
+        # The row keeps its place in the order elements were added, like an
+        # element that changes level.
+        table, index = self.table, self.index
+        if level != table.level:
+            axis = table.axis
+            seq = table.rowSeq(index)
+            values = table.rowValues(index)
+            table.removeRow(index)
+            before = axis.elements.before(level, seq)
+            if not isinstance(before, ColumnTable):
+                before = None
+            elif before._lastStamp > seq and axis.owns(before):
+                before._splitAfter(seq)
+            row = _insertRow(axis, level, table.SVGType, values, seq, before)
+            if table._forward is None:
+                table._forward = {}
+            table._forward[index] = row
+
+    def remove(self):
+        self.table.removeRow(self.index)
+
+    def bbox(self) -> Optional[bounds.BBox]:
+        from .basicElements import shapeBounds
+        try:
+            return shapeBounds(self.table.SVGType, self.table.rowValues(self.index))
+        except (TypeError, ValueError):
+            return None
+
+
+def _isOpen(axis: core.Axis, table: Optional[core.Element], SVGType: str, values: Dict[str, Any]) -> bool:
+    return (isinstance(table, ColumnTable) and table.signature == (SVGType, tuple(values))
+            and not table._removed and axis.owns(table))
+
+
+def _insertRow(
+    axis: core.Axis,
+    level: int,
+    SVGType: str,
+    values: Dict[str, Any],
+    seq: int,
+    table: Optional[ColumnTable]
+) -> ColumnRow:
+    # Adds a row in the place of an element added at seq, to table if it is
+    # the element just before that place.
+    if _isOpen(axis, table, SVGType, values) and seq > table._lastStamp:
+        index = table.appendRow(values)
+        table.stampRow(index, seq)
+        return ColumnRow(table, index)
+    table = ColumnTable(axis, level, SVGType, values)
+    axis.elements.relevel(table, seq)
+    table._lastStamp = seq
+    return ColumnRow(table, 0)
+
+
+def addRow(axis: core.Axis, level: int, SVGType: str, values: Dict[str, Any]) -> ColumnRow:
+    table = axis.elements.last(level)
+    if _isOpen(axis, table, SVGType, values):
+        index = table.appendRow(values)
+        table.stampRow(index, axis.elements.reserve())
+        return ColumnRow(table, index)
+    return ColumnRow(ColumnTable(axis, level, SVGType, values), 0)
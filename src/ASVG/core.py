@@ -1,26 +1,102 @@
-import copy
-from typing import Tuple, Optional, List
+from bisect import bisect_left, insort
+from itertools import islice
+from typing import Dict, Tuple, Optional, List, Iterator, Iterable, Union
+
+from . import bounds
+from .bounds import BBox, GridIndex
 
 INDENT = 2
 
 
+_SVG_NAMES: Dict[str, str] = {}
+_set = object.__setattr__
+
+
+def svgName(k: str) -> str:
+    name = _SVG_NAMES.get(k)
+    if name is None:
+        name = _SVG_NAMES[k] = k.replace('_', '-')
+    return name
+
+
 class Attrib:
+    __slots__ = ("__dict__", "_owner")
+
     def __init__(self, **kwargs):
+        _set(self, "_owner", None)
         for k, v in kwargs.items():
             self.__dict__[k] = v
 
+    def __setattr__(self, k, v):
+        self.__dict__[k] = v
+        self._changed()
+
+    def __delattr__(self, k):
+        try:
+            del self.__dict__[k]
+        except KeyError:
+            raise AttributeError(k) from None
+        self._changed()
+
+    def __len__(self) -> int:
+        return len(self.__dict__)
+
+    def __contains__(self, k) -> bool:
+        return k in self.__dict__
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.__dict__)
+
+    def items(self):
+        return self.__dict__.items()
+
+    def get(self, k, default=None):
+        return self.__dict__.get(k, default)
+
+    def update(self, other):
+        if isinstance(other, Attrib):
+            other = other.__dict__
+        if other:
+            self.__dict__.update(other)
+            self._changed()
+
+    def pop(self, k, *default):
+        if k not in self.__dict__:
+            return self.__dict__.pop(k, *default)
+        v = self.__dict__.pop(k)
+        self._changed()
+        return v
+
+    def _setOwner(self, owner):
+        _set(self, "_owner", owner)
+
+    def _changed(self):
+        if self._owner is not None:
+            self._owner._invalidate()
+
     def __add__(self, other):
         result = self.copy()
-        if isinstance(other, dict):
-            for k, v in other.items():
-                result.__dict__[k] = v
-        else:
-            for k, v in other.__dict__.items():
-                result.__dict__[k] = v
+        result.__dict__.update(other.__dict__ if isinstance(other, Attrib) else other)
         return result
 
     def copy(self):
-        return copy.copy(self)
+        return self._copyFor(None)
+
+    __copy__ = copy
+
+    def _copyFor(self, owner):
+        result = Attrib.__new__(type(self))
+        _set(result, "_owner", owner)
+        result.__dict__.update(self.__dict__)
+        return result
+
+    def __getstate__(self):
+        # The owner is not pickled, it sets itself again when unpickled.
+        return dict(self.__dict__)
+
+    def __setstate__(self, state):
+        _set(self, "_owner", None)
+        self.__dict__.update(state)
 
     def __str__(self) -> str:
         s = []
@@ -30,17 +106,271 @@ class Attrib:
         return " ".join(s)
 
 
+class StyleRef:
+    # A style value kept by name, e.g. ASVGStyle.ref("emph"), and looked up
+    # in the theme of the serializer when drawn. A theme is a StyleSet class
+    # or instance, or a dict; without one the default is written.
+    __slots__ = ("name", "default")
+
+    def __init__(self, name: str, default=None):
+        self.name = name
+        self.default = default
+
+    def resolve(self, theme=None):
+        if theme is not None:
+            if isinstance(theme, dict):
+                v = theme.get(self.name)
+            else:
+                v = getattr(theme, self.name, None)
+            if v is not None:
+                return v
+        if self.default is None:
+            raise KeyError(f"no style {self.name!r} in the theme")
+        return self.default
+
+    def svgFormat(self, serializer) -> str:
+        return serializer.themeValue(self)
+
+    def __str__(self) -> str:
+        return f"{self.resolve()}"
+
+    def __float__(self) -> float:
+        return float(self.resolve())
+
+    def __eq__(self, other) -> bool:
+        return (other.__class__ is StyleRef and self.name == other.name
+                and self.default == other.default)
+
+    def __hash__(self) -> int:
+        return hash((self.name, self.default))
+
+    def __repr__(self) -> str:
+        return f"StyleRef({self.name!r}, {self.default!r})"
+
+
 SVGLines = List[str]
 
 
+_STALE = object()
+
+
 class SVGMaker:
+    # A fragment, or fragments by theme when they resolve style references.
+    _fragment: Union[Tuple[int, tuple, list], Dict[object, tuple], None] = None
+    _symbolKey: Optional[Tuple[tuple, bytes]] = None
+    # Markers made by arrowMarker, written first among the children of an
+    # axis but not one of its elements.
+    _markerDefs: Optional["SVGMaker"] = None
+    _bbox = _STALE
+    _index: Optional[GridIndex] = None
+
+    svgOpaque = False
+    svgLeaf = False
+    svgIndentChildren = True
+    svgCacheable = False
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if "makeSVG" in cls.__dict__ and "svgTag" not in cls.__dict__ and "svgChildren" not in cls.__dict__:
+            cls.svgOpaque = True
+
+    def svgTag(self) -> Optional[Tuple[str, Attrib]]:
+        return None
+
+    def svgChildren(self) -> Iterable[Union["SVGMaker", str]]:
+        return ()
+
+    def svgLines(self, serializer, indent: int) -> Iterable[str]:
+        return self.makeSVG(indent)
+
     def makeSVG(self, indent: int = 0) -> SVGLines:
-        return []
+        from .serializer import Serializer
+        return Serializer().makeSVG(self, indent)
+
+    def iterSVG(self, indent: int = 0, cache: bool = False) -> Iterator[str]:
+        from .serializer import Serializer
+        return Serializer(cache=cache).iterLines(self, indent)
+
+    def bbox(self) -> Optional[BBox]:
+        box = self._bbox
+        if box is _STALE:
+            attrib = getattr(self, "attrib", None)
+            if attrib is not None and not bounds.UNBOUNDED.isdisjoint(attrib):
+                box = None
+            else:
+                try:
+                    box = self._bounds()
+                except (TypeError, ValueError):
+                    box = None
+            self._bbox = box
+        return box
+
+    def inkBBox(self) -> Optional[BBox]:
+        box = self.bbox()
+        if box is None:
+            return None
+        # Markers made by arrowMarker are kept, with their extents, in the
+        # defs of the axis.
+        defs = getattr(getattr(self, "_parent", None), "_markerDefs", None)
+        return bounds.strokeBounds(box, getattr(self, "attrib", None),
+                                   getattr(defs, "extents", None))
+
+    def _bounds(self) -> Optional[BBox]:
+        return None
+
+    def _dirtyParent(self) -> Optional["SVGMaker"]:
+        return None
+
+    def _invalidate(self):
+        node = self
+        child = None
+        while node is not None:
+            node._fragment = None
+            node._symbolKey = None
+            node._bbox = _STALE
+            if child is not None and node._index is not None:
+                node._index.update(child)
+            child = node
+            node = node._dirtyParent()
+
+
+class LevelBuckets:
+    def __init__(self):
+        self._levels = []
+        self._buckets = {}
+        self._where = {}
+        self._unsorted = set()
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, element) -> bool:
+        return element in self._where
+
+    def __iter__(self) -> Iterator["Element"]:
+        for level in self._levels:
+            if level in self._unsorted:
+                self._sortBucket(level)
+            yield from self._buckets[level]
+
+    def __getitem__(self, i: Union[int, slice]) -> Union["Element", List["Element"]]:
+        # Indexes in drawing order, as Axis.elements did when it was a list;
+        # it walks the elements, so it is not meant for loops.
+        if isinstance(i, slice):
+            return list(self)[i]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("element index out of range")
+        return next(islice(iter(self), i, None))
+
+    def last(self, level: int) -> Optional["Element"]:
+        if level not in self._buckets:
+            return None
+        if level in self._unsorted:
+            self._sortBucket(level)
+        return next(reversed(self._buckets[level]))
+
+    def ordered(self, elements: Iterable["Element"]) -> List["Element"]:
+        where = self._where
+        buckets = self._buckets
+        return sorted(elements, key=lambda e: (where[e], buckets[where[e]][e]))
+
+    def append(self, element: "Element"):
+        if element in self._where:
+            self.remove(element)
+        self._insert(element, self._seq)
+        self._seq += 1
+
+    def remove(self, element: "Element"):
+        if element not in self._where:
+            raise ValueError("element is not in this axis")
+        self._pop(element, self._where[element])
+
+    def replace(self, old: "Element", new: "Element"):
+        # new takes the place of old, which has the same level.
+        self._insert(new, self._pop(old, self._where[old]))
+
+    def copy(self) -> "LevelBuckets":
+        result = LevelBuckets.__new__(LevelBuckets)
+        result._levels = list(self._levels)
+        result._buckets = {level: dict(bucket) for level, bucket in self._buckets.items()}
+        result._where = dict(self._where)
+        result._unsorted = set(self._unsorted)
+        result._seq = self._seq
+        return result
+
+    def relevel(self, element: "Element", seq: Optional[int] = None):
+        # Keeps the insertion order of the element, or places it at seq.
+        level = self._where[element]
+        if level != element.level or seq is not None:
+            old = self._pop(element, level)
+            self._insert(element, old if seq is None else seq)
+
+    def seq(self, element: "Element") -> int:
+        return self._buckets[self._where[element]][element]
+
+    def reserve(self) -> int:
+        # A sequence number for something added without an element of its
+        # own, like a row of a table.
+        self._seq += 1
+        return self._seq - 1
+
+    def before(self, level: int, seq: int) -> Optional["Element"]:
+        # The last element of level added no later than seq.
+        bucket = self._buckets.get(level)
+        if bucket is None:
+            return None
+        if level in self._unsorted:
+            self._sortBucket(level)
+        for element in reversed(bucket):
+            if bucket[element] <= seq:
+                return element
+        return None
+
+    def _insert(self, element: "Element", seq: int):
+        level = element.level
+        bucket = self._buckets.get(level)
+        if bucket is None:
+            bucket = self._buckets[level] = {}
+            insort(self._levels, level)
+        elif seq < next(reversed(bucket.values())):
+            self._unsorted.add(level)
+        bucket[element] = seq
+        self._where[element] = level
+
+    def _pop(self, element: "Element", level: int) -> int:
+        del self._where[element]
+        bucket = self._buckets[level]
+        seq = bucket.pop(element)
+        if not bucket:
+            del self._buckets[level]
+            del self._levels[bisect_left(self._levels, level)]
+            self._unsorted.discard(level)
+        return seq
+
+    def _sortBucket(self, level: int):
+        bucket = self._buckets[level]
+        self._buckets[level] = dict(sorted(bucket.items(), key=lambda item: item[1]))
+        self._unsorted.discard(level)
 
 
 class Axis(SVGMaker):
-    def __init__(self, size: Tuple[float, float], viewBox: Optional[Tuple[float, float, float, float]] = None):
+    # After clone(), elements are shared between the copies, and _private
+    # holds the ones this axis may change in place. _copies maps shared
+    # elements to the copies that replaced them here.
+    _private: Optional[set] = None
+    _copies: Optional[dict] = None
+
+    def __init__(
+        self,
+        size: Tuple[float, float],
+        viewBox: Optional[Tuple[float, float, float, float]] = None,
+        columnar: bool = False
+    ):
         self.size = size
+        self.columnar = columnar
         self.w, self.h = size
         self.attrib = Attrib(
             xmlns="http://www.w3.org/2000/svg",
@@ -48,54 +378,267 @@ class Axis(SVGMaker):
             height=self.h)
         if viewBox is not None:
             self.attrib.viewBox = " ".join(map(str, viewBox))
+        self.attrib._setOwner(self)
+        self._owner = None
+
+        self.elements = LevelBuckets()
 
-        self.elements = []
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.attrib._setOwner(self)
 
     def addElement(self, element, shift: Tuple[float, float] = (0, 0)):
         if element.axis != self:
             element.axis.setShift(shift)
         self.elements.append(element)
+        element._parent = self
+        if self._private is not None:
+            self._private.add(element)
+        if self._index is not None:
+            self._index.update(element)
+        self._invalidate()
 
     def removeElement(self, element):
         self.elements.remove(element)
+        if element._parent is self:
+            element._parent = None
+        if self._private is not None:
+            self._private.discard(element)
+        if self._index is not None:
+            self._index.remove(element)
+        self._invalidate()
+
+    def clone(self) -> "Axis":
+        # A copy-on-write copy. Elements are shared with this axis until
+        # own() replaces them here, and the path to them, by copies.
+        return self._cloneFor(None)
+
+    def _cloneFor(self, owner: Optional["Element"]) -> "Axis":
+        axis = object.__new__(type(self))
+        axis.__dict__.update(self.__dict__)
+        axis.attrib = self.attrib._copyFor(axis)
+        axis.elements = self.elements.copy()
+        axis._owner = owner
+        axis._index = None
+        axis._copies = dict(self._copies) if self._copies else {}
+        if isinstance(axis._fragment, dict):
+            axis._fragment = dict(axis._fragment)
+        self._private = set()
+        if self._copies is None:
+            self._copies = {}
+        axis._private = set()
+        return axis
+
+    def owns(self, element: "Element") -> bool:
+        return self._private is None or element in self._private
+
+    def own(self, element: "Element") -> "Element":
+        # Returns the element as this axis may change it: an element shared
+        # with a clone is replaced by a copy, and so are the ComposedElements
+        # holding it. element may be taken from this axis or from a clone.
+        path = [element]
+        node = element
+        while node._parent is not None and node._parent is not self:
+            owner = node._parent._owner
+            if owner is None:
+                break
+            path.append(owner)
+            node = owner
+        for start in range(len(path) - 1, -1, -1):
+            if self._current(path[start]) is not None:
+                break
+        else:
+            raise ValueError("element is not in this axis")
+        axis = self
+        for node in reversed(path[:start + 1]):
+            current = axis._current(node)
+            if current is None:
+                raise ValueError("element is not in this axis")
+            if not axis.owns(current):
+                current = axis._adopt(current)
+            axis = current.axis
+        return current
+
+    def _current(self, element: "Element") -> Optional["Element"]:
+        copies = self._copies or {}
+        while element is not None and element not in self.elements:
+            element = copies.get(element)
+        return element
+
+    def _adopt(self, element: "Element") -> "Element":
+        copy = element._copy(self)
+        self.elements.replace(element, copy)
+        self._private.add(copy)
+        self._copies[element] = copy
+        if self._index is not None:
+            self._index.remove(element)
+            self._index.update(copy)
+        self._invalidate()
+        return copy
+
+    def index(self) -> GridIndex:
+        if self._index is None:
+            self._index = GridIndex(self.elements, self.userSize())
+        return self._index
+
+    def userSize(self) -> Tuple[float, float]:
+        # The width and height of the axis in user units, from its viewBox.
+        viewBox = self.attrib.get("viewBox")
+        if viewBox is not None:
+            try:
+                _, _, w, h = map(float, str(viewBox).replace(",", " ").split())
+                return w, h
+            except ValueError:
+                pass
+        return self.w, self.h
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> List["Element"]:
+        box = x0, y0, x1, y1
+        found = self.index().query(box)
+        return self.elements.ordered(
+            e for e in found if e.bbox() is None or bounds.intersects(e.bbox(), box))
+
+    def visible(self, region: BBox) -> List["Element"]:
+        return self.elements.ordered(self.index().query(region))
+
+    def queryPoint(self, x: float, y: float) -> List["Element"]:
+        return self.query(x, y, x, y)
+
+    def contentBBox(self) -> Optional[BBox]:
+        return bounds.union(e.bbox() for e in self.elements)
+
+    def _bounds(self) -> Optional[BBox]:
+        return 0, 0, bounds.number(self.w), bounds.number(self.h)
+
+    def _relevel(self, element):
+        self.elements.relevel(element)
+        self._invalidate()
+
+    def _dirtyParent(self) -> Optional[SVGMaker]:
+        return self._owner
 
     def setShift(self, shift: Tuple[float, float]):
         self.attrib.x, self.attrib.y = shift
-        del self.attrib.xmlns
+        self.attrib.pop("xmlns", None)
 
-    def makeSVG(self, indent: int = 0) -> SVGLines:
-        result = [
-            " " * indent + f"<svg {self.attrib}>"]
-        self.elements.sort(key=lambda e: e.level, reverse=False)
-        for e in self.elements:
-            result.extend(e.makeSVG(indent + INDENT))
-        result.append(" "*indent + "</svg>")
-        return result
+    svgCacheable = True
+
+    def svgTag(self) -> Optional[Tuple[str, Attrib]]:
+        return "svg", self.attrib
+
+    def svgChildren(self) -> Iterable["Element"]:
+        return self.elements
 
 
 class Element(SVGMaker):
-    def __init__(self, axis: Axis, level: int, attrib: Attrib = Attrib()):
+    _parent: Optional[Axis] = None
+
+    svgCacheable = True
+
+    def __init__(self, axis: Axis, level: int, attrib: Attrib = Attrib(), **kwargs):
         self.axis = axis
         self.level = level
-        self.attrib = attrib.copy()
+        self.attrib = attrib._copyFor(self)
+        if kwargs:
+            self.attrib.__dict__.update(kwargs)
 
         axis.addElement(self)
 
-    def makeSVG(self, indent: int = 0) -> SVGLines:
-        return []
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.attrib._setOwner(self)
+
+    @property
+    def level(self) -> int:
+        return self._level
+
+    @level.setter
+    def level(self, level: int):
+        self._level = level
+        if self._parent is not None:
+            self._parent._relevel(self)
+
+    def _dirtyParent(self) -> Optional[SVGMaker]:
+        return self._parent
+
+    def _copy(self, parent: Optional[Axis]) -> "Element":
+        # A shallow copy, sharing values with this element until they are
+        # replaced. Elements with an axis of their own get a clone of it.
+        e = object.__new__(type(self))
+        e.__dict__.update(self.__dict__)
+        e.attrib = self.attrib._copyFor(e)
+        e._parent = parent
+        e.axis = self.axis._cloneFor(e) if self.axis._owner is self else parent
+        if isinstance(e._fragment, dict):
+            e._fragment = dict(e._fragment)
+        return e
 
 
 class ComposedElement(Element):
     def __init__(self, size: Tuple[float, float], level: int, attrib: Attrib = Attrib()):
         super(ComposedElement, self).__init__(Axis(size), level, attrib)
         self.axis.removeElement(self)
+        self.axis._owner = self
 
     def addElement(self, element, shift: Tuple[float, float] = (0, 0)):
         self.axis.addElement(element, shift)
 
-    def makeSVG(self, indent: int = 0) -> SVGLines:
-        svg = self.axis.makeSVG(indent)
-        if len(self.attrib.__dict__):
-            svg.insert(1, " " * indent + f"<g {self.attrib}>")
-            svg.insert(-1, " " * indent + f"</g>")
-        return svg
+    def clone(self) -> "ComposedElement":
+        # A copy-on-write copy that is in no axis yet.
+        return self._copy(None)
+
+    def own(self, element: Element) -> Element:
+        return self.axis.own(element)
+
+    def query(self, x0: float, y0: float, x1: float, y1: float) -> List[Element]:
+        return self.axis.query(x0, y0, x1, y1)
+
+    def queryPoint(self, x: float, y: float) -> List[Element]:
+        return self.axis.queryPoint(x, y)
+
+    def contentBBox(self) -> Optional[BBox]:
+        return self.axis.contentBBox()
+
+    def inkBBox(self) -> Optional[BBox]:
+        if self.axis.attrib.get("overflow") == "visible":
+            return super(ComposedElement, self).inkBBox()
+        return self.bbox()
+
+    def _bounds(self) -> Optional[BBox]:
+        attrib = self.axis.attrib
+        dx = bounds.number(attrib.get("x", 0))
+        dy = bounds.number(attrib.get("y", 0))
+        if attrib.get("overflow") == "visible":
+            return bounds.shift(self.contentBBox(), dx, dy)
+        return dx, dy, dx + bounds.number(self.axis.w), dy + bounds.number(self.axis.h)
+
+    @property
+    def _markerDefs(self) -> Optional[SVGMaker]:
+        # With attributes of its own, the markers go in the <g> holding them.
+        return None if len(self.attrib) else self.axis._markerDefs
+
+    @property
+    def svgIndentChildren(self) -> bool:
+        return not len(self.attrib)
+
+    def svgTag(self) -> Optional[Tuple[str, Attrib]]:
+        return "svg", self.axis.attrib
+
+    def svgChildren(self) -> Iterable[SVGMaker]:
+        if len(self.attrib):
+            return (_Group(self.attrib, self.axis.elements, self.axis._markerDefs),)
+        return self.axis.elements
+
+
+class _Group(SVGMaker):
+    def __init__(self, attrib: Attrib, elements: Iterable[Element],
+                 markerDefs: Optional[SVGMaker] = None):
+        self.attrib = attrib
+        self.elements = elements
+        self._markerDefs = markerDefs
+
+    def svgTag(self) -> Optional[Tuple[str, Attrib]]:
+        return "g", self.attrib
+
+    def svgChildren(self) -> Iterable[Element]:
+        return self.elements
@@ -0,0 +1,95 @@
+from typing import Any, Union
+
+import numpy as np
+
+from . import core
+
+# Points kept per pixel column by lttb, about as many as minMax keeps on
+# average for a line that goes up and down in most columns.
+LTTB_PER_COLUMN = 2
+
+
+def asPairs(points: Any) -> np.ndarray:
+    if hasattr(points, "coords"):
+        points = points.coords
+    xy = np.asarray(points, dtype=float).reshape(-1, 2)
+    if not np.isfinite(xy).all():
+        raise ValueError("points to decimate must be finite")
+    if (np.diff(xy[:, 0]) < 0).any():
+        raise ValueError("points to decimate must be sorted by x")
+    return xy
+
+
+def columnWidth(axis: core.Axis) -> float:
+    # The width of a pixel column in user units, for an Axis drawn at its
+    # own size.
+    viewBox = axis.attrib.get("viewBox")
+    if viewBox is None:
+        return 1.0
+    _, _, w, h = (float(v) for v in str(viewBox).replace(",", " ").split())
+    return max(w / axis.w, h / axis.h)
+
+
+def minMax(xy: np.ndarray, width: float) -> np.ndarray:
+    # Keeps the first, lowest, highest and last point of every pixel column,
+    # in order, so the line covers the same pixels as all of the points.
+    n = len(xy)
+    if n <= 4:
+        return xy
+    column = np.floor((xy[:, 0] - xy[0, 0]) / width).astype(np.int64)
+    starts = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+    if len(starts) * 4 >= n:
+        return xy
+    ends = np.r_[starts[1:], n] - 1
+    y = xy[:, 1]
+    keep = [starts, ends]
+    segment = np.repeat(np.arange(len(starts)), ends - starts + 1)
+    for reduce in (np.minimum, np.maximum):
+        # The first point of every column at its lowest or highest y.
+        at = np.flatnonzero(y == reduce.reduceat(y, starts)[segment])
+        keep.append(at[np.r_[True, segment[at][1:] != segment[at][:-1]]])
+    keep = np.unique(np.concatenate(keep))
+    return xy[keep]
+
+
+def lttb(xy: np.ndarray, count: int) -> np.ndarray:
+    # Largest-Triangle-Three-Buckets: the first and last point, and from
+    # every bucket between them the point making the largest triangle with
+    # the point kept before it and the mean of the next bucket.
+    n = len(xy)
+    if count >= n or count < 3:
+        return xy
+    edges = np.linspace(1, n - 1, count - 1).astype(np.int64)
+    keep = np.empty(count, dtype=np.int64)
+    keep[0] = 0
+    keep[-1] = n - 1
+    previous = xy[0]
+    for i in range(count - 2):
+        start, end = edges[i], edges[i + 1]
+        after = xy[end:edges[i + 2]] if i + 2 < len(edges) else xy[n - 1:]
+        mean = after.mean(axis=0)
+        bucket = xy[start:end]
+        area = np.abs((previous[0] - mean[0]) * (bucket[:, 1] - previous[1]) -
+                      (previous[0] - bucket[:, 0]) * (mean[1] - previous[1]))
+        j = start + int(area.argmax())
+        keep[i + 1] = j
+        previous = xy[j]
+    return xy[keep]
+
+
+def decimated(points: Any, axis: Union[core.Axis, core.ComposedElement], mode: str) -> np.ndarray:
+    # The points of a line sorted by x, thinned to what the pixel columns of
+    # axis can show: "minmax" keeps every extreme, "lttb" keeps the shape with
+    # a fixed number of points.
+    if isinstance(axis, core.ComposedElement):
+        axis = axis.axis
+    xy = asPairs(points)
+    width = columnWidth(axis)
+    if mode == "minmax":
+        return minMax(xy, width)
+    if mode == "lttb":
+        if not len(xy):
+            return xy
+        columns = int((xy[-1, 0] - xy[0, 0]) / width) + 1
+        return lttb(xy, LTTB_PER_COLUMN * columns)
+    raise ValueError(f"unknown decimation {mode!r}, expected 'minmax' or 'lttb'")
@@ -0,0 +1,102 @@
+import os
+import time
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Iterable, List, Optional, Tuple
+
+from . import core
+from .painter import BasePainter, DefaultPainter, openOutput
+
+# Chunks in flight per worker: enough to keep the workers busy while frames
+# are written, without holding the results of all frames.
+WINDOW = 4
+
+
+class FrameTiming:
+    def __init__(self, index: int, file: str, buildTime: float, renderTime: float, writeTime: float):
+        self.index = index
+        self.file = file
+        self.buildTime = buildTime
+        self.renderTime = renderTime
+        self.writeTime = writeTime
+
+    @property
+    def totalTime(self) -> float:
+        return self.buildTime + self.renderTime + self.writeTime
+
+    def __repr__(self) -> str:
+        return (f"FrameTiming(index={self.index}, file={self.file!r}, "
+                f"build={self.buildTime:.4f}s, render={self.renderTime:.4f}s, "
+                f"write={self.writeTime:.4f}s)")
+
+
+def _renderFrame(
+    job: Tuple[Callable[[Any], core.Axis], BasePainter, int, Any]
+) -> Tuple[int, Any, float, float]:
+    factory, painter, index, param = job
+    start = time.perf_counter()
+    axis = factory(param)
+    built = time.perf_counter()
+    s = painter(axis)
+    if isinstance(s, Iterator):
+        # Chunks of a streaming painter are joined here, as a generator
+        # cannot be sent back from a worker.
+        s = "".join(s)
+    return index, s, built - start, time.perf_counter() - built
+
+
+def _renderChunk(jobs: list) -> list:
+    return [_renderFrame(job) for job in jobs]
+
+
+def renderFrames(
+    factory: Callable[[Any], core.Axis],
+    params: Iterable[Any],
+    outPattern: str,
+    workers: Optional[int] = None,
+    chunkSize: int = 1,
+    onFrame: Optional[Callable[[FrameTiming], None]] = None,
+    painter: Optional[BasePainter] = None
+) -> List[FrameTiming]:
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if painter is None:
+        painter = DefaultPainter()
+    jobs = ((factory, painter, i, p) for i, p in enumerate(params))
+
+    timings = []
+
+    def write(result):
+        index, s, buildTime, renderTime = result
+        file = outPattern.format(index)
+        start = time.perf_counter()
+        if isinstance(s, str):
+            # Written like the painter writes a file: compressed for .svgz
+            # or when the painter compresses.
+            with openOutput(file, getattr(painter, "compress", None)) as fout:
+                fout.write(s)
+        else:
+            painter.write(s, file)
+        timing = FrameTiming(index, file, buildTime, renderTime,
+                             time.perf_counter() - start)
+        timings.append(timing)
+        if onFrame is not None:
+            onFrame(timing)
+
+    if workers <= 1:
+        for job in jobs:
+            write(_renderFrame(job))
+    else:
+        chunks = iter(lambda: list(islice(jobs, chunkSize)), [])
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = deque(executor.submit(_renderChunk, chunk)
+                            for chunk in islice(chunks, WINDOW * workers))
+            while pending:
+                results = pending.popleft().result()
+                for chunk in islice(chunks, 1):
+                    pending.append(executor.submit(_renderChunk, chunk))
+                for result in results:
+                    write(result)
+    return timings
@@ -1,6 +1,11 @@
 from ASVG.core import *
 from ASVG.basicElements import *
+from ASVG.basicElements import _points
+from ASVG import bounds
+from ASVG.batch import BatchElement, lines
+from ASVG.serializer import Node
 
+import hashlib
 import math
 
 
@@ -27,6 +32,8 @@ def arrowTip(
             kwargs["fill"] = fill
 
     angle *= math.pi / 360.0
+    cos = math.cos(angle)
+    sin = math.sin(angle)
     dx = fromX - x
     dy = fromY - y
 
@@ -34,11 +41,11 @@ def arrowTip(
     dx *= size / l
     dy *= size / l
 
-    dx1 = dx * math.cos(angle) - dy * math.sin(angle)
-    dy1 = dx * math.sin(angle) + dy * math.cos(angle)
+    dx1 = dx * cos - dy * sin
+    dy1 = dx * sin + dy * cos
 
-    dx2 = dx * math.cos(angle) + dy * math.sin(angle)
-    dy2 = - dx * math.sin(angle) + dy * math.cos(angle)
+    dx2 = dx * cos + dy * sin
+    dy2 = - dx * sin + dy * cos
 
     c0 = (x, y)
     c1 = (x + dx1, y + dy1)
@@ -54,6 +61,73 @@ def arrowTip(
         line(axis, level, x, y, c2[0], c2[1], **kwargs)
 
 
+class MarkerDefs(core.SVGMaker):
+    # The <defs> of the markers of an axis. It is written by the serializer
+    # before the elements of the axis, but is not one of them, so it has no
+    # place in their order, bounds or index.
+    def __init__(self, axis: core.Axis, shared: Optional["MarkerDefs"] = None):
+        self.axis = axis
+        self.markers = list(shared.markers) if shared is not None else []
+        self.ids = dict(shared.ids) if shared is not None else {}
+        self.extents = dict(shared.extents) if shared is not None else {}
+
+    def svgTag(self):
+        return "defs", None
+
+    def svgChildren(self):
+        return self.markers
+
+    def _invalidate(self):
+        self._fragment = None
+        self.axis._invalidate()
+
+
+def arrowMarker(
+    axis: Union[core.Axis, core.ComposedElement],
+    size: float = 10.0,
+    angle: float = 60.0,
+    filled: bool = True,
+    **kwargs
+) -> str:
+    if isinstance(axis, core.ComposedElement):
+        axis = axis.axis
+    color = kwargs.get("stroke", "#000000")
+    if filled:
+        fill = kwargs.get("fill", color)
+    else:
+        fill = "none"
+    strokeWidth = kwargs.get("stroke_width", 1)
+    key = size, angle, filled, color, fill, strokeWidth
+    defs = axis._markerDefs
+    if defs is None or defs.axis is not axis or not axis.owns(defs):
+        # A clone of an axis shares its defs until either adds a marker.
+        defs = axis._markerDefs = MarkerDefs(axis, defs)
+        if axis._private is not None:
+            axis._private.add(defs)
+    markerId = defs.ids.get(key)
+    if markerId is None:
+        # Named by their style, so that the same picture always gets the same
+        # ids, and markers of nested axes with the same id are the same.
+        digest = hashlib.blake2b(repr(key).encode("utf-8"), digest_size=4).hexdigest()
+        markerId = defs.ids[key] = f"asvg-arrow-{digest}"
+        angle *= math.pi / 360.0
+        dx = -size * math.cos(angle)
+        dy = size * math.sin(angle)
+        if filled:
+            tip = Node("polygon", Attrib(points=f"0 0, {dx} {dy}, {dx} {-dy}", fill=fill),
+                       leaf=True)
+        else:
+            tip = Node("polyline", Attrib(points=f"{dx} {dy}, 0 0, {dx} {-dy}", fill="none",
+                                          stroke=color, stroke_width=strokeWidth),
+                       leaf=True)
+        defs.markers.append(Node("marker", Attrib(
+            id=markerId, markerUnits="userSpaceOnUse", orient="auto",
+            overflow="visible", refX=0, refY=0), (tip,)))
+        defs._invalidate()
+        defs.extents[f"url(#{markerId})"] = size + strokeWidth
+    return f"url(#{markerId})"
+
+
 def arrow(
     axis: Union[core.Axis, core.ComposedElement],
     level: int,
@@ -64,22 +138,114 @@ def arrow(
     tipSize: float = 10.0,
     tipAngle: float = 60.0,
     tipFilled: bool = True,
+    marker: bool = False,
     **kwargs
 ):
+    if marker:
+        line(axis, level, fromX, fromY, x, y,
+             marker_end=arrowMarker(axis, tipSize, tipAngle, tipFilled, **kwargs), **kwargs)
+        return
     arrowTip(axis, level, x, y, fromX, fromY,
              tipSize, tipAngle, tipFilled, **kwargs)
     line(axis, level, x, y, fromX, fromY, **kwargs)
 
 
+def _columns(points):
+    if hasattr(points, "tolist"):
+        points = points.tolist()
+    xs = [p[0] for p in points]
+    ys = [p[1] for p in points]
+    return xs, ys
+
+
+def _tipCorners(xs, ys, fromXs, fromYs, size: float, angle: float):
+    # Returns the x and y columns of both side corners of every tip.
+    angle *= math.pi / 360.0
+    cos = math.cos(angle)
+    sin = math.sin(angle)
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+    if numpy is not None:
+        x = numpy.asarray(xs, dtype=float)
+        y = numpy.asarray(ys, dtype=float)
+        dx = numpy.asarray(fromXs, dtype=float) - x
+        dy = numpy.asarray(fromYs, dtype=float) - y
+        scale = size / numpy.hypot(dx, dy)
+        dx *= scale
+        dy *= scale
+        return ((x + dx * cos - dy * sin).tolist(), (y + dx * sin + dy * cos).tolist(),
+                (x + dx * cos + dy * sin).tolist(), (y - dx * sin + dy * cos).tolist())
+    x1s, y1s, x2s, y2s = [], [], [], []
+    for x, y, fromX, fromY in zip(xs, ys, fromXs, fromYs):
+        dx = fromX - x
+        dy = fromY - y
+        l = math.sqrt(dx * dx + dy * dy)
+        dx *= size / l
+        dy *= size / l
+        x1s.append(x + dx * cos - dy * sin)
+        y1s.append(y + dx * sin + dy * cos)
+        x2s.append(x + dx * cos + dy * sin)
+        y2s.append(y - dx * sin + dy * cos)
+    return x1s, y1s, x2s, y2s
+
+
+def arrows(
+    axis: Union[core.Axis, core.ComposedElement],
+    level: int,
+    tips,
+    froms,
+    tipSize: float = 10.0,
+    tipAngle: float = 60.0,
+    tipFilled: bool = True,
+    marker: bool = False,
+    **kwargs
+) -> List[core.Element]:
+    x, y = _columns(tips)
+    fromX, fromY = _columns(froms)
+    if len(x) != len(fromX):
+        raise ValueError(f"{len(x)} tips but {len(fromX)} tails")
+    if marker:
+        return [lines(axis, level, fromX, fromY, x, y,
+                      marker_end=arrowMarker(axis, tipSize, tipAngle, tipFilled, **kwargs),
+                      **kwargs)]
+
+    x1, y1, x2, y2 = _tipCorners(x, y, fromX, fromY, tipSize, tipAngle)
+    if tipFilled:
+        tipKwargs = kwargs
+        if "fill" not in kwargs:
+            tipKwargs = dict(fill=kwargs.get("stroke", "#000000"), **kwargs)
+        points = [f"{a} {b}, {c} {d}, {e} {f}" for a, b, c, d, e, f in zip(x, y, x1, y1, x2, y2)]
+        tipElements = [BatchElement(SVGType="polygon", axis=axis, level=level, points=points,
+                                    attrib=Attrib(), **tipKwargs)]
+    else:
+        tipKwargs = dict(kwargs)
+        if "fill" in tipKwargs:
+            tipKwargs["fill"] = "transparent"
+        tipElements = [lines(axis, level, x + x, y + y, x1 + x2, y1 + y2, **tipKwargs)]
+    return tipElements + [lines(axis, level, x, y, fromX, fromY, **kwargs)]
+
+
 def polyArrow(
     axis: Union[core.Axis, core.ComposedElement],
     level: int,
-    points: List[Tuple[float, float]],
+    points: Union[List[Tuple[float, float]], Points, Any],
     tipSize: float = 10.0,
     tipAngle: float = 60.0,
     tipFilled: bool = True,
+    marker: bool = False,
+    decimate: Optional[str] = None,
     **kwargs
 ):
-    polyline(axis, level, points, **kwargs)
+    # The tip follows the last segment drawn, which decimation may change.
+    drawn = _points(axis, points, decimate)
+    if marker:
+        polyline(axis, level, drawn,
+                 marker_end=arrowMarker(axis, tipSize, tipAngle, tipFilled, **kwargs), **kwargs)
+        return
+    polyline(axis, level, drawn, **kwargs)
+    if isinstance(drawn, Points):
+        points = drawn
     arrowTip(axis, level, points[-1][0], points[-1][1], points[-2][0], points[-2][1],
              tipSize, tipAngle, tipFilled, **kwargs)
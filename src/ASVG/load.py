@@ -0,0 +1,282 @@
+import os
+import re
+from typing import Dict, IO, List, Optional, Tuple, Union
+from xml.etree.ElementTree import iterparse
+
+from . import bounds, core
+from .basicElements import BasicElement, shapeBounds
+from .painter import openInput
+from .serializer import Node
+from .text import Text, TextGroup, TextSpan
+
+SVG = "http://www.w3.org/2000/svg"
+XML = "http://www.w3.org/XML/1998/namespace"
+
+_GROUPS = {"g", "a", "switch"}
+_SHAPES = {"rect", "circle", "ellipse", "line", "polyline", "polygon", "path"}
+_SPACES = re.compile(r"[ \t]+")
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+
+
+class Group(core.Element):
+    # A g, a or switch element. Like a ComposedElement, it keeps its
+    # children in an axis of its own, so elements are added to group.axis.
+    def __init__(
+        self,
+        axis: Union[core.Axis, core.ComposedElement, "Group"],
+        level: int,
+        SVGType: str = "g",
+        attrib: core.Attrib = core.Attrib()
+    ):
+        if not isinstance(axis, core.Axis):
+            axis = axis.axis
+        super(Group, self).__init__(core.Axis((0, 0)), level, attrib)
+        self.axis.removeElement(self)
+        self.axis._owner = self
+        self.SVGType = SVGType
+        axis.addElement(self)
+
+    def addElement(self, element, shift: Tuple[float, float] = (0, 0)):
+        self.axis.addElement(element, shift)
+
+    def _bounds(self) -> Optional[bounds.BBox]:
+        return self.axis.contentBBox()
+
+    def inkBBox(self) -> Optional[bounds.BBox]:
+        if self.bbox() is None:
+            return None
+        box = bounds.union(e.inkBBox() for e in self.axis.elements)
+        if box is None:
+            return None
+        return bounds.strokeBounds(box, self.attrib)
+
+    def svgTag(self) -> Optional[Tuple[str, core.Attrib]]:
+        return self.SVGType, self.attrib
+
+    def svgChildren(self) -> List[core.Element]:
+        return self.axis.elements
+
+
+class RawElement(core.Element):
+    # Any other element of a loaded picture, e.g. defs, use or a shape with
+    # children, with its content kept as nodes.
+    def __init__(self, axis: Union[core.Axis, core.ComposedElement, Group], level: int, node: Node):
+        if not isinstance(axis, core.Axis):
+            axis = axis.axis
+        super(RawElement, self).__init__(axis, level, node.attrib or core.Attrib())
+        self.SVGType = node.tag
+        self.children = node.children
+        self.svgLeaf = node.svgLeaf
+
+    def _bounds(self) -> Optional[bounds.BBox]:
+        return shapeBounds(self.SVGType, self.attrib)
+
+    def svgTag(self) -> Optional[Tuple[str, core.Attrib]]:
+        return self.SVGType, self.attrib
+
+    def svgChildren(self) -> List[Union[Node, str]]:
+        return self.children
+
+
+class _Names(dict):
+    # Maps the qualified names of the parser to prefixed names, or with
+    # keys=True to attribute keys like font_size.
+    def __init__(self, prefixes: Dict[str, str], keys: bool = False):
+        super(_Names, self).__init__()
+        self.prefixes = prefixes
+        self.keys = keys
+
+    def __missing__(self, qname: str) -> str:
+        name = qname
+        if qname[0] == "{":
+            uri, local = qname[1:].split("}", 1)
+            prefix = self.prefixes.get(uri)
+            name = f"{prefix}:{local}" if prefix else local
+        if self.keys:
+            name = name.replace("-", "_")
+        self[qname] = name
+        return name
+
+
+def _number(s: str) -> Optional[Union[int, float]]:
+    if s.endswith("px"):
+        s = s[:-2]
+    try:
+        return int(s)
+    except ValueError:
+        pass
+    try:
+        return float(s)
+    except ValueError:
+        return None
+
+
+def _size(attrib: Dict[str, str]) -> Tuple[float, float]:
+    # The axis size is used for bounds; lengths with units fall back to the
+    # viewBox.
+    w = _number(attrib.get("width", ""))
+    h = _number(attrib.get("height", ""))
+    if w is None or h is None:
+        box = [float(v) for v in _NUMBER.findall(attrib.get("viewBox", ""))]
+        if len(box) == 4:
+            w = box[2] if w is None else w
+            h = box[3] if h is None else h
+    return (300 if w is None else w), (150 if h is None else h)
+
+
+def _setAttrib(axis: core.Axis, attrib: Dict[str, str]):
+    axis.attrib = core.Attrib(**attrib)
+    axis.attrib._setOwner(axis)
+    axis._invalidate()
+
+
+def _fontSize(attrib: core.Attrib) -> bool:
+    size = attrib.get("font_size")
+    if size is None:
+        return True
+    size = _number(size) if isinstance(size, str) else size
+    if size is None:
+        return False
+    attrib.font_size = size
+    return True
+
+
+def _textGroup(children: List[Union[Node, str]]) -> Optional[TextGroup]:
+    # Returns None unless the content is only strings and tspans, which is
+    # what Text can hold.
+    texts = []
+    for child in children:
+        if isinstance(child, str):
+            if "\n" in child:
+                return None
+            texts.append(child)
+        elif child.tag == "tspan" and child.attrib is not None and _fontSize(child.attrib):
+            inner = _textGroup(child.children)
+            if inner is None:
+                return None
+            texts.append(TextSpan(inner, child.attrib))
+        else:
+            return None
+    if not texts:
+        return None
+    return TextGroup(texts)
+
+
+def _element(axis: core.Axis, node: Node) -> core.Element:
+    tag = node.tag
+    if tag in _SHAPES and not node.children and node.attrib is not None:
+        return BasicElement(SVGType=tag, axis=axis, level=0, attrib=node.attrib)
+    if tag == "text" and node.attrib is not None:
+        group = _textGroup(node.children)
+        if group is not None and _fontSize(node.attrib):
+            size = node.attrib.get("font_size")
+            element = Text(axis=axis, level=0, s=group, attrib=node.attrib,
+                           font_size=-1 if size is None else size)
+            if size is None:
+                element.attrib.pop("font_size")
+            return element
+    return RawElement(axis, 0, node)
+
+
+def _content(elem, nodes: List[Node], space: Optional[str]) -> List[Union[Node, str]]:
+    # Text and tails are kept in place; whitespace follows xml:space, and is
+    # only meaningful inside text. There, the serializer writes a space after
+    # every string anyway, so trailing spaces are dropped.
+    if not nodes and not elem.text:
+        return []
+    children = []
+    texts = [elem.text]
+    for child, node in zip(elem, nodes):
+        texts.append(node)
+        texts.append(child.tail)
+    for t in texts:
+        if t is None or t.__class__ is Node:
+            if t is not None:
+                children.append(t)
+            continue
+        if space == "text":
+            t = _SPACES.sub(" ", t.replace("\r", "").replace("\n", "")).rstrip(" ")
+        elif space != "preserve":
+            t = t.strip()
+        if t:
+            children.append(t)
+    return children
+
+
+def load(file: Union[str, os.PathLike, IO[bytes]]) -> core.Axis:
+    # Rebuilds an axis from an SVG file. Nested svg elements become
+    # ComposedElements, groups Groups, shapes BasicElements and text Text
+    # where it fits; everything else is kept as RawElements. Finished
+    # children are dropped from the parse tree, so large files are read
+    # with little more memory than the result.
+    prefixes = {SVG: "", XML: "xml"}
+    names = _Names(prefixes)
+    keys = _Names(prefixes, keys=True)
+    declared = []
+    root = None
+    # Every entry is [axis of a container or None, nodes of the children,
+    # tag, attributes, parse element, whitespace mode].
+    stack = []
+    with openInput(file) as fin:
+        for event, elem in iterparse(fin, events=("start-ns", "start", "end")):
+            if event == "start-ns":
+                prefix, uri = elem
+                prefixes.setdefault(uri, prefix)
+                declared.append(("xmlns:" + prefix if prefix else "xmlns", uri))
+                continue
+
+            if event == "start":
+                tag = names[elem.tag]
+                attrib = {keys[k]: v for k, v in elem.attrib.items()}
+                if declared:
+                    attrib = {**dict(declared), **attrib}
+                    declared.clear()
+
+                if not stack:
+                    if tag != "svg":
+                        raise ValueError(f"not an SVG picture, the root is <{tag}>")
+                    root = core.Axis(_size(attrib))
+                    if "xmlns" not in attrib:
+                        attrib = {"xmlns": SVG, **attrib}
+                    _setAttrib(root, attrib)
+                    stack.append([root, None, tag, attrib, elem, None])
+                    continue
+
+                parent = stack[-1]
+                space = attrib.get("xml:space", parent[5])
+                if space == "default":
+                    space = None
+                if parent[0] is not None and tag == "svg":
+                    composed = core.ComposedElement(_size(attrib), 0)
+                    parent[0].addElement(composed)
+                    _setAttrib(composed.axis, attrib)
+                    stack.append([composed.axis, None, tag, attrib, elem, space])
+                elif parent[0] is not None and tag in _GROUPS:
+                    group = Group(parent[0], 0, tag, core.Attrib(**attrib))
+                    stack.append([group.axis, None, tag, attrib, elem, space])
+                else:
+                    if tag == "text" and space != "preserve":
+                        space = "text"
+                    stack.append([None, [], tag, attrib, elem, space])
+                continue
+
+            axis, nodes, tag, attrib, elem, space = stack.pop()
+            if not stack:
+                break
+            parent = stack[-1]
+            if axis is None:
+                children = _content(elem, nodes, space)
+                if tag == "text" and space == "text" and children and isinstance(children[0], str):
+                    children[0] = children[0].lstrip(" ")
+                    if not children[0]:
+                        del children[0]
+                node = Node(tag, core.Attrib(**attrib), children, leaf=not children)
+                if parent[0] is None:
+                    parent[1].append(node)
+                    continue
+                _element(parent[0], node)
+            # Children of containers are done with once they are built.
+            parent[4].clear()
+    if root is None:
+        raise ValueError("no SVG picture found")
+    return root
@@ -1,26 +1,120 @@
-from os import path
-from typing import Optional
+import gzip
+import io
+import os
+from contextlib import contextmanager, nullcontext
+from typing import Optional, Iterator, Union, IO
 
 from . import core
+from .serializer import Serializer
+
+Output = Union[str, os.PathLike, IO[str]]
+
+
+@contextmanager
+def openOutput(file: Output, compress: Optional[bool] = None) -> Iterator[IO[str]]:
+    isPath = isinstance(file, (str, os.PathLike))
+    if compress is None:
+        compress = isPath and os.fspath(file).endswith(".svgz")
+    if isPath:
+        if compress:
+            with gzip.open(file, "wt", encoding="utf-8") as fout:
+                yield fout
+        else:
+            with open(file, "w", encoding="utf-8") as fout:
+                yield fout
+    elif compress:
+        binary = getattr(file, "buffer", file)
+        with gzip.GzipFile(fileobj=binary, mode="wb") as gz:
+            with io.TextIOWrapper(gz, encoding="utf-8") as fout:
+                yield fout
+    else:
+        with nullcontext(file) as fout:
+            yield fout
+
+
+@contextmanager
+def openInput(file: Union[str, os.PathLike, IO[bytes]]) -> Iterator[IO[bytes]]:
+    if not isinstance(file, (str, os.PathLike)):
+        with nullcontext(file) as fin:
+            yield fin
+    elif os.fspath(file).endswith(".svgz"):
+        with gzip.open(file, "rb") as fin:
+            yield fin
+    else:
+        with open(file, "rb") as fin:
+            yield fin
 
 
 class BasePainter:
+    def __init__(self, **options):
+        self.options = options
+
+    def serializer(self) -> Serializer:
+        return Serializer(**self.options)
+
     def __call__(self, element: core.Element, file: Optional[str] = None) -> str:
         return ""
 
 
 class DefaultPainter(BasePainter):
-    def __init__(self):
-        pass
+    def __init__(self, compress: Optional[bool] = None, **options):
+        super(DefaultPainter, self).__init__(**options)
+        self.compress = compress
 
-    def __call__(self, element: core.Element, file: Optional[str] = None) -> str:
-        svgs = element.makeSVG()
-        s = "\n".join(svgs)
+    def __call__(self, element: core.Element, file: Optional[Output] = None) -> str:
+        serializer = self.serializer()
+        s = serializer.newline.join(serializer.iterLines(element))
         if file is not None:
-            with open(file, "w", encoding="utf-8") as fout:
+            with openOutput(file, self.compress) as fout:
                 fout.write(s)
         return s
 
 
-def draw(element: core.Element, file: Optional[str] = None, painter: BasePainter = DefaultPainter()) -> str:
+class StreamingPainter(BasePainter):
+    def __init__(self, chunkSize: int = 1 << 16, compress: Optional[bool] = None, **options):
+        super(StreamingPainter, self).__init__(**options)
+        self.chunkSize = chunkSize
+        self.compress = compress
+
+    def iterChunks(self, element: core.SVGMaker) -> Iterator[str]:
+        serializer = self.serializer()
+        newline = serializer.newline
+        buffer = []
+        size = 0
+        sep = ""
+        for line in serializer.iterLines(element):
+            buffer.append(line)
+            size += len(line) + 1
+            if size >= self.chunkSize:
+                yield sep + newline.join(buffer)
+                buffer.clear()
+                size = 0
+                sep = newline
+        if buffer:
+            yield sep + newline.join(buffer)
+
+    def __call__(
+        self,
+        element: core.Element,
+        file: Optional[Output] = None
+    ) -> Optional[Iterator[str]]:
+        if file is None:
+            return self.iterChunks(element)
+        with openOutput(file, self.compress) as fout:
+            for chunk in self.iterChunks(element):
+                fout.write(chunk)
+        return None
+
+
+def draw(
+    element: core.Element,
+    file: Optional[Output] = None,
+    painter: Optional[BasePainter] = None,
+    stream: bool = False,
+    **options
+) -> Union[str, Iterator[str], None]:
+    if painter is None:
+        painter = StreamingPainter(**options) if stream else DefaultPainter(**options)
+    elif options or stream:
+        raise TypeError("options are given to the painter, not to draw() with a painter")
     return painter(element, file)
@@ -0,0 +1,129 @@
+from typing import Dict, Iterable, Optional, Tuple
+
+from . import core
+
+
+class Stats:
+    __slots__ = ("count", "time", "bytes")
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+        self.bytes = 0
+
+    def add(self, count: int, seconds: float, size: int):
+        self.count += count
+        self.time += seconds
+        self.bytes += size
+
+    def __repr__(self) -> str:
+        return f"Stats(count={self.count}, time={self.time:.6f}, bytes={self.bytes})"
+
+
+def kindOf(node: core.SVGMaker, tag: Optional[Tuple[str, core.Attrib]]) -> str:
+    if node.svgOpaque:
+        SVGType = getattr(node, "SVGType", None)
+        name = type(node).__name__
+        return f"{name}:{SVGType}" if SVGType else name
+    if tag is None:
+        return type(node).__name__
+    return tag[0]
+
+
+def size(lines: Iterable[str], newline: int) -> int:
+    return sum(len(line.encode("utf-8")) + newline for line in lines)
+
+
+class Profile:
+    # Collects what a serializer spends on every node, given to draw() or a
+    # painter as profile=Profile(). Times are self times of the nodes; the
+    # subtrees hold the totals of every container, e.g. a ComposedElement,
+    # with the labels of its ancestors. Drawing again adds to the totals.
+    def __init__(self):
+        self.byType: Dict[str, Stats] = {}
+        self.subtrees: Dict[str, Stats] = {}
+        self.stacks: Dict[str, Stats] = {}
+        self.prepareTime = 0.0
+        self._path = []
+        self._newline = 1
+
+    def clear(self):
+        self.__init__()
+
+    def begin(self, serializer, prepareTime: float):
+        self._newline = len(serializer.newline)
+        self.prepareTime += prepareTime
+        self._path = []
+
+    def _record(self, kind: str, key: str, count: int, seconds: float, nbytes: int):
+        stats = self.byType.get(kind)
+        if stats is None:
+            stats = self.byType[kind] = Stats()
+        stats.add(count, seconds, nbytes)
+        stats = self.stacks.get(key)
+        if stats is None:
+            stats = self.stacks[key] = Stats()
+        stats.add(count, seconds, nbytes)
+        if self._path:
+            self._path[-1][1].add(count, seconds, nbytes)
+
+    def element(self, node: core.SVGMaker, tag, lines: Iterable[str], seconds: float):
+        kind = kindOf(node, tag)
+        key = self._path[-1][0] + ";" + kind if self._path else kind
+        count = len(node) if node.svgOpaque and hasattr(node, "__len__") else 1
+        self._record(kind, key, count, seconds, size(lines, self._newline))
+
+    def text(self, s: str, seconds: float):
+        if self._path:
+            top = self._path[-1]
+            self._record("#text", top[0] + ";#text", 0, seconds, size((s,), self._newline))
+
+    def open(self, node: core.SVGMaker, tag, line: Optional[str], seconds: float):
+        kind = kindOf(node, tag)
+        if self._path:
+            parent = self._path[-1]
+            key = f"{parent[0]};{kind}[{parent[2]}]"
+            parent[2] += 1
+        else:
+            key = kind
+        self._path.append([key, Stats(), 0, kind])
+        self._record(kind, key, 1, seconds, size((line,), self._newline) if line else 0)
+
+    def close(self, line: Optional[str]):
+        key, total, _, kind = self._path[-1]
+        if line:
+            self._record(kind, key, 0, 0.0, size((line,), self._newline))
+        self._path.pop()
+        stats = self.subtrees.get(key)
+        if stats is None:
+            stats = self.subtrees[key] = Stats()
+        stats.add(total.count, total.time, total.bytes)
+        if self._path:
+            self._path[-1][1].add(total.count, total.time, total.bytes)
+
+    def folded(self, metric: str = "time") -> str:
+        # One "frame;frame;frame value" line per stack, as read by
+        # flamegraph.pl and speedscope; times are in microseconds.
+        lines = []
+        for key, stats in self.stacks.items():
+            if metric == "time":
+                value = int(round(stats.time * 1e6))
+            else:
+                value = getattr(stats, metric)
+            if value > 0:
+                lines.append(f"{key} {value}")
+        return "\n".join(lines)
+
+    def report(self, top: int = 10) -> str:
+        lines = [f"{'type':<24} {'count':>10} {'time (ms)':>10} {'bytes':>12}"]
+        for kind, stats in sorted(self.byType.items(), key=lambda kv: -kv[1].time):
+            lines.append(f"{kind:<24} {stats.count:>10} {stats.time * 1e3:>10.2f} {stats.bytes:>12}")
+        if self.prepareTime:
+            lines.append(f"{'(prepare)':<24} {'':>10} {self.prepareTime * 1e3:>10.2f}")
+        lines.append("")
+        lines.append(f"{'subtree':<48} {'count':>10} {'time (ms)':>10} {'bytes':>12}")
+        for key, stats in sorted(self.subtrees.items(), key=lambda kv: -kv[1].time)[:top]:
+            if len(key) > 48:
+                key = "..." + key[-45:]
+            lines.append(f"{key:<48} {stats.count:>10} {stats.time * 1e3:>10.2f} {stats.bytes:>12}")
+        return "\n".join(lines)
@@ -0,0 +1,1017 @@
+import base64
+import math
+import os
+import re
+import struct
+import zlib
+from contextlib import contextmanager, nullcontext
+from typing import IO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from . import core
+from .basicElements import PathD, _PATH_ARITY, _PATH_TOKEN
+from .batch import BatchElement, asColumn, isColumn
+from .painter import BasePainter
+from .serializer import PRESENTATION, Node
+
+Color = Tuple[float, float, float]
+
+_NAMED_COLORS = {
+    "black": "#000000", "white": "#ffffff", "red": "#ff0000", "green": "#008000",
+    "blue": "#0000ff", "yellow": "#ffff00", "cyan": "#00ffff", "aqua": "#00ffff",
+    "magenta": "#ff00ff", "fuchsia": "#ff00ff", "gray": "#808080", "grey": "#808080",
+    "silver": "#c0c0c0", "maroon": "#800000", "olive": "#808000", "lime": "#00ff00",
+    "teal": "#008080", "navy": "#000080", "purple": "#800080", "orange": "#ffa500",
+    "brown": "#a52a2a", "pink": "#ffc0cb", "gold": "#ffd700", "lightgray": "#d3d3d3",
+    "lightgrey": "#d3d3d3", "darkgray": "#a9a9a9", "darkgrey": "#a9a9a9",
+}
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+_INHERITED = ("fill", "stroke", "stroke-width", "fill-opacity", "stroke-opacity", "fill-rule",
+              "stroke-linecap", "stroke-linejoin", "stroke-miterlimit")
+_SHAPES = {"rect", "circle", "ellipse", "line", "polyline", "polygon", "path"}
+_GEOMETRY = {"x", "y", "width", "height", "viewBox", "overflow", "preserveAspectRatio", "xmlns",
+             "transform"}
+# Attributes RasterPainter does not paint; subtrees using them stay vector.
+_UNPAINTED = {"transform", "stroke-dasharray", "clip-path", "mask", "filter", "marker-start",
+              "marker-mid", "marker-end", "preserveAspectRatio"}
+
+
+def parseColor(v) -> Optional[Color]:
+    if v is None:
+        return None
+    v = str(v).strip().lower()
+    if v in ("none", "transparent", ""):
+        return None
+    v = _NAMED_COLORS.get(v, v)
+    if v.startswith("#"):
+        h = v[1:]
+        if len(h) == 3:
+            h = "".join(c * 2 for c in h)
+        try:
+            return int(h[0:2], 16) / 255, int(h[2:4], 16) / 255, int(h[4:6], 16) / 255
+        except ValueError:
+            return 0.0, 0.0, 0.0
+    if v.startswith("rgb"):
+        parts = _NUMBER.findall(v)
+        if len(parts) >= 3:
+            scale = [1 / 100 if "%" in p else 1 / 255 for p in v[v.index("(") + 1:].split(",")[:3]]
+            return tuple(min(max(float(p) * k, 0.0), 1.0) for p, k in zip(parts, scale))
+    return 0.0, 0.0, 0.0
+
+
+def parseNumber(v, default: float = 0.0) -> float:
+    if v is None:
+        return default
+    if v.__class__ is float or v.__class__ is int:
+        return v
+    m = _NUMBER.match(str(v).strip())
+    return float(m.group()) if m else default
+
+
+def _arc(cx: float, cy: float, rx: float, ry: float, t0: float, t1: float, n: int) -> np.ndarray:
+    t = np.linspace(t0, t1, n)
+    return np.stack([cx + rx * np.cos(t), cy + ry * np.sin(t)], axis=1)
+
+
+def _segments(radius: float, sweep: float = 2 * math.pi) -> int:
+    return int(min(max(abs(sweep) * radius / 2, 8), 256))
+
+
+def _pathRings(d, scale: float) -> List[Tuple[np.ndarray, bool]]:
+    if not isinstance(d, PathD):
+        d = PathD.fromCommands(str(d))
+    rings = []
+    points = []
+    x = y = startX = startY = 0.0
+    control = None
+    lastOp = ""
+    coords = d.coords
+    i = 0
+    for op in d.ops:
+        op = chr(op)
+        n = _PATH_ARITY[op]
+        args = list(coords[i:i + n])
+        i += n
+        upper = op.upper()
+        relative = op != upper
+        if relative and upper in ("M", "L", "C", "S", "Q", "T"):
+            args = [a + (x if k % 2 == 0 else y) for k, a in enumerate(args)]
+        if upper == "M":
+            if len(points) > 1:
+                rings.append((np.array(points), False))
+            x, y = startX, startY = args
+            points = [(x, y)]
+        elif upper == "Z":
+            if len(points) > 1:
+                rings.append((np.array(points), True))
+            x, y = startX, startY
+            points = [(x, y)]
+        elif upper == "L":
+            x, y = args
+            points.append((x, y))
+        elif upper == "H":
+            x = args[0] + (x if relative else 0)
+            points.append((x, y))
+        elif upper == "V":
+            y = args[0] + (y if relative else 0)
+            points.append((x, y))
+        elif upper == "A":
+            endX = args[5] + (x if relative else 0)
+            endY = args[6] + (y if relative else 0)
+            points.extend(map(tuple, _arcPoints(x, y, *args[:5], endX, endY, scale)))
+            x, y = endX, endY
+        else:
+            # Quadratic curves are raised to cubic ones; S and T reflect the
+            # previous control point.
+            reflected = ((2 * x - control[0], 2 * y - control[1])
+                         if control is not None and lastOp in ("CS" if upper in "CS" else "QT")
+                         else (x, y))
+            if upper == "C":
+                c1, c2, end = args[0:2], args[2:4], args[4:6]
+                control = c2
+            elif upper == "S":
+                c1, c2, end = reflected, args[0:2], args[2:4]
+                control = c2
+            else:
+                q, end = (args[0:2], args[2:4]) if upper == "Q" else (reflected, args[0:2])
+                c1 = (x + 2 / 3 * (q[0] - x), y + 2 / 3 * (q[1] - y))
+                c2 = (end[0] + 2 / 3 * (q[0] - end[0]), end[1] + 2 / 3 * (q[1] - end[1]))
+                control = q
+            length = (math.hypot(c1[0] - x, c1[1] - y) + math.hypot(c2[0] - c1[0], c2[1] - c1[1])
+                      + math.hypot(end[0] - c2[0], end[1] - c2[1])) * scale
+            t = np.linspace(0, 1, int(min(max(length / 3, 4), 128)) + 1)[1:, None]
+            u = 1 - t
+            curve = (u ** 3 * np.array((x, y)) + 3 * u * u * t * np.array(c1)
+                     + 3 * u * t * t * np.array(c2) + t ** 3 * np.array(end))
+            points.extend(map(tuple, curve))
+            x, y = end
+            lastOp = upper
+            continue
+        control = None
+        lastOp = upper
+    if len(points) > 1:
+        rings.append((np.array(points), d.isClosed))
+    return rings
+
+
+def _arcPoints(x1, y1, rx, ry, rotation, largeArc, sweep, x2, y2, scale) -> np.ndarray:
+    # Endpoint to center parameterization, SVG 1.1 appendix F.6.
+    rx, ry = abs(rx), abs(ry)
+    if rx == 0 or ry == 0 or (x1 == x2 and y1 == y2):
+        return np.array([(x2, y2)])
+    phi = math.radians(rotation)
+    cos, sin = math.cos(phi), math.sin(phi)
+    dx, dy = (x1 - x2) / 2, (y1 - y2) / 2
+    x1p = cos * dx + sin * dy
+    y1p = -sin * dx + cos * dy
+    lam = x1p ** 2 / rx ** 2 + y1p ** 2 / ry ** 2
+    if lam > 1:
+        rx *= math.sqrt(lam)
+        ry *= math.sqrt(lam)
+    num = rx ** 2 * ry ** 2 - rx ** 2 * y1p ** 2 - ry ** 2 * x1p ** 2
+    den = rx ** 2 * y1p ** 2 + ry ** 2 * x1p ** 2
+    k = math.sqrt(max(num / den, 0)) if den else 0
+    if bool(largeArc) == bool(sweep):
+        k = -k
+    cxp = k * rx * y1p / ry
+    cyp = -k * ry * x1p / rx
+    cx = cos * cxp - sin * cyp + (x1 + x2) / 2
+    cy = sin * cxp + cos * cyp + (y1 + y2) / 2
+    t0 = math.atan2((y1p - cyp) / ry, (x1p - cxp) / rx)
+    t1 = math.atan2((-y1p - cyp) / ry, (-x1p - cxp) / rx)
+    dt = t1 - t0
+    if sweep and dt < 0:
+        dt += 2 * math.pi
+    elif not sweep and dt > 0:
+        dt -= 2 * math.pi
+    t = np.linspace(t0, t0 + dt, _segments(max(rx, ry) * scale, dt) + 1)[1:]
+    ex, ey = rx * np.cos(t), ry * np.sin(t)
+    return np.stack([cx + cos * ex - sin * ey, cy + sin * ex + cos * ey], axis=1)
+
+
+def shapeRings(tag: str, get, scale: float = 1.0) -> List[Tuple[np.ndarray, bool]]:
+    # Returns the outlines of a shape as (points, closed) in user units.
+    num = parseNumber
+    if tag == "rect":
+        x, y = num(get("x")), num(get("y"))
+        w, h = num(get("width")), num(get("height"))
+        if w <= 0 or h <= 0:
+            return []
+        rx, ry = get("rx"), get("ry")
+        rx = num(rx if rx is not None else ry)
+        ry = num(ry if ry is not None else rx)
+        rx, ry = min(max(rx, 0), w / 2), min(max(ry, 0), h / 2)
+        if rx == 0 or ry == 0:
+            return [(np.array([(x, y), (x + w, y), (x + w, y + h), (x, y + h)], dtype=float), True)]
+        n = _segments(max(rx, ry) * scale, math.pi / 2)
+        corners = [
+            _arc(x + w - rx, y + ry, rx, ry, -math.pi / 2, 0, n),
+            _arc(x + w - rx, y + h - ry, rx, ry, 0, math.pi / 2, n),
+            _arc(x + rx, y + h - ry, rx, ry, math.pi / 2, math.pi, n),
+            _arc(x + rx, y + ry, rx, ry, math.pi, 3 * math.pi / 2, n),
+        ]
+        return [(np.concatenate(corners), True)]
+    if tag in ("circle", "ellipse"):
+        cx, cy = num(get("cx")), num(get("cy"))
+        if tag == "circle":
+            rx = ry = num(get("r"))
+        else:
+            rx, ry = num(get("rx")), num(get("ry"))
+        if rx <= 0 or ry <= 0:
+            return []
+        n = _segments(max(rx, ry) * scale)
+        return [(_arc(cx, cy, rx, ry, 0, 2 * math.pi, n + 1)[:-1], True)]
+    if tag == "line":
+        return [(np.array([(num(get("x1")), num(get("y1"))),
+                           (num(get("x2")), num(get("y2")))], dtype=float), False)]
+    if tag in ("polyline", "polygon"):
+        points = get("points")
+        if points is None:
+            return []
+        numbers = getattr(points, "coords", None)
+        if numbers is None:
+            numbers = [float(v) for v in _PATH_TOKEN.findall(str(points))]
+        xy = np.array(numbers[:len(numbers) // 2 * 2], dtype=float).reshape(-1, 2)
+        return [(xy, tag == "polygon")] if len(xy) > 1 else []
+    if tag == "path":
+        d = get("d")
+        return _pathRings(d, scale) if d is not None else []
+    return []
+
+
+def _edges(polygons: Iterable[np.ndarray]) -> Optional[np.ndarray]:
+    # Polygons are (k, 2) arrays, or (n, k, 2) arrays of n polygons with k
+    # corners each. Returns the closing edges as rows of x0, y0, x1, y1.
+    parts = []
+    for p in polygons:
+        if p.shape[-2] < 2:
+            continue
+        nxt = np.concatenate([p[..., 1:, :], p[..., :1, :]], axis=-2)
+        parts.append(np.concatenate([p, nxt], axis=-1).reshape(-1, 4))
+    if not parts:
+        return None
+    return np.concatenate(parts) if len(parts) > 1 else parts[0]
+
+
+def coverage(polygons: Iterable[np.ndarray], evenOdd: bool, clip: Tuple[int, int, int, int],
+             samples: int = 4) -> Optional[Tuple[int, int, np.ndarray]]:
+    # Scanline coverage of closed polygons in pixel units. Every pixel row is
+    # sampled by `samples` scanlines; along a scanline, the covered length of
+    # every pixel is exact. Returns (top, left, coverage) of the touched area.
+    edges = _edges(polygons)
+    if edges is None:
+        return None
+    x0, y0, x1, y1 = edges.T
+    keep = y0 != y1
+    x0, y0, x1, y1 = x0[keep], y0[keep], x1[keep], y1[keep]
+    if len(x0) == 0:
+        return None
+    top = max(int(math.floor(min(y0.min(), y1.min()))), clip[1])
+    bottom = min(int(math.ceil(max(y0.max(), y1.max()))), clip[3])
+    left = max(int(math.floor(min(x0.min(), x1.min()))), clip[0])
+    right = min(int(math.ceil(max(x0.max(), x1.max()))), clip[2])
+    if top >= bottom or left >= right:
+        return None
+    rows = bottom - top
+    width = right - left
+    stride = width + 2
+    winding = np.where(y1 > y0, 1, -1)
+    slope = (x1 - x0) / (y1 - y0)
+    # Scanline k lies at top + (k + 0.5) / samples; every edge crosses the
+    # scanlines from first to last, half-open at its lower end.
+    first = np.ceil((np.minimum(y0, y1) - top) * samples - 0.5)
+    last = np.ceil((np.maximum(y0, y1) - top) * samples - 0.5)
+    first = np.clip(first, 0, rows * samples).astype(np.int64)
+    last = np.clip(last, 0, rows * samples).astype(np.int64)
+    count = last - first
+    total = np.zeros(rows * stride)
+    bands = max(1, int(count.sum() // 2_000_000) + 1)
+    step = -(-rows * samples // bands)
+    for start in range(0, rows * samples, step):
+        lo = np.maximum(first, start)
+        n = np.maximum(np.minimum(last, start + step) - lo, 0)
+        if not n.any():
+            continue
+        edge = np.repeat(np.arange(len(n)), n)
+        offsets = np.cumsum(n) - n
+        line = np.repeat(lo, n) + np.arange(len(edge)) - np.repeat(offsets, n)
+        ys = top + (line + 0.5) / samples
+        xs = x0[edge] + (ys - y0[edge]) * slope[edge]
+        order = np.lexsort((xs, line))
+        line, xs, w = line[order], xs[order], winding[edge[order]]
+        wind = np.cumsum(w)
+        newLine = np.r_[True, line[1:] != line[:-1]]
+        base = (wind - w)[newLine]
+        wind -= base[np.cumsum(newLine) - 1]
+        inside = (wind % 2 != 0) if evenOdd else (wind != 0)
+        inside[-1] = False
+        span = np.nonzero(inside)[0]
+        a = np.clip(xs[span], left, right) - left
+        b = np.clip(xs[span + 1], left, right) - left
+        fa, fb = np.floor(a), np.floor(b)
+        ra, rb = a - fa, b - fb
+        index = line[span] // samples * stride
+        ia = index + fa.astype(np.int64)
+        ib = index + fb.astype(np.int64)
+        total += np.bincount(np.concatenate([ia, ia + 1, ib, ib + 1]),
+                             np.concatenate([1 - ra, ra, rb - 1, -rb]), minlength=len(total))
+    cover = np.cumsum(total.reshape(rows, stride), axis=1)[:, :width] / samples
+    return top, left, np.clip(cover, 0, 1)
+
+
+def _area(p: np.ndarray) -> np.ndarray:
+    nxt = np.concatenate([p[..., 1:, :], p[..., :1, :]], axis=-2)
+    return np.sum(p[..., 0] * nxt[..., 1] - nxt[..., 0] * p[..., 1], axis=-1)
+
+
+def _orient(p: np.ndarray, sign: float) -> np.ndarray:
+    flip = _area(p) * sign < 0
+    if flip.any():
+        p = p.copy()
+        p[flip] = p[flip, ::-1]
+    return p
+
+
+def _discs(centers: np.ndarray, radius: float, sign: float) -> np.ndarray:
+    t = np.linspace(0, 2 * math.pi, _segments(radius * 2) + 1)[:-1]
+    circle = np.stack([np.cos(t), np.sin(t)], axis=1) * radius
+    return _orient(centers[:, None, :] + circle[None, :, :], sign)
+
+
+def strokePolygons(points: np.ndarray, closed: bool, width: float, cap: str = "butt",
+                   join: str = "miter", miterLimit: float = 4.0) -> List[np.ndarray]:
+    # Every returned polygon has the same orientation, so filling them all with
+    # the nonzero rule paints their union: one quad per segment plus the joins
+    # and caps.
+    hw = width / 2
+    if closed and len(points) > 2 and (points[0] == points[-1]).all():
+        points = points[:-1]
+    if closed:
+        points = np.vstack([points, points[:1]])
+    step = np.diff(points, axis=0)
+    length = np.hypot(step[:, 0], step[:, 1])
+    keep = length > 1e-9
+    if not keep.any():
+        if cap == "round" and len(points):
+            return [_discs(points[:1], hw, 1.0)]
+        return []
+    starts = points[:-1][keep]
+    step = step[keep]
+    direction = step / length[keep][:, None]
+    normal = np.stack([-direction[:, 1], direction[:, 0]], axis=1) * hw
+    ends = starts + step
+    if not closed and cap == "square":
+        starts[0] -= direction[0] * hw
+        ends[-1] += direction[-1] * hw
+    quads = np.stack([starts + normal, ends + normal, ends - normal, starts - normal], axis=1)
+    sign = 1.0 if _area(quads[0]) > 0 else -1.0
+    polygons = [quads]
+    if closed:
+        first, second = np.arange(len(direction)), np.roll(np.arange(len(direction)), -1)
+    else:
+        first, second = np.arange(len(direction) - 1), np.arange(1, len(direction))
+    d1, d2 = direction[first], direction[second]
+    cross = d1[:, 0] * d2[:, 1] - d1[:, 1] * d2[:, 0]
+    dot = np.sum(d1 * d2, axis=1)
+    turning = (np.abs(cross) > 1e-12) | (dot < 0)
+    first, second, cross, dot = first[turning], second[turning], cross[turning], dot[turning]
+    vertex = ends[first]
+    if len(vertex):
+        if join == "round":
+            polygons.append(_discs(vertex, hw, sign))
+        else:
+            # The joint fills the wedge on the outer side of the turn: a
+            # bevel triangle, or the miter quad while within the miter limit.
+            side = np.where(cross > 0, -1.0, 1.0)[:, None]
+            a = vertex + side * normal[first]
+            b = vertex + side * normal[second]
+            cosHalf = np.sqrt(np.maximum((1 + dot) / 2, 0))
+            bisector = a + b - 2 * vertex
+            norm = np.hypot(bisector[:, 0], bisector[:, 1])
+            miter = (join == "miter") & (cosHalf * miterLimit >= 1) & (norm > 1e-12)
+            reach = np.divide(hw, cosHalf * norm, out=np.zeros_like(norm), where=miter)
+            tip = np.where(miter[:, None], vertex + bisector * reach[:, None], b)
+            polygons.append(_orient(np.stack([vertex, a, tip, b], axis=1), sign))
+    if not closed and cap == "round":
+        polygons.append(_discs(np.array([points[0], points[-1]]), hw, sign))
+    return polygons
+
+
+class Canvas:
+    def __init__(self, width: int, height: int, background: Optional[Color] = None):
+        self.width = width
+        self.height = height
+        self.pixels = np.zeros((height, width, 4), dtype=np.float32)
+        if background is not None:
+            self.pixels[...] = (*background, 1.0)
+
+    def paint(self, cover: Optional[Tuple[int, int, np.ndarray]], color: Color, alpha: float):
+        if cover is None or alpha <= 0:
+            return
+        top, left, c = cover
+        a = (c * alpha).astype(np.float32)[:, :, None]
+        region = self.pixels[top:top + c.shape[0], left:left + c.shape[1]]
+        region *= 1 - a
+        region += a * np.array((*color, 1.0), dtype=np.float32)
+
+    def image(self) -> np.ndarray:
+        alpha = self.pixels[:, :, 3:4]
+        rgb = np.divide(self.pixels[:, :, :3], alpha, out=np.zeros_like(self.pixels[:, :, :3]),
+                        where=alpha > 0)
+        out = np.concatenate([rgb, alpha], axis=2)
+        return (np.clip(out, 0, 1) * 255 + 0.5).astype(np.uint8)
+
+
+class _View:
+    # Maps user units of the current viewport to pixels, with the clip
+    # rectangle in pixels and the inherited presentation attributes.
+    __slots__ = ("ox", "oy", "scale", "clip", "style", "opacity")
+
+    def __init__(self, ox, oy, scale, clip, style, opacity):
+        self.ox = ox
+        self.oy = oy
+        self.scale = scale
+        self.clip = clip
+        self.style = style
+        self.opacity = opacity
+
+
+def _attribs(attrib, theme=None) -> Dict[str, object]:
+    if attrib is None:
+        return {}
+    return {core.svgName(k): v.resolve(theme) if v.__class__ is core.StyleRef else v
+            for k, v in attrib.items()}
+
+
+def _rows(element: BatchElement, theme=None) -> Iterator[Dict[str, object]]:
+    items = [(k, asColumn(v) if isColumn(v) else None, v)
+             for k, v in _attribs(element.attrib, theme).items()]
+    removed = getattr(element, "_removed", ())
+    for i in range(element._rowCount()):
+        if i in removed:
+            continue
+        row = {}
+        for k, column, v in items:
+            value = column[i] if column is not None else v
+            if value.__class__ is core.StyleRef:
+                value = value.resolve(theme)
+            if value is not None:
+                row[k] = value
+        yield row
+
+
+class RasterPainter(BasePainter):
+    def __init__(self, scale: float = 1.0, background: Union[str, Color, None] = None,
+                 samples: int = 4, theme=None):
+        super(RasterPainter, self).__init__()
+        self.scale = scale
+        self.background = parseColor(background) if isinstance(background, str) else background
+        self.samples = samples
+        self.theme = theme
+
+    def render(self, element: core.SVGMaker, style: Optional[Dict[str, object]] = None) -> np.ndarray:
+        # style holds the presentation attributes element inherits, when it
+        # is painted apart from the picture it is part of.
+        tag = element.svgTag()
+        if tag is None or tag[0] != "svg":
+            raise ValueError("only an Axis or a ComposedElement can be rasterized")
+        attrib = _attribs(tag[1], self.theme)
+        width = parseNumber(attrib.get("width"), 0)
+        height = parseNumber(attrib.get("height"), 0)
+        canvas = Canvas(int(math.ceil(width * self.scale)), int(math.ceil(height * self.scale)),
+                        self.background)
+        root = _View(0.0, 0.0, self.scale, (0, 0, canvas.width, canvas.height),
+                     _attribs(style, self.theme), 1.0)
+        view = self._viewport(root, attrib, width, height, isRoot=True)
+        stack = [(iter(element.svgChildren()), view)]
+        while stack:
+            child = next(stack[-1][0], None)
+            if child is None:
+                stack.pop()
+                continue
+            view = stack[-1][1]
+            if isinstance(child, str):
+                continue
+            if isinstance(child, BatchElement):
+                self._drawBatch(canvas, view, child)
+                continue
+            if child.svgOpaque:
+                # Opaque nodes only emit lines, unless they can give the
+                # elements they stand for.
+                expand = getattr(child, "svgExpand", None)
+                if expand is not None:
+                    stack.append((iter(expand()), view))
+                continue
+            tag = child.svgTag()
+            if tag is None:
+                stack.append((iter(child.svgChildren()), view))
+                continue
+            name, attrib = tag[0], _attribs(tag[1], self.theme)
+            if name in _SHAPES:
+                self._drawShape(canvas, view, name, attrib)
+            elif name in ("svg", "g"):
+                if "transform" in attrib:
+                    continue
+                inner = self._group(view, attrib)
+                if name == "svg":
+                    inner = self._viewport(inner, attrib, parseNumber(attrib.get("width"), 0),
+                                           parseNumber(attrib.get("height"), 0))
+                if inner is not None:
+                    stack.append((iter(child.svgChildren()), inner))
+        return canvas.image()
+
+    def _group(self, view: _View, attrib) -> _View:
+        style = dict(view.style)
+        for k in _INHERITED:
+            if k in attrib:
+                style[k] = attrib[k]
+        opacity = view.opacity * parseNumber(attrib.get("opacity"), 1.0)
+        return _View(view.ox, view.oy, view.scale, view.clip, style, opacity)
+
+    def _viewport(self, view: _View, attrib, width: float, height: float,
+                  isRoot: bool = False) -> Optional[_View]:
+        s = view.scale
+        x = 0 if isRoot else parseNumber(attrib.get("x"))
+        y = 0 if isRoot else parseNumber(attrib.get("y"))
+        vx, vy = view.ox + s * x, view.oy + s * y
+        clip = view.clip
+        if attrib.get("overflow") != "visible":
+            clip = (max(clip[0], int(math.floor(vx))), max(clip[1], int(math.floor(vy))),
+                    min(clip[2], int(math.ceil(vx + s * width))),
+                    min(clip[3], int(math.ceil(vy + s * height))))
+            if clip[0] >= clip[2] or clip[1] >= clip[3]:
+                return None
+        viewBox = attrib.get("viewBox")
+        if viewBox is not None:
+            bx, by, bw, bh = (float(v) for v in _NUMBER.findall(str(viewBox))[:4])
+            k = min(width / bw, height / bh)
+            scale = s * k
+            ox = vx + (s * width - scale * bw) / 2 - scale * bx
+            oy = vy + (s * height - scale * bh) / 2 - scale * by
+        else:
+            scale, ox, oy = s, vx, vy
+        return _View(ox, oy, scale, clip, view.style, view.opacity)
+
+    def _drawBatch(self, canvas: Canvas, view: _View, element: BatchElement):
+        # Unstroked rects, circles and ellipses sharing one paint are filled
+        # in a single pass: their outlines all turn the same way, so the
+        # nonzero rule paints their union.
+        attrib = _attribs(element.attrib, self.theme)
+        SVGType = element.SVGType
+        varying = {k for k, v in attrib.items() if isColumn(v)}
+        uniform = (SVGType in ("rect", "circle", "ellipse") and "transform" not in attrib
+                   and not getattr(element, "_sparse", False)
+                   and not getattr(element, "_removed", None)
+                   and not varying & {"fill", "stroke", "opacity", "fill-opacity", "rx", "ry"}
+                   and parseColor(attrib.get("stroke", view.style.get("stroke"))) is None)
+        if SVGType == "rect" and uniform:
+            uniform = not parseNumber(attrib.get("rx")) and not parseNumber(attrib.get("ry"))
+        count = element._rowCount()
+        col = lambda k, default=0.0: np.broadcast_to(
+            np.asarray(asColumn(attrib.get(k, default)), dtype=float), (count,))
+        if not uniform:
+            # Opaque fills that differ per row, e.g. the cells of a heatmap,
+            # are painted together unless anything else stands in the way.
+            if (varying & {"fill"} and SVGType in ("rect", "circle", "ellipse")
+                    and "transform" not in attrib and not getattr(element, "_sparse", False)
+                    and not getattr(element, "_removed", None)
+                    and not varying & {"stroke", "opacity", "fill-opacity"}
+                    and parseNumber(attrib.get("opacity"), 1.0) == 1
+                    and parseNumber(attrib.get("fill-opacity",
+                                               view.style.get("fill-opacity")), 1.0) == 1
+                    and parseColor(attrib.get("stroke", view.style.get("stroke"))) is None
+                    and not (SVGType == "rect" and (varying & {"rx", "ry"}
+                                                    or parseNumber(attrib.get("rx"))
+                                                    or parseNumber(attrib.get("ry"))))):
+                self._fillEach(canvas, view, SVGType, attrib, col, count)
+                return
+            for row in _rows(element, self.theme):
+                self._drawShape(canvas, view, SVGType, row)
+            return
+        if SVGType == "rect":
+            x, y, w, h = col("x"), col("y"), col("width"), col("height")
+            keep = (w > 0) & (h > 0)
+            x, y, w, h = x[keep], y[keep], w[keep], h[keep]
+            outlines = np.stack([np.stack([x, y], 1), np.stack([x + w, y], 1),
+                                 np.stack([x + w, y + h], 1), np.stack([x, y + h], 1)], axis=1)
+        else:
+            rx = col("r") if SVGType == "circle" else col("rx")
+            ry = col("r") if SVGType == "circle" else col("ry")
+            keep = (rx > 0) & (ry > 0)
+            if not keep.any():
+                return
+            rx, ry = rx[keep], ry[keep]
+            n = _segments(max(rx.max(), ry.max()) * view.scale)
+            t = np.linspace(0, 2 * math.pi, n + 1)[:-1]
+            outlines = np.stack([col("cx")[keep, None] + rx[:, None] * np.cos(t),
+                                 col("cy")[keep, None] + ry[:, None] * np.sin(t)], axis=2)
+        if not len(outlines):
+            return
+        outlines = outlines * view.scale + (view.ox, view.oy)
+        fill = attrib.get("fill", view.style.get("fill"))
+        fill = parseColor(fill if fill is not None else "black")
+        if fill is not None:
+            fillOpacity = attrib.get("fill-opacity", view.style.get("fill-opacity"))
+            opacity = (view.opacity * parseNumber(attrib.get("opacity"), 1.0)
+                       * parseNumber(fillOpacity, 1.0))
+            canvas.paint(coverage([outlines], False, view.clip, self.samples), fill, opacity)
+
+    def _fillEach(self, canvas: Canvas, view: _View, SVGType: str, attrib, col, count: int):
+        # Opaque fills in order: every sample point takes the color of the
+        # last row covering it, and every pixel the mean of its samples.
+        fills = []
+        for v in asColumn(attrib["fill"]):
+            if v.__class__ is core.StyleRef:
+                v = v.resolve(self.theme)
+            fills.append(v)
+        names, index = np.unique(np.asarray([str(v) for v in fills]), return_inverse=True)
+        # Rows without a fill paint nothing; index 0 is no row at all.
+        palette = np.array([(*color, 1.0) if color is not None else (0.0, 0.0, 0.0, 0.0)
+                            for color in map(parseColor, names)], dtype=np.float32)
+        colors = np.concatenate([np.zeros((1, 4), np.float32), palette[index.reshape(-1)]])
+        s = self.samples
+        if SVGType == "rect":
+            x0, y0 = col("x"), col("y")
+            x1, y1 = x0 + col("width"), y0 + col("height")
+        else:
+            cx, cy = col("cx"), col("cy")
+            rx = col("r") if SVGType == "circle" else col("rx")
+            ry = col("r") if SVGType == "circle" else col("ry")
+            x0, y0, x1, y1 = cx - rx, cy - ry, cx + rx, cy + ry
+        # Sample j of a row of pixels lies at (j + 0.5) / s and is covered by
+        # [a, b) when ceil(a * s - 0.5) <= j < ceil(b * s - 0.5).
+        clip = view.clip
+        j0 = np.clip(np.ceil((view.ox + view.scale * x0) * s - 0.5), clip[0] * s, clip[2] * s)
+        j1 = np.clip(np.ceil((view.ox + view.scale * x1) * s - 0.5), clip[0] * s, clip[2] * s)
+        i0 = np.clip(np.ceil((view.oy + view.scale * y0) * s - 0.5), clip[1] * s, clip[3] * s)
+        i1 = np.clip(np.ceil((view.oy + view.scale * y1) * s - 0.5), clip[1] * s, clip[3] * s)
+        nx = (j1 - j0).astype(np.int64)
+        ny = (i1 - i0).astype(np.int64)
+        rows = np.flatnonzero((nx > 0) & (ny > 0) & (colors[1:, 3] > 0))
+        if not len(rows):
+            return
+        # The sampled area starts on a pixel.
+        left, top = int(j0[rows].min()) // s * s, int(i0[rows].min()) // s * s
+        pw = -(-(int(j1[rows].max()) - left) // s)
+        ph = -(-(int(i1[rows].max()) - top) // s)
+        width = pw * s
+        winner = np.zeros(ph * s * width, dtype=np.int64)
+        sizes = nx[rows] * ny[rows]
+        total = np.cumsum(sizes)
+        # Rows are taken in parts of a few million samples; the highest row
+        # wins wherever they overlap, in any order.
+        start = 0
+        while start < len(rows):
+            done = total[start - 1] if start else 0
+            end = max(start + 1, int(np.searchsorted(total, done + 4_000_000, side="right")))
+            part = rows[start:end]
+            n = sizes[start:end]
+            row = np.repeat(part, n)
+            offset = np.arange(len(row)) - np.repeat(np.cumsum(n) - n, n)
+            j = j0[row].astype(np.int64) + offset % nx[row]
+            i = i0[row].astype(np.int64) + offset // nx[row]
+            if SVGType != "rect":
+                u = (((j + 0.5) / s - view.ox) / view.scale - cx[row]) / rx[row]
+                v = (((i + 0.5) / s - view.oy) / view.scale - cy[row]) / ry[row]
+                inside = u * u + v * v <= 1
+                row, i, j = row[inside], i[inside], j[inside]
+            np.maximum.at(winner, (i - top) * width + (j - left), row + 1)
+            start = end
+        # Back to pixels, summing the s x s samples of each.
+        pixels = colors[winner].reshape(ph, s, pw, s, 4).sum(axis=(1, 3))
+        pixels *= view.opacity / (s * s)
+        py, px = top // s, left // s
+        region = canvas.pixels[py:py + ph, px:px + pw]
+        pixels = pixels[:region.shape[0], :region.shape[1]]
+        region *= 1 - pixels[:, :, 3:4]
+        region += pixels
+
+    def _drawShape(self, canvas: Canvas, view: _View, tag: str, attrib):
+        if "transform" in attrib:
+            return
+        style = view.style
+        get = lambda k: attrib.get(k, style.get(k))
+        rings = shapeRings(tag, attrib.get, view.scale)
+        if not rings:
+            return
+        s = view.scale
+        offset = np.array((view.ox, view.oy))
+        rings = [(points * s + offset, closed) for points, closed in rings]
+        opacity = view.opacity * parseNumber(attrib.get("opacity"), 1.0)
+
+        fill = parseColor(get("fill") if get("fill") is not None else "black")
+        if fill is not None and tag != "line":
+            cover = coverage([p for p, _ in rings], get("fill-rule") == "evenodd",
+                             view.clip, self.samples)
+            canvas.paint(cover, fill, opacity * parseNumber(get("fill-opacity"), 1.0))
+
+        stroke = parseColor(get("stroke"))
+        width = parseNumber(get("stroke-width"), 1.0) * s
+        if stroke is not None and width > 0:
+            cap = str(get("stroke-linecap") or "butt")
+            join = str(get("stroke-linejoin") or "miter")
+            limit = parseNumber(get("stroke-miterlimit"), 4.0)
+            polygons = []
+            for points, closed in rings:
+                polygons.extend(strokePolygons(points, closed, width, cap, join, limit))
+            cover = coverage(polygons, False, view.clip, self.samples)
+            canvas.paint(cover, stroke, opacity * parseNumber(get("stroke-opacity"), 1.0))
+
+    def __call__(self, element: core.SVGMaker, file=None) -> np.ndarray:
+        image = self.render(element)
+        if file is not None:
+            self.write(image, file)
+        return image
+
+    def write(self, image: np.ndarray, file):
+        if isinstance(file, (str, os.PathLike)) and os.fspath(file).lower().endswith(".gif"):
+            writeGIF(file, [image])
+        else:
+            writePNG(file, image)
+
+
+def _paintable(attrib) -> bool:
+    if attrib is None:
+        return True
+    for k, v in attrib.items():
+        name = core.svgName(k)
+        if name in _UNPAINTED:
+            return False
+        if name in ("fill", "stroke") and isinstance(v, str) and v.startswith("url("):
+            return False
+    return True
+
+
+def _inherited(style: Dict[str, object], attrib) -> Dict[str, object]:
+    if attrib is None:
+        return style
+    inherited = None
+    for k, v in attrib.items():
+        name = core.svgName(k)
+        if name in _INHERITED:
+            if inherited is None:
+                inherited = dict(style)
+            inherited[name] = v
+    return style if inherited is None else inherited
+
+
+def denseSubtrees(root: core.SVGMaker,
+                  threshold: int) -> List[Tuple[core.ComposedElement, Dict[str, object]]]:
+    # The outermost ComposedElements below root with more than threshold
+    # shapes, batch rows counted one by one, that RasterPainter paints as
+    # they would be shown: no text, no transforms, no gradients, ... Each
+    # comes with the presentation attributes it inherits from its ancestors.
+    # Every frame is [children iterator, ComposedElement or None, count,
+    #                 paintable, inherited style].
+    found = []
+    parents = {}
+    styles = {}
+    tag = root.svgTag()
+    stack = [[iter(root.svgChildren()), None, 0, True, _inherited({}, tag and tag[1])]]
+    composed = [None]
+    while stack:
+        frame = stack[-1]
+        child = next(frame[0], None)
+        if child is None:
+            stack.pop()
+            _, element, count, ok, _ = frame
+            if element is not None:
+                composed.pop()
+                found.append((element, count > threshold and ok))
+            if stack:
+                stack[-1][2] += count
+                stack[-1][3] = stack[-1][3] and ok
+            continue
+        if isinstance(child, str):
+            frame[3] = False
+            continue
+        if isinstance(child, BatchElement):
+            frame[2] += len(child)
+            frame[3] = frame[3] and child.SVGType in _SHAPES and _paintable(child.attrib)
+            continue
+        if child.svgOpaque:
+            expand = getattr(child, "svgExpand", None)
+            if expand is None:
+                frame[3] = False
+            else:
+                stack.append([iter(expand()), None, 0, True, frame[4]])
+            continue
+        tag = child.svgTag()
+        if child.svgLeaf:
+            frame[2] += 1
+            frame[3] = frame[3] and tag is not None and tag[0] in _SHAPES and _paintable(tag[1])
+            continue
+        ok = tag is None or (tag[0] in ("svg", "g") and _paintable(tag[1]))
+        if isinstance(child, core.ComposedElement):
+            ok = ok and child.axis.attrib.get("overflow") != "visible"
+            parents[id(child)] = composed[-1]
+            styles[id(child)] = frame[4]
+            composed.append(child)
+            stack.append([iter(child.svgChildren()), child, 0, ok, frame[4]])
+        else:
+            style = frame[4] if tag is None else _inherited(frame[4], tag[1])
+            stack.append([iter(child.svgChildren()), None, 0, ok, style])
+
+    # Inner subtrees are closed first; an outer one that is rasterized
+    # takes them along.
+    dense = {id(e) for e, isDense in found if isDense}
+    selected = []
+    for e, isDense in found:
+        if not isDense:
+            continue
+        parent = parents[id(e)]
+        while parent is not None and id(parent) not in dense:
+            parent = parents[id(parent)]
+        if parent is None:
+            selected.append((e, styles[id(e)]))
+    return selected
+
+
+def rasterImage(element: core.ComposedElement, dpi: float = 150, theme=None,
+                style: Optional[Dict[str, object]] = None) -> Node:
+    # The <image> standing for element, a PNG at dpi with user units taken
+    # as CSS pixels, 96 to the inch, painted with the style it inherits. Its
+    # attributes other than geometry and presentation, e.g. id or class,
+    # are kept on the image.
+    image = RasterPainter(dpi / 96, theme=theme).render(element, style)
+    axis = _attribs(element.axis.attrib, theme)
+    attrib = {k: axis[k] for k in ("x", "y") if k in axis}
+    attrib["width"] = axis.get("width", element.axis.w)
+    attrib["height"] = axis.get("height", element.axis.h)
+    for source in (element.axis.attrib, element.attrib):
+        for k, v in source.items():
+            name = core.svgName(k)
+            if name not in _GEOMETRY and name not in PRESENTATION:
+                attrib[k] = v
+    attrib["preserveAspectRatio"] = "none"
+    data = base64.b64encode(encodePNG(image, 9)).decode("ascii")
+    attrib["xlink:href"] = "data:image/png;base64," + data
+    attrib = core.Attrib(**attrib)
+    return Node("image", attrib, leaf=True)
+
+
+@contextmanager
+def openBinary(file) -> Iterator[IO[bytes]]:
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "wb") as fout:
+            yield fout
+    else:
+        with nullcontext(file) as fout:
+            yield fout
+
+
+def _chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+
+def encodePNG(image: np.ndarray, level: int = 6) -> bytes:
+    image = np.ascontiguousarray(image, dtype=np.uint8)
+    if image.ndim == 2:
+        image = image[:, :, None]
+    height, width, channels = image.shape
+    colorType = {1: 0, 2: 4, 3: 2, 4: 6}[channels]
+    raw = np.zeros((height, width * channels + 1), dtype=np.uint8)
+    raw[:, 1:] = image.reshape(height, -1)
+    header = struct.pack(">IIBBBBB", width, height, 8, colorType, 0, 0, 0)
+    return (b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", header)
+            + _chunk(b"IDAT", zlib.compress(raw.tobytes(), level)) + _chunk(b"IEND", b""))
+
+
+def writePNG(file, image: np.ndarray):
+    with openBinary(file) as fout:
+        fout.write(encodePNG(image))
+
+
+def _palette(images: Sequence[np.ndarray], size: int) -> Tuple[np.ndarray, np.ndarray]:
+    # Popularity palette over 15-bit color buckets: the most frequent buckets
+    # are kept with their mean color, which is exact for flat-colored drawings.
+    counts = np.zeros(1 << 15, dtype=np.int64)
+    sums = np.zeros((3, 1 << 15))
+    for rgb in images:
+        keys = _key15(rgb).ravel()
+        counts += np.bincount(keys, minlength=1 << 15)
+        for c in range(3):
+            sums[c] += np.bincount(keys, rgb[..., c].ravel(), minlength=1 << 15)
+    used = np.nonzero(counts)[0]
+    top = used[np.argsort(counts[used], kind="stable")[::-1][:size]]
+    colors = (sums[:, top] / counts[top] + 0.5).T.astype(np.uint8)
+    return colors, top
+
+
+def _key15(rgb: np.ndarray) -> np.ndarray:
+    c = rgb.astype(np.int64) >> 3
+    return (c[..., 0] << 10) | (c[..., 1] << 5) | c[..., 2]
+
+
+def _lzw(indices: bytes, minCodeSize: int = 8) -> bytes:
+    clear = 1 << minCodeSize
+    end = clear + 1
+    codes = {}
+    nextCode = end + 1
+    codeSize = minCodeSize + 1
+    out = bytearray()
+    bits = 0
+    nbits = 0
+
+    def emit(code):
+        nonlocal bits, nbits
+        bits |= code << nbits
+        nbits += codeSize
+        while nbits >= 8:
+            out.append(bits & 255)
+            bits >>= 8
+            nbits -= 8
+
+    emit(clear)
+    if not indices:
+        emit(end)
+        return bytes(out) + (bytes((bits,)) if nbits else b"")
+    prefix = indices[0]
+    for c in indices[1:]:
+        key = (prefix << 8) | c
+        code = codes.get(key)
+        if code is not None:
+            prefix = code
+            continue
+        emit(prefix)
+        if nextCode < 4096:
+            codes[key] = nextCode
+            nextCode += 1
+            if nextCode > (1 << codeSize) and codeSize < 12:
+                codeSize += 1
+        else:
+            emit(clear)
+            codes.clear()
+            nextCode = end + 1
+            codeSize = minCodeSize + 1
+        prefix = c
+    emit(prefix)
+    emit(end)
+    if nbits:
+        out.append(bits & 255)
+    return bytes(out)
+
+
+def _subBlocks(data: bytes) -> bytes:
+    parts = [bytes((len(data[i:i + 255]),)) + data[i:i + 255] for i in range(0, len(data), 255)]
+    return b"".join(parts) + b"\x00"
+
+
+def encodeGIF(images: Sequence[np.ndarray], duration: int = 100, loop: int = 0,
+              background: Optional[Color] = (1.0, 1.0, 1.0)) -> bytes:
+    # Transparent pixels are blended over the background, or, without one,
+    # kept transparent when less than half covered.
+    frames = []
+    transparent = False
+    for image in images:
+        image = np.asarray(image)
+        if image.shape[2] == 4:
+            alpha = image[:, :, 3:4].astype(np.float32) / 255
+            if background is None:
+                rgb = image[:, :, :3]
+                clear = image[:, :, 3] < 128
+            else:
+                rgb = image[:, :, :3] * alpha + np.array(background) * 255 * (1 - alpha)
+                clear = None
+        else:
+            rgb = image[:, :, :3]
+            clear = None
+        rgb = np.clip(rgb + 0.5, 0, 255).astype(np.uint8)
+        frames.append((rgb, clear))
+        transparent = transparent or (clear is not None and clear.any())
+    height, width = frames[0][0].shape[:2]
+    palette, keys = _palette([rgb for rgb, _ in frames], 255 if transparent else 256)
+    # Nearest palette entry of every 15-bit color.
+    grid = np.stack(np.meshgrid(np.arange(32), np.arange(32), np.arange(32), indexing="ij"),
+                    axis=-1).reshape(-1, 3) * 255 // 31
+    lookup = np.empty(1 << 15, dtype=np.uint8)
+    for start in range(0, 1 << 15, 4096):
+        d = ((grid[start:start + 4096, None, :] - palette[None, :, :].astype(int)) ** 2).sum(axis=2)
+        lookup[start:start + 4096] = d.argmin(axis=1)
+    lookup[keys] = np.arange(len(keys))
+    table = np.zeros((256, 3), dtype=np.uint8)
+    table[:len(palette)] = palette
+
+    out = [b"GIF89a", struct.pack("<HHBBB", width, height, 0xF7, 0, 0), table.tobytes()]
+    if len(frames) > 1:
+        out.append(b"\x21\xFF\x0BNETSCAPE2.0\x03\x01" + struct.pack("<H", loop) + b"\x00")
+    for rgb, clear in frames:
+        indices = lookup[_key15(rgb)]
+        flags = 0
+        if transparent and clear is not None:
+            indices[clear] = 255
+            flags = 1
+        disposal = 2 if transparent else 1
+        out.append(b"\x21\xF9\x04" + struct.pack("<BHB", flags | (disposal << 2), duration // 10,
+                                                  255 if flags else 0) + b"\x00")
+        out.append(b"\x2C" + struct.pack("<HHHHB", 0, 0, width, height, 0))
+        out.append(b"\x08" + _subBlocks(_lzw(indices.tobytes())))
+    out.append(b"\x3B")
+    return b"".join(out)
+
+
+def writeGIF(file, images: Sequence[np.ndarray], duration: int = 100, loop: int = 0,
+             background: Optional[Color] = (1.0, 1.0, 1.0)):
+    with openBinary(file) as fout:
+        fout.write(encodeGIF(images, duration, loop, background))
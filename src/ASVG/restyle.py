@@ -0,0 +1,249 @@
+import gzip
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from html import escape
+from typing import Dict, IO, List, Mapping, Optional, Tuple, Union
+from xml.parsers import expat
+
+from . import core
+from .painter import openInput
+
+Rule = Union[str, Mapping[str, str]]
+
+_CHUNK = 1 << 16
+_DECLARATION = re.compile(r"(?<![\w-])([A-Za-z-]+)(\s*:\s*)([^;{}]*)")
+_TAG = re.compile(rb"<[^\s/>]+(?:\s+[^\s=/>]+\s*=\s*(?:\"[^\"]*\"|'[^']*'))*\s*/?>")
+
+
+def _openBinary(file: str, compress: bool) -> IO[bytes]:
+    return gzip.open(file, "wb") if compress else open(file, "wb")
+
+
+def _rules(mapping: Mapping[str, Rule]) -> Dict[str, Rule]:
+    # Attribute names as in the rest of the API, e.g. font_family; values are
+    # matched without case, as colors and font names are.
+    result = {}
+    for k, rule in mapping.items():
+        if isinstance(rule, Mapping):
+            rule = {str(old).strip().lower(): str(new) for old, new in rule.items()}
+        else:
+            rule = str(rule)
+        result[core.svgName(k)] = rule
+    return result
+
+
+def _needles(rules: Dict[str, Rule]) -> Optional[List[bytes]]:
+    # The old values a file must contain to be changed, or None when a rule
+    # sets every value.
+    found = []
+    for rule in rules.values():
+        if isinstance(rule, str):
+            return None
+        found.extend(old.encode("utf-8") for old in rule)
+    return found
+
+
+def _replace(rule: Rule, value: str) -> Optional[str]:
+    if isinstance(rule, str):
+        return rule if value.strip() != rule else None
+    return rule.get(value.strip().lower())
+
+
+class _Rewriter:
+    # Expat finds the start tags, and only the values that change are
+    # spliced into the input bytes; everything else is copied unchanged.
+    def __init__(self, rules: Dict[str, Rule]):
+        self.rules = rules
+        self.names = set(rules)
+        self.count = 0
+        self.encoding = "utf-8"
+        self.data = bytearray()
+        self.base = 0  # offset of data[0] in the input
+        self.pos = 0  # input offset up to which the output is written
+        self.style = None
+        self.out = []
+        self.patterns = {}
+        parser = self.parser = expat.ParserCreate()
+        parser.XmlDeclHandler = self.xmlDecl
+        parser.StartElementHandler = self.start
+
+    def feed(self, data: bytes, final: bool = False) -> bytes:
+        self.data += data
+        self.parser.Parse(data, final)
+        # Tags are reported once they are complete, so everything before the
+        # last "<" is final.
+        end = self.base + (len(self.data) if final else max(self.data.rfind(b"<"), 0))
+        if self.style is not None:
+            end = min(end, self.style)
+        self.copy(end)
+        out = b"".join(self.out)
+        self.out.clear()
+        del self.data[:self.pos - self.base]
+        self.base = self.pos
+        return out
+
+    def copy(self, end: int):
+        if end > self.pos:
+            self.out.append(bytes(self.data[self.pos - self.base:end - self.base]))
+            self.pos = end
+
+    def css(self, text: str) -> str:
+        def sub(m):
+            rule = self.rules.get(m.group(1).lower())
+            if rule is None:
+                return m.group(0)
+            value = m.group(3)
+            new = _replace(rule, value)
+            if new is None:
+                return m.group(0)
+            self.count += 1
+            stripped = value.strip()
+            return m.group(1) + m.group(2) + value.replace(stripped, new, 1)
+        return _DECLARATION.sub(sub, text)
+
+    def xmlDecl(self, version: str, encoding: Optional[str], standalone: int):
+        if encoding is not None:
+            self.encoding = encoding
+
+    def start(self, name: str, attributes: Dict[str, str]):
+        keys = self.names.intersection(attributes)
+        if not keys and "style" not in attributes and name != "style":
+            return
+        offset = self.parser.CurrentByteIndex
+        if name == "style":
+            self.style = self.base + _TAG.match(self.data, offset - self.base).end()
+            self.parser.EndElementHandler = self.end
+        changes = []
+        for k in keys:
+            new = _replace(self.rules[k], attributes[k])
+            if new is not None:
+                changes.append((k, new))
+                self.count += 1
+        style = attributes.get("style")
+        if style is not None:
+            new = self.css(style)
+            if new != style:
+                changes.append(("style", new))
+        if not changes:
+            return
+        start = offset - self.base
+        end = _TAG.match(self.data, start).end()
+        tag = bytes(self.data[start:end])
+        for k, new in changes:
+            m = self.pattern(k).search(tag)
+            value = escape(new).encode(self.encoding)
+            tag = tag[:m.start(2) + 1] + value + tag[m.end(2) - 1:]
+        self.copy(offset)
+        self.out.append(tag)
+        self.pos = offset + end - start
+
+    def pattern(self, k: str):
+        pattern = self.patterns.get(k)
+        if pattern is None:
+            name = re.escape(k.encode(self.encoding))
+            pattern = self.patterns[k] = re.compile(
+                rb"(\s" + name + rb"\s*=\s*)(\"[^\"]*\"|'[^']*')")
+        return pattern
+
+    def end(self, name: str):
+        offset = self.parser.CurrentByteIndex
+        if name != "style" or self.style is None:
+            return
+        start, self.style = self.style, None
+        self.parser.EndElementHandler = None
+        text = bytes(self.data[start - self.base:offset - self.base]).decode(self.encoding)
+        count = self.count
+        text = self.css(text)
+        if self.count != count:
+            self.copy(start)
+            self.out.append(text.encode(self.encoding))
+            self.pos = offset
+
+
+def _mentions(file: str, needles: List[bytes]) -> bool:
+    if not needles:
+        return False
+    longest = max(map(len, needles))
+    tail = b""
+    with openInput(file) as fin:
+        while True:
+            chunk = fin.read(_CHUNK)
+            if not chunk:
+                return False
+            data = (tail + chunk).lower()
+            if any(n in data for n in needles):
+                return True
+            tail = data[-longest:]
+
+
+def _restyleFile(job: Tuple[str, Optional[str]], rules: Dict[str, Rule]) -> int:
+    # Rewrites src into dst, or in place when dst is None, and returns the
+    # number of values changed. A file is only written when it changes, or
+    # copied when dst is given.
+    src, dst = job
+    keys = _needles(rules)
+    if keys is not None and not _mentions(src, keys):
+        count = 0
+    else:
+        target = dst if dst is not None else src
+        tmp = target + ".restyle"
+        rewriter = _Rewriter(rules)
+        try:
+            with openInput(src) as fin, _openBinary(tmp, target.endswith(".svgz")) as fout:
+                while True:
+                    chunk = fin.read(_CHUNK)
+                    fout.write(rewriter.feed(chunk, not chunk))
+                    if not chunk:
+                        break
+            count = rewriter.count
+            if count:
+                os.replace(tmp, target)
+        except expat.ExpatError as e:
+            raise ValueError(f"{src}: {e}") from None
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    if not count and dst is not None:
+        shutil.copyfile(src, dst)
+    return count
+
+
+def _files(directory: str, out: Optional[str]) -> List[Tuple[str, Optional[str]]]:
+    if os.path.isfile(directory):
+        return [(directory, out)]
+    jobs = []
+    for folder, dirs, names in os.walk(directory):
+        dirs.sort()
+        for name in sorted(names):
+            if not name.endswith((".svg", ".svgz")):
+                continue
+            src = os.path.join(folder, name)
+            dst = None
+            if out is not None:
+                dst = os.path.join(out, os.path.relpath(src, directory))
+                os.makedirs(os.path.dirname(dst), exist_ok=True)
+            jobs.append((src, dst))
+    return jobs
+
+
+def restyle(
+    directory: str,
+    mapping: Mapping[str, Rule],
+    workers: Optional[int] = None,
+    out: Optional[str] = None
+) -> Dict[str, int]:
+    jobs = _files(directory, out)
+    compiled = _rules(mapping)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    if workers <= 1:
+        counts = [_restyleFile(job, compiled) for job in jobs]
+    else:
+        with ProcessPoolExecutor(workers) as pool:
+            counts = list(pool.map(partial(_restyleFile, rules=compiled), jobs,
+                                   chunksize=max(len(jobs) // (workers * 8), 1)))
+    return {src: count for (src, _), count in zip(jobs, counts) if count}
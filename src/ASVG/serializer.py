@@ -0,0 +1,601 @@
+import hashlib
+import re
+from html import escape
+from itertools import chain
+from operator import itemgetter
+from time import perf_counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from . import bounds, core
+from .profiling import Profile
+
+_END = object()
+
+_NUMBER = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?")
+NUMBER_LISTS = {"points", "viewBox", "d"}
+
+PRESENTATION = {
+    "fill", "fill-opacity", "fill-rule", "stroke", "stroke-width",
+    "stroke-dasharray", "stroke-dashoffset", "stroke-linecap", "stroke-linejoin",
+    "stroke-miterlimit", "stroke-opacity", "opacity", "color", "visibility",
+    "display", "font-family", "font-size", "font-style", "font-weight",
+    "text-anchor", "dominant-baseline", "text-decoration", "letter-spacing",
+    "word-spacing", "paint-order", "shape-rendering", "vector-effect",
+}
+_STYLE_NAMES: Dict[str, Any] = {}
+_STYLE_VALUES = {str, int, float}
+# CSS needs a unit on lengths where presentation attributes do not.
+_CSS_LENGTHS = {"stroke-width", "stroke-dashoffset", "font-size",
+                "letter-spacing", "word-spacing"}
+
+
+def iterPieces(pieces: list) -> Iterator[str]:
+    stack = [iter(pieces)]
+    while stack:
+        for piece in stack[-1]:
+            if isinstance(piece, list):
+                stack.append(iter(piece))
+                break
+            yield piece
+        else:
+            stack.pop()
+
+
+XLINK = "http://www.w3.org/1999/xlink"
+
+
+class Node(core.SVGMaker):
+    def __init__(
+        self,
+        tag: Optional[str],
+        attrib: Optional[core.Attrib],
+        children: Iterable[core.SVGMaker] = (),
+        leaf: bool = False
+    ):
+        self.tag = tag
+        self.attrib = attrib
+        self.children = children
+        self.svgLeaf = leaf
+
+    def svgTag(self) -> Optional[Tuple[str, core.Attrib]]:
+        if self.tag is None:
+            return None
+        return self.tag, self.attrib
+
+    def svgChildren(self) -> Iterable[core.SVGMaker]:
+        return self.children
+
+
+class _Unshifted(core.SVGMaker):
+    def __init__(self, element: core.ComposedElement):
+        self.element = element
+        self.attrib = element.axis.attrib.copy()
+        self.attrib.pop("x", None)
+        self.attrib.pop("y", None)
+        self.svgIndentChildren = element.svgIndentChildren
+        self._markerDefs = element._markerDefs
+
+    def svgTag(self) -> Optional[Tuple[str, core.Attrib]]:
+        return "svg", self.attrib
+
+    def svgChildren(self) -> Iterable[core.SVGMaker]:
+        return self.element.svgChildren()
+
+
+def themeKey(theme: Any) -> Any:
+    # Fragments are cached per theme; dicts are keyed by their content.
+    if isinstance(theme, dict):
+        return tuple(sorted(theme.items()))
+    return theme
+
+
+def viewRegion(axis: core.Axis) -> Optional[bounds.BBox]:
+    # The region of user units the axis shows: its viewBox, widened by the
+    # letterboxing of preserveAspectRatio's "meet" and narrowed by "slice".
+    try:
+        w, h = bounds.number(axis.w), bounds.number(axis.h)
+        viewBox = axis.attrib.get("viewBox")
+        if viewBox is None:
+            return 0, 0, w, h
+        x, y, bw, bh = map(float, _NUMBER.findall(viewBox))
+        aspect = str(axis.attrib.get("preserveAspectRatio", "xMidYMid meet")).split()
+    except (TypeError, ValueError):
+        return None
+    align = aspect[0] if aspect else "xMidYMid"
+    if align == "none" or bw <= 0 or bh <= 0 or w <= 0 or h <= 0:
+        return x, y, x + bw, y + bh
+    k = max(w / bw, h / bh) if aspect[-1] == "slice" else min(w / bw, h / bh)
+    extraX, extraY = w / k - bw, h / k - bh
+    x -= {"xMin": 0, "xMid": extraX / 2, "xMax": extraX}.get(align[:4], extraX / 2)
+    y -= {"YMin": 0, "YMid": extraY / 2, "YMax": extraY}.get(align[4:], extraY / 2)
+    return x, y, x + w / k, y + h / k
+
+
+class Serializer:
+    def __init__(
+        self,
+        indent: Optional[int] = None,
+        cache: bool = False,
+        minify: bool = False,
+        precision: Optional[int] = None,
+        dedup: bool = False,
+        styles: bool = False,
+        cull: Union[bool, bounds.BBox] = False,
+        theme: Any = None,
+        raster: Optional[int] = None,
+        rasterDPI: float = 150,
+        profile: Optional[Profile] = None
+    ):
+        self.options = dict(indent=indent, cache=cache, minify=minify, precision=precision,
+                            dedup=dedup, styles=styles, cull=cull, theme=theme,
+                            raster=raster, rasterDPI=rasterDPI)
+        self.minify = minify
+        if minify:
+            indent = 0
+        self.indent = core.INDENT if indent is None else indent
+        self.newline = "" if minify else "\n"
+        self.precision = precision
+        self.dedup = dedup
+        self.styles = styles
+        self.cull = cull
+        self.theme = theme
+        self.themeKey = themeKey(theme)
+        self.raster = raster
+        self.rasterDPI = rasterDPI
+        self.profile = profile
+        self.formatted = minify or precision is not None
+        # Style references are only resolved outside the plain path.
+        self.plain = not self.formatted and theme is None
+        # Symbol ids, class names, culled and rasterized children depend on
+        # the whole tree, so fragments are not cached.
+        self.cache = cache and not dedup and not styles and not cull and raster is None
+        # Fragments without style references are shared by all themes, so
+        # the theme itself is not part of the key.
+        self.formatKey = (self.indent, minify, precision, dedup, styles, cull, theme is not None,
+                          raster, raster is not None and rasterDPI)
+        self._resolved = 0
+        self._head = []
+        self._rootAttrib = {}
+        self._substitutes = {}
+        self._classes = {}
+        self._styleKeys = {}
+        self._visible = {}
+
+    def variant(self, **options) -> "Serializer":
+        return type(self)(**dict(self.options, **options))
+
+    def prepare(self, root: core.SVGMaker):
+        self._head = []
+        self._rootAttrib = {}
+        self._substitutes = {}
+        self._classes = {}
+        self._styleKeys = {}
+        self._visible = {}
+        if self.cull:
+            self._findVisible(root)
+        if self.raster is not None:
+            self._findRasters(root)
+        if self.dedup:
+            self._findSymbols(root)
+        if self.styles:
+            self._findStyles(root)
+
+    def _findVisible(self, root: core.SVGMaker):
+        axis = root if isinstance(root, core.Axis) else getattr(root, "axis", None)
+        if not isinstance(axis, core.Axis):
+            return
+        region = self.cull if isinstance(self.cull, tuple) else viewRegion(axis)
+        if region is None:
+            return
+        # Every entry is an axis, the visible region in its coordinates and
+        # the stroke width its elements may inherit.
+        stack = [(axis, region, 1.0)]
+        while stack:
+            axis, region, width = stack.pop()
+            visible = axis.visible(bounds.grow(region, width * 2))
+            self._visible[id(axis.elements)] = visible
+            if self.dedup:
+                # Symbols are shared by visible and hidden instances.
+                break
+            for e in visible:
+                if not isinstance(e, core.ComposedElement) or e.bbox() is None:
+                    continue
+                inner = e.axis
+                if "viewBox" in inner.attrib:
+                    continue
+                try:
+                    innerRegion = bounds.shift(region, -bounds.number(inner.attrib.get("x", 0)),
+                                               -bounds.number(inner.attrib.get("y", 0)))
+                    if inner.attrib.get("overflow") != "visible":
+                        innerRegion = bounds.clip(innerRegion, e.axis.bbox())
+                    innerWidth = max(width, bounds.strokeWidth(e.attrib.get("stroke_width", 0)))
+                except (TypeError, ValueError):
+                    continue
+                if innerRegion is not None:
+                    stack.append((inner, innerRegion, innerWidth))
+
+    def _findRasters(self, root: core.SVGMaker):
+        # Dense subtrees are drawn as one embedded PNG each; NumPy is only
+        # needed when there are any.
+        from .raster import denseSubtrees, rasterImage
+        for e, style in denseSubtrees(root, self.raster):
+            self._substitutes[id(e)] = rasterImage(e, self.rasterDPI, self.theme, style)
+            self._rootAttrib["xmlns:xlink"] = XLINK
+
+    def _findSymbols(self, root: core.SVGMaker):
+        plain = self.variant(dedup=False, cache=False, styles=False, raster=None)
+        found: Dict[bytes, List[core.ComposedElement]] = {}
+        stack = [iter(root.svgChildren())]
+        while stack:
+            child = next(stack[-1], _END)
+            if child is _END:
+                stack.pop()
+                continue
+            if isinstance(child, str) or child.svgLeaf or child.svgOpaque:
+                continue
+            if id(child) in self._substitutes:
+                continue
+            if isinstance(child, core.ComposedElement):
+                key = child._symbolKey
+                if key is None or key[0] != (plain.formatKey, plain.themeKey):
+                    body = "\n".join(plain.iterLines(_Unshifted(child)))
+                    key = (plain.formatKey, plain.themeKey), hashlib.blake2b(
+                        body.encode("utf-8"), digest_size=16).digest()
+                    child._symbolKey = key
+                key = key[1]
+                instances = found.setdefault(key, [])
+                instances.append(child)
+                if len(instances) > 1:
+                    continue
+            stack.append(iter(child.svgChildren()))
+
+        symbols = []
+        for key, instances in found.items():
+            if len(instances) < 2:
+                continue
+            # Ids are global in a page: one id is always the same content.
+            symbolId = f"asvg-s{key[:4].hex()}"
+            symbols.append(Node("symbol", core.Attrib(id=symbolId, overflow="visible"),
+                                (_Unshifted(instances[0]),)))
+            for e in instances:
+                attrib = core.Attrib(**{"xlink:href": "#" + symbolId})
+                attrib.update({k: e.axis.attrib.get(k) for k in ("x", "y")
+                               if k in e.axis.attrib})
+                self._substitutes[id(e)] = Node("use", attrib, leaf=True)
+        if symbols:
+            self._head.append(Node("defs", None, symbols))
+            self._rootAttrib["xmlns:xlink"] = XLINK
+
+    def _findStyles(self, root: core.SVGMaker):
+        self._classes = {}
+        self._styleKeys = {}
+        counts: Dict[tuple, int] = {}
+        stack = [iter(chain((root,), self._head))]
+        while stack:
+            child = next(stack[-1], _END)
+            if child is _END:
+                stack.pop()
+                continue
+            if isinstance(child, str):
+                continue
+            child = self._substitutes.get(id(child), child)
+            if child.svgOpaque:
+                attrib = getattr(child, "svgStyleAttrib", None)
+                if attrib is not None:
+                    key = self.styleKey(attrib().items())[0]
+                    counts[key] = counts.get(key, 0) + len(child)
+                continue
+            tag = child.svgTag()
+            if tag is not None and tag[1] is not None:
+                key, rest = self.styleKey(tag[1].items())
+                counts[key] = counts.get(key, 0) + 1
+                # Keeping the attrib alive keeps its id unique for this pass.
+                self._styleKeys[id(tag[1])] = tag[1], key, rest
+            if not child.svgLeaf:
+                children = child.svgChildren()
+                stack.append(iter(self._visible.get(id(children), children)))
+
+        shared = [(key, [(k, self.cssValue(k, v)) for k, v in key])
+                  for key, count in counts.items() if key and count >= 2]
+        # Class names are global in a page, so they carry a hash of all the
+        # rules: two inlined pictures share a name only for the same rule.
+        prefix = "s" + hashlib.blake2b(repr([css for _, css in shared]).encode("utf-8"),
+                                       digest_size=3).hexdigest() + "-"
+        rules = []
+        for key, css in shared:
+            name = f"{prefix}{len(self._classes)}"
+            self._classes[key] = name
+            if self.minify:
+                body = ";".join(f"{k}:{v}" for k, v in css)
+                rules.append(f".{name}{{{body}}}")
+            else:
+                body = "; ".join(f"{k}: {v}" for k, v in css)
+                rules.append(f".{name} {{ {body} }}")
+        if rules:
+            self._head.insert(0, Node("style", None, [self.newline.join(rules)]))
+
+    def styleKey(self, items: Iterable[Tuple[str, Any]]) -> Tuple[tuple, list]:
+        style = []
+        rest = []
+        for k, v in items:
+            name = _STYLE_NAMES.get(k)
+            if name is None:
+                name = core.svgName(k)
+                name = _STYLE_NAMES[k] = name if name in PRESENTATION else ""
+            if name and v.__class__ in _STYLE_VALUES:
+                style.append((name, v))
+            else:
+                rest.append((k, v))
+        if len(style) > 1:
+            style.sort(key=itemgetter(0))
+        return tuple(style), rest
+
+    def splitStyle(self, items: Iterable[Tuple[str, Any]]) -> Tuple[Optional[str], list]:
+        if not self._classes:
+            return None, list(items)
+        key, rest = self.styleKey(items)
+        name = self._classes.get(key)
+        if name is None:
+            return None, list(items)
+        return name, rest
+
+    def cssValue(self, k: str, v: Any) -> str:
+        v = self.value(k, v)
+        if k in _CSS_LENGTHS and _NUMBER.fullmatch(v):
+            return v + "px"
+        return v
+
+    def number(self, v: float) -> str:
+        if self.precision is not None:
+            s = f"{v:.{self.precision}f}"
+            if "." in s:
+                s = s.rstrip("0").rstrip(".")
+            if s == "-0":
+                s = "0"
+        else:
+            s = repr(v)
+            if s.endswith(".0"):
+                s = s[:-2]
+        if self.minify:
+            if s.startswith("0."):
+                s = s[1:]
+            elif s.startswith("-0."):
+                s = "-" + s[2:]
+        return s
+
+    def value(self, k: str, v: Any) -> str:
+        if self.plain:
+            return f"{v}"
+        if not self.formatted:
+            if v.__class__ is core.StyleRef:
+                return self.themeValue(v)
+            return f"{v}"
+        if isinstance(v, float):
+            return self.number(v)
+        if isinstance(v, str):
+            if k in NUMBER_LISTS:
+                v = _NUMBER.sub(lambda m: self.number(float(m.group())), v)
+                if self.minify:
+                    v = v.replace(", ", ",")
+            return v
+        if hasattr(v, "svgFormat"):
+            return v.svgFormat(self)
+        return f"{v}"
+
+    def themeValue(self, ref: core.StyleRef) -> str:
+        self._resolved += 1
+        return self.value(ref.name, ref.resolve(self.theme))
+
+    def store(self, maker: core.SVGMaker, indent: int, pieces: list, resolved: int):
+        # A fragment that resolved style references is kept per theme, next
+        # to those of other themes.
+        fragment = (indent, self.formatKey, pieces)
+        if self._resolved != resolved:
+            themed = maker._fragment
+            if themed.__class__ is not dict:
+                themed = {}
+            themed[self.themeKey] = fragment
+            fragment = themed
+        maker._fragment = fragment
+
+    def attribText(self, attrib: core.Attrib) -> str:
+        items = attrib.items()
+        if self._classes:
+            known = self._styleKeys.get(id(attrib))
+            if known is not None and known[0] is attrib:
+                name = self._classes.get(known[1])
+                if name is not None:
+                    items = self.withClass(known[2], name)
+            else:
+                name, rest = self.splitStyle(items)
+                if name is not None:
+                    items = self.withClass(rest, name)
+        elif self.plain or (not self.formatted and not self.refers(attrib)):
+            return str(attrib)
+        return " ".join(f'{core.svgName(k)}="{self.value(k, v)}"'
+                        for k, v in items)
+
+    def refers(self, attrib: core.Attrib) -> bool:
+        return any(v.__class__ is core.StyleRef for _, v in attrib.items())
+
+    def withClass(self, items: list, name: str) -> list:
+        for i, (k, v) in enumerate(items):
+            if k == "class":
+                return items[:i] + [(k, f"{name} {v}")] + items[i + 1:]
+        return items + [("class", name)]
+
+    def openLine(self, tag: str, attribText: Optional[str], indent: int) -> str:
+        if attribText is None:
+            return " " * indent + f"<{tag}>"
+        return " " * indent + f"<{tag} {attribText}>"
+
+    def leafLine(self, tag: str, attribText: str, indent: int) -> str:
+        if self.minify:
+            return f"<{tag} {attribText}/>"
+        return " " * indent + f"<{tag} {attribText} />"
+
+    def openTag(self, tag: str, attrib: Optional[core.Attrib], indent: int) -> str:
+        if attrib is None or not len(attrib):
+            return self.openLine(tag, None, indent)
+        return self.openLine(tag, self.attribText(attrib), indent)
+
+    def closeTag(self, tag: str, indent: int) -> str:
+        return " " * indent + f"</{tag}>"
+
+    def leafTag(self, tag: str, attrib: core.Attrib, indent: int) -> str:
+        return self.leafLine(tag, self.attribText(attrib), indent)
+
+    def text(self, s: str) -> str:
+        return escape(s)
+
+    def iterLines(self, maker: core.SVGMaker, indent: int = 0) -> Iterator[str]:
+        profile = self.profile
+        if profile is not None:
+            start = perf_counter()
+            self.prepare(maker)
+            profile.begin(self, perf_counter() - start)
+        else:
+            self.prepare(maker)
+        substitutes = self._substitutes
+        cache = self.cache
+        step = self.indent
+        formatKey = self.formatKey
+        themeKey = self.themeKey
+        # Every frame is [children iterator, indent of the children,
+        #                 maker, close line, captured pieces, indent of maker,
+        #                 style references resolved before the maker].
+        # Frames of cacheable makers capture their output while cache is on,
+        # and store it as the maker's fragment when they are closed. A fragment
+        # holds the fragments of its children by reference, not by copy.
+        stack = [[iter((maker,)), indent, None, None, None, indent, 0]]
+        outs = []
+        out = None
+        while stack:
+            frame = stack[-1]
+            child = next(frame[0], _END)
+
+            if child is _END:
+                stack.pop()
+                _, _, owner, close, captured, ownerIndent, resolved = frame
+                if profile is not None and owner is not None:
+                    profile.close(close)
+                if close is not None:
+                    if out is None:
+                        yield close
+                    else:
+                        out.append(close)
+                if captured is not None:
+                    self.store(owner, ownerIndent, captured, resolved)
+                    outs.pop()
+                    out = outs[-1] if outs else None
+                    if out is None:
+                        yield from iterPieces(captured)
+                    else:
+                        out.append(captured)
+                continue
+
+            childIndent = frame[1]
+            if isinstance(child, str):
+                if profile is not None:
+                    start = perf_counter()
+                    line = self.text(child)
+                    profile.text(line, perf_counter() - start)
+                else:
+                    line = self.text(child)
+                if out is None:
+                    yield line
+                else:
+                    out.append(line)
+                continue
+
+            if substitutes:
+                child = substitutes.get(id(child), child)
+
+            fragment = child._fragment
+            if fragment is not None and fragment.__class__ is dict:
+                fragment = fragment.get(themeKey)
+                if fragment is not None:
+                    # Enclosing fragments depend on the theme as well.
+                    self._resolved += 1
+            if fragment is not None and fragment[0] == childIndent and fragment[1] == formatKey:
+                if profile is not None:
+                    profile.element(child, child.svgTag(), iterPieces(fragment[2]), 0.0)
+                if out is None:
+                    yield from iterPieces(fragment[2])
+                else:
+                    out.append(fragment[2])
+                continue
+
+            capture = cache and child.svgCacheable
+            if capture:
+                resolved = self._resolved
+
+            if child.svgOpaque:
+                if profile is not None:
+                    start = perf_counter()
+                    lines = list(child.svgLines(self, childIndent))
+                    profile.element(child, None, lines, perf_counter() - start)
+                else:
+                    lines = child.svgLines(self, childIndent)
+                if capture:
+                    lines = list(lines)
+                    self.store(child, childIndent, lines, resolved)
+                if out is None:
+                    yield from lines
+                else:
+                    out.extend(lines)
+                continue
+
+            if profile is not None:
+                start = perf_counter()
+            tag = child.svgTag()
+            if tag is not None and child.svgLeaf:
+                line = self.leafTag(tag[0], tag[1], childIndent)
+                if profile is not None:
+                    profile.element(child, tag, (line,), perf_counter() - start)
+                if capture:
+                    self.store(child, childIndent, [line], resolved)
+                if out is None:
+                    yield line
+                else:
+                    out.append(line)
+                continue
+
+            children = child.svgChildren()
+            if self._visible:
+                children = self._visible.get(id(children), children)
+            if child._markerDefs is not None:
+                children = chain((child._markerDefs,), children)
+            if len(stack) == 1 and tag is not None:
+                if self._rootAttrib:
+                    tag = tag[0], tag[1] + self._rootAttrib
+                if self._head:
+                    children = chain(self._head, children)
+
+            if capture:
+                out = []
+                outs.append(out)
+            if tag is None:
+                close = None
+                innerIndent = childIndent
+                if profile is not None:
+                    profile.open(child, tag, None, perf_counter() - start)
+            else:
+                line = self.openTag(tag[0], tag[1], childIndent)
+                if profile is not None:
+                    profile.open(child, tag, line, perf_counter() - start)
+                if out is None:
+                    yield line
+                else:
+                    out.append(line)
+                close = self.closeTag(tag[0], childIndent)
+                innerIndent = childIndent + step if child.svgIndentChildren else childIndent
+                if tag[0] == "text" and innerIndent == 0:
+                    # The indentation inside <text> separates words from
+                    # <tspan>s when rendered, so keep one space of it.
+                    innerIndent = 1
+            stack.append([iter(children), innerIndent, child, close,
+                          out if capture else None, childIndent, resolved if capture else 0])
+
+    def makeSVG(self, maker: core.SVGMaker, indent: int = 0) -> core.SVGLines:
+        return list(self.iterLines(maker, indent))
@@ -1,10 +1,26 @@
-from html import escape
-from typing import Union, List, overload
+from typing import Union, List, Iterable, Optional, Tuple, overload
 
-from . import core
+from . import bounds, core
 
+# Text extents are estimated from the font size, without font metrics.
+# The ink box assumes every glyph is as wide as the widest ones.
+CHAR_WIDTH = 0.6
+MAX_CHAR_WIDTH = 1.2
+ASCENT = 0.8
+DESCENT = 0.2
 
-class TextRepresent:
+
+def plainText(t: Union[str, "TextRepresent"]) -> str:
+    if isinstance(t, str):
+        return t
+    if isinstance(t, TextSpan):
+        return plainText(t.s)
+    if isinstance(t, TextGroup):
+        return "".join(plainText(i) for i in t.texts)
+    return ""
+
+
+class TextRepresent(core.SVGMaker):
     def __init__(self, fontSize: int = -1):
         self.fontSize = fontSize
 
@@ -21,9 +37,6 @@ class TextRepresent:
     def _splitRow(self):
         return []
 
-    def makeSVG(self, indent: int = 0) -> core.SVGLines:
-        return []
-
 
 class TextGroup(TextRepresent):
     def __init__(self, texts):
@@ -92,14 +105,8 @@ class TextGroup(TextRepresent):
 
         return result
 
-    def makeSVG(self, indent: int = 0) -> core.SVGLines:
-        result = []
-        for t in self.texts:
-            if isinstance(t, TextRepresent):
-                result.extend(t.makeSVG(indent))
-            else:
-                result.append(escape(t))
-        return result
+    def svgChildren(self) -> Iterable[Union[core.SVGMaker, str]]:
+        return self.texts
 
 
 class TextSpan(TextRepresent):
@@ -137,12 +144,23 @@ class TextSpan(TextRepresent):
             splited = self.s._splitRow()
         return [TextSpan(s, self.attrib) for s in splited]
 
-    def makeSVG(self, indent: int) -> core.SVGLines:
-        if isinstance(self.s, str):
-            svg = [escape(self.s)]
-        else:
-            svg = self.s.makeSVG(indent + core.INDENT)
-        return [" " * indent + f"<tspan {self.attrib}>"] + svg + [" " * indent + "</tspan>"]
+    def svgTag(self) -> Optional[Tuple[str, core.Attrib]]:
+        return "tspan", self.attrib
+
+    def svgChildren(self) -> Iterable[Union[core.SVGMaker, str]]:
+        return (self.s,)
+
+
+class _TextRow(core.SVGMaker):
+    def __init__(self, attrib: core.Attrib, row: TextRepresent):
+        self.attrib = attrib
+        self.row = row
+
+    def svgTag(self) -> Optional[Tuple[str, core.Attrib]]:
+        return "text", self.attrib
+
+    def svgChildren(self) -> Iterable[core.SVGMaker]:
+        return (self.row,)
 
 
 class Text(core.Element):
@@ -159,12 +177,33 @@ class Text(core.Element):
         for r in self.rows:
             r._overloadFontSize(kwargs["font_size"])
 
-        for k, v in kwargs.items():
-            if k not in {"s", "axis", "level", "attrib"}:
-                self.attrib.__dict__[k] = v
-
-    def makeSVG(self, indent: int) -> core.SVGLines:
-        result = []
+        self.attrib.update({k: v for k, v in kwargs.items()
+                            if k not in {"s", "axis", "level", "attrib"}})
+
+    def _bounds(self) -> Optional[bounds.BBox]:
+        return self._textBox(CHAR_WIDTH)
+
+    def inkBBox(self) -> Optional[bounds.BBox]:
+        if self.bbox() is None:
+            return None
+        return bounds.strokeBounds(self._textBox(MAX_CHAR_WIDTH), self.attrib)
+
+    def _textBox(self, charWidth: float) -> bounds.BBox:
+        get = self.attrib.get
+        x = bounds.number(get("x", 0))
+        y = bounds.number(get("y", 0))
+        fontSize = bounds.number(get("font_size"))
+        width = max((len(plainText(r)) * r.fontSize for r in self.rows), default=0) * charWidth
+        anchor = get("text_anchor", "start")
+        if anchor == "middle":
+            x -= width / 2
+        elif anchor == "end":
+            x -= width
+        top = y - ASCENT * fontSize
+        bottom = y + sum(r.fontSize for r in self.rows[1:]) + DESCENT * fontSize
+        return x, top, x + width, bottom
+
+    def svgChildren(self) -> Iterable[core.SVGMaker]:
         attrib = self.attrib.copy()
         first = True
         for r in self.rows:
@@ -172,10 +211,7 @@ class Text(core.Element):
                 attrib.y += r.fontSize
             else:
                 first = False
-            result.append(" " * indent + f"<text {attrib}>")
-            result.extend(r.makeSVG(indent + core.INDENT))
-            result.append(" " * indent + "</text>")
-        return result
+            yield _TextRow(attrib.copy(), r)
 
 
 def text(axis: Union[core.Axis, core.ComposedElement],
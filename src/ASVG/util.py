@@ -63,7 +63,11 @@ def makeColor(r, g, b):
 
 
 class StyleSet:
-    pass
+    @classmethod
+    def ref(cls, name: str) -> StyleRef:
+        # The style by name, resolved by the theme given to draw(); this
+        # set's own value is the default.
+        return StyleRef(name, getattr(cls, name))
 
 
 class ASVGStyle(StyleSet):
@@ -0,0 +1,36 @@
+import os
+
+from ASVG import *
+
+
+def frame(t):
+    a = Axis((200, 200))
+    circle(a, 0, 100, 100, 10 + t // 2, fill="red")
+    rect(a, 1, 10, 10, 20, 20, fill="blue")
+    text(a, 2, "hi" if t < 3 else "bye", 50, 50, 12)
+    circles(a, 3, [10, 20], [t, 30], 2)
+    ce = ComposedElement((50, 50), 1)
+    a.addElement(ce, (100, 20))
+    rect(ce, 0, 0, 0, 10, 10)
+    if t == 3:
+        circle(ce, 1, 5, 5, 2)
+    return a
+
+
+if __name__ == "__main__":
+    frames = [frame(t) for t in range(4)]
+    s = animate(frames, 2)
+    assert s.startswith("<svg") and s.count("<svg") == 3
+    assert '<animate attributeName="r" values="10;11" keyTimes="0;0.5" dur="2s" ' \
+           'calcMode="discrete" repeatCount="indefinite" />' in s
+    assert s.count('fill="blue"') == 1 and s.count("<animate") == 6
+    assert s.count("<text") == 2 and s.count('attributeName="display"') == 4
+    assert s.count('<circle cx="10"') == 1 and s.count('<circle cx="20"') == 1
+
+    assert animate(frames[:1], 1) == draw(frames[0])
+    assert "<set " in animate(frames[:2], 1, loop=False)
+
+    animate(frames, 2, "test_animate.svg", minify=True)
+    with open("test_animate.svg", encoding="utf-8") as fin:
+        assert "\n" not in fin.read()
+    os.remove("test_animate.svg")
@@ -0,0 +1,56 @@
+from ASVG import *
+
+a = Axis((200, 200))
+arrow(a, 0, 50, 50, 10, 10, stroke="red")
+b = Axis((200, 200))
+arrows(b, 0, [(50, 50)], [(10, 10)], stroke="red")
+assert sorted(draw(a).split("\n")) == sorted(draw(b).split("\n"))
+
+a = Axis((200, 200))
+arrow(a, 0, 50, 50, 10, 10, tipFilled=False)
+b = Axis((200, 200))
+arrows(b, 0, [(50, 50)], [(10, 10)], tipFilled=False)
+assert sorted(draw(a).split("\n")) == sorted(draw(b).split("\n"))
+
+c = Axis((200, 200))
+arrow(c, 1, 50, 50, 10, 10, marker=True, stroke="red")
+edges = arrows(c, 1, [(50, 50), (100, 100)], [(10, 10), (150, 100)], marker=True, stroke="red")
+polyArrow(c, 1, [(10, 10), (10, 30), (50, 30)], marker=True, stroke="red")
+arrows(c, 1, [(50, 50)], [(10, 10)], marker=True, tipSize=20)
+s = draw(c)
+assert s.count("<marker ") == 2
+assert s.count('marker-end="url(#') == 5
+assert s.index("<defs>") < s.index("<line")
+assert len(edges) == 1 and len(edges[0]) == 2
+
+# Marker ids depend on the picture only, not on what was drawn before.
+def marked():
+    m = Axis((100, 100))
+    arrow(m, 0, 50, 50, 10, 10, marker=True, stroke="blue", tipSize=7)
+    return m
+first = draw(marked())
+arrow(Axis((10, 10)), 0, 5, 5, 1, 1, marker=True, stroke="green")
+assert draw(marked()) == first
+shaft = [e for e in marked().elements if getattr(e, "SVGType", None) == "line"][0]
+assert shaft.inkBBox() == (2, 2, 58, 58)
+
+# The defs of the markers are not an element of the axis.
+m = Axis((20, 20))
+arrow(m, 0, 15, 15, 5, 5, marker=True)
+assert len(m.elements) == 1 and m.elements[0].SVGType == "line"
+assert m.contentBBox() == (5, 5, 15, 15)
+assert m.query(0, 0, 1, 1) == []
+assert "<defs>" in draw(m)
+
+# A clone shares the markers made before it, and adds its own apart.
+n = m.clone()
+arrow(n, 0, 15, 15, 5, 5, marker=True, stroke="red")
+assert draw(n).count("<marker ") == 2 and draw(m).count("<marker ") == 1
+
+try:
+    arrows(c, 1, [(1, 2)], [])
+    assert False
+except ValueError:
+    pass
+
+draw(c, "test.svg")
@@ -0,0 +1,46 @@
+import copy
+import pickle
+
+from ASVG import *
+
+style = Attrib(fill="red", stroke_width=2)
+a = Axis((100, 100))
+c1 = circle(a, 0, 10, 10, 5, attrib=style)
+c2 = circle(a, 0, 20, 20, 5, attrib=style)
+
+assert str(c1.attrib) == 'fill="red" stroke-width="2" cx="10" cy="10" r="5"'
+c1.attrib.fill = "blue"
+assert c1.attrib.fill == "blue"
+assert c2.attrib.fill == "red"
+assert style.fill == "red"
+assert 'fill="blue"' in str(c1.attrib)
+
+style.stroke = "black"
+assert "stroke" not in c2.attrib
+assert "stroke" in style
+
+d = Attrib(x=1) + {"y": 2} + Attrib(z=3)
+assert str(d) == 'x="1" y="2" z="3"'
+del d.y
+assert str(d) == 'x="1" z="3"'
+assert d.pop("z") == 3 and len(d) == 1
+
+p = PathD()
+p.moveTo(0, 0)
+e = path(a, 0, p)
+assert 'd="M 0 0"' in str(e.attrib)
+p.lineTo(1, 1)
+assert 'd="M 0 0 L 1 1"' in str(e.attrib)
+
+b = copy.deepcopy(a)
+assert draw(b) == draw(a)
+assert draw(pickle.loads(pickle.dumps(a))) == draw(a)
+
+# An attrib is pickled without its element, which takes it back when unpickled.
+assert pickle.loads(pickle.dumps(c1.attrib)).items() == c1.attrib.items()
+assert b"Axis" not in pickle.dumps(c1.attrib)
+b = pickle.loads(pickle.dumps(a))
+draw(b, cache=True)
+b.elements[0].attrib.fill = "green"
+assert 'fill="green"' in draw(b, cache=True)
+draw(a, "test.svg")
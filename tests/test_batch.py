@@ -0,0 +1,33 @@
+import numpy as np
+
+from ASVG import *
+
+xs = np.arange(50, dtype=float)
+ys = xs * 2
+colors = np.array(["red", "green"] * 25)
+
+a = Axis((500, 300))
+circles(a, 1, xs, ys, 5, fill=colors, stroke="black")
+rects(a, 0, xs, ys, 10, 10, attrib=Attrib(fill="blue"))
+lines(a, 2, [0, 1], [0, 1], [10, 20], [10, 20], stroke_width=2)
+ellipses(a, 3, 1, 2, 3, 4, fill="50%")
+
+b = Axis((500, 300))
+for x, y, c in zip(xs.tolist(), ys.tolist(), colors.tolist()):
+    circle(b, 1, x, y, 5, fill=c, stroke="black")
+for x, y in zip(xs.tolist(), ys.tolist()):
+    rect(b, 0, x, y, 10, 10, attrib=Attrib(fill="blue"))
+for i in range(2):
+    line(b, 2, [0, 1][i], [0, 1][i], [10, 20][i], [10, 20][i], stroke_width=2)
+ellipse(b, 3, 1, 2, 3, 4, fill="50%")
+
+assert draw(a) == draw(b)
+assert draw(a, cache=True) == draw(b)
+
+try:
+    circles(a, 0, [1, 2], [1, 2, 3], 1)
+    assert False
+except ValueError:
+    pass
+
+draw(a, "test.svg")
@@ -0,0 +1,74 @@
+import random
+
+from ASVG import *
+from ASVG.bounds import intersects
+
+a = Axis((1000, 1000))
+r = rect(a, 0, 10, 10, 20, 30)
+c = circle(a, 0, 100, 100, 10)
+assert r.bbox() == (10, 10, 30, 40)
+assert c.bbox() == (90, 90, 110, 110)
+assert ellipse(a, 0, 50, 50, 10, 5).bbox() == (40, 45, 60, 55)
+assert line(a, 0, 5, 6, 1, 2).bbox() == (1, 2, 5, 6)
+assert polygon(a, 0, [(1, 2), (3, -4), (0, 0)]).bbox() == (0, -4, 3, 2)
+
+p = PathD()
+p.moveTo(0, 0)
+p.curveTo(10, -20, 30, 40, 50, 0)
+p.lineFor(0, 5)
+assert path(a, 0, p).bbox() == (0, -20, 50, 40)
+
+t = text(a, 0, "hello", 150, 50, 10)
+x0, y0, x1, y1 = t.bbox()
+assert x0 < 150 < x1 and y0 < 50 < y1
+
+e = labeledCircle(1, 20, "PE", 20)
+a.addElement(e, (200, 100))
+assert e.bbox() == (200, 100, 250, 150)
+assert e.contentBBox()[0] >= 0
+
+random.seed(1)
+for _ in range(2000):
+    circle(a, 0, random.random() * 1000, random.random() * 1000, random.random() * 20)
+batch = circles(a, 2, [500, 600], [500, 700], 5)
+assert batch.bbox() == (495, 495, 605, 705)
+
+assert r in a.queryPoint(15, 15)
+for _ in range(20):
+    x, y = random.random() * 900, random.random() * 900
+    box = (x, y, x + 100, y + 100)
+    assert set(a.query(*box)) == {el for el in a.elements if intersects(el.bbox(), box)}
+
+found = a.query(0, 0, 1000, 1000)
+assert found == list(a.elements)
+
+c.attrib.cx = 900
+assert c.bbox() == (890, 90, 910, 110)
+assert c in a.queryPoint(900, 100)
+assert c not in a.queryPoint(100, 100)
+
+a.removeElement(r)
+assert r not in a.queryPoint(15, 15)
+e.axis.attrib.x = 600
+assert e in a.queryPoint(610, 110)
+assert e not in a.queryPoint(210, 110)
+
+# Cells are sized in user units, so a large viewBox still spreads the
+# elements over the grid.
+big = Axis((500, 500), viewBox=(0, 0, 1e5, 1e5))
+for _ in range(5000):
+    circle(big, 0, random.random() * 1e5, random.random() * 1e5, 50)
+box = (1000, 1000, 3000, 3000)
+assert set(big.query(*box)) == {el for el in big.elements if intersects(el.bbox(), box)}
+assert not big.index().large and len(big.index().cells) > 1000
+
+# An index built on an empty axis is rebuilt as the axis fills up.
+late = Axis((500, 500))
+assert late.query(0, 0, 500, 500) == []
+for _ in range(5000):
+    circle(late, 0, random.random() * 500, random.random() * 500, 1)
+box = (100, 100, 120, 120)
+assert set(late.query(*box)) == {el for el in late.elements if intersects(el.bbox(), box)}
+assert not late.index().large and late.index().cell < 50
+
+draw(a, "test.svg")
@@ -0,0 +1,41 @@
+from ASVG import *
+
+a = Axis((500, 300))
+circles = [circle(a, i % 3, i, i, 5, fill='red') for i in range(100)]
+e = labeledRect(3, 40, 20, "PE", 10, fill="blue")
+a.addElement(e, (20, 20))
+inner = ComposedElement((10, 10), 0)
+r = rect(inner, 0, 0, 0, 10, 10)
+e.addElement(inner, (1, 1))
+
+first = draw(a, cache=True)
+assert first == draw(a)
+assert draw(a, cache=True) == first
+
+circles[5].attrib.fill = 'green'
+assert 'fill="green"' in draw(a, cache=True)
+assert e._fragment is not None
+
+r.attrib.stroke = 'black'
+assert e._fragment is None
+s = draw(a, cache=True)
+assert 'stroke="black"' in s
+
+circles[0].level = 10
+s = draw(a, cache=True)
+assert s.split("\n")[-2] == circles[0].makeSVG(2)[0]
+
+e.attrib.opacity = 0.5
+circle(e, 5, 1, 1, 1)
+s = draw(a, cache=True)
+assert s == "\n".join(a.makeSVG())
+assert 'opacity="0.5"' in s and '<circle cx="1"' in s
+
+# Values changed in place are seen once they are assigned again.
+d = PathD()
+d.moveTo(0, 0)
+p = path(a, 0, d)
+draw(a, cache=True)
+d.lineTo(5, 5)
+p.attrib.d = d
+assert 'd="M 0 0 L 5 5"' in draw(a, cache=True)
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+
+from ASVG import *
+from ASVG.cached import canonical
+
+
+def legend(level, labels, size=10, **kwargs):
+    e = ComposedElement((120, 20 * len(labels)), level, Attrib(**kwargs))
+    for i, label in enumerate(labels):
+        rect(e, 0, 0, i * 20, size, size, fill=ASVGStyle.ref("emph"))
+        text(e, 1, label + TextSpan("!", font_weight="bold"), 15, i * 20 + 10, size)
+    return e
+
+
+def scene(factory):
+    a = Axis((400, 200))
+    for i in range(6):
+        a.addElement(factory(1, ["a", "b%d" % (i % 2)], stroke="black"), (i * 60, 10))
+    a.addElement(factory(2, ["c"], attrib=Attrib(fill="red")), (0, 100))
+    return a
+
+
+if __name__ == "__main__":
+    directory = tempfile.mkdtemp()
+    try:
+        cached = asvgCached(legend, directory=directory)
+        expected = draw(scene(legend))
+        assert draw(scene(cached)) == expected
+        assert cached.cache.misses == 3 and cached.cache.hits == 4
+        assert len(os.listdir(directory)) == 3
+
+        # Another run finds the pictures on disk, in any format.
+        again = asvgCached(legend, directory=directory)
+        a = scene(again)
+        assert again.cache.misses == 0
+        assert draw(a) == expected
+        assert draw(a, minify=True) == draw(scene(legend), minify=True)
+        assert draw(a, theme={"emph": "#00ff00"}) == draw(scene(legend), theme={"emph": "#00ff00"})
+        assert a.query(0, 0, 50, 50) and a.contentBBox() == scene(legend).contentBBox()
+
+        # Arguments that differ in attribs or text spans are other pictures.
+        assert draw(again(1, ["a"], attrib=Attrib(fill="red"))) != \
+            draw(again(1, ["a"], attrib=Attrib(fill="blue")))
+        assert draw(again(1, ["a" + TextSpan("x", fill="red")])) != \
+            draw(again(1, ["a" + TextSpan("x", fill="blue")]))
+
+        small = asvgCached(legend, directory=directory, maxBytes=1)
+        draw(small(1, ["z"]))
+        assert len(os.listdir(directory)) <= 1
+
+        memory = asvgCached(legend, directory=None, maxEntries=2)
+        assert draw(scene(memory)) == expected
+        assert len(memory.cache.memory) == 2
+        memory.cache.clear()
+        assert not memory.cache.memory
+        assert asvgCached(legend).cache.directory is None
+
+        # Lambdas and closures of the same name are keyed by what they do.
+        def scaled(k):
+            return lambda x: x * k
+        assert canonical(scaled(2)) != canonical(scaled(3))
+        assert canonical(scaled(2)) == canonical(scaled(2))
+        assert canonical(lambda x: x + 1) != canonical(lambda x: x - 1)
+        assert canonical(Attrib(x=1).get) != canonical(Attrib(x=2).get)
+        assert canonical(len) == canonical(len)
+    finally:
+        shutil.rmtree(directory)
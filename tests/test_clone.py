@@ -0,0 +1,43 @@
+from ASVG import *
+
+a = Axis((100, 100))
+r = rect(a, 0, 0, 0, 10, 10, fill="red")
+outer = ComposedElement((50, 50), 1)
+inner = ComposedElement((20, 20), 0)
+c = circle(inner, 0, 1, 1, 1, fill="green")
+outer.addElement(inner, (5, 5))
+a.addElement(outer, (50, 0))
+base = draw(a, cache=True)
+
+b = a.clone()
+assert draw(b, cache=True) == base
+e = b.own(c)
+assert e is not c and b.own(c) is e
+e.attrib.fill = "black"
+assert draw(b, cache=True) == base.replace("green", "black")
+assert draw(a, cache=True) == base
+# Only the path to the changed element is copied.
+assert list(b.elements)[0] is r and list(b.elements)[1] is not outer
+assert list(list(b.elements)[1].axis.elements)[0] is not inner
+
+a.own(r).attrib.fill = "yellow"
+assert "yellow" in draw(a) and "yellow" not in draw(b)
+
+d = b.clone()
+d.own(c).attrib.fill = "white"
+rect(d, 2, 1, 1, 1, 1, fill="pink")
+assert "white" in draw(d) and "pink" in draw(d)
+assert "black" in draw(b) and "pink" not in draw(b)
+
+moved = outer.clone()
+a.addElement(moved, (0, 50))
+assert draw(a).count('fill="green"') == 2
+
+columns = Axis((100, 100), columnar=True)
+rows = [rect(columns, 0, i, i, 1, 1, fill="red") for i in range(5)]
+s = draw(columns)
+copy = columns.clone()
+rect(copy, 0, 9, 9, 1, 1, fill="red")
+copy.own(rows[0].table).setValue(0, "fill", "blue")
+assert draw(columns) == s
+assert draw(copy).count("<rect") == 6 and 'fill="blue"' in draw(copy)
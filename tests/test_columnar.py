@@ -0,0 +1,78 @@
+from ASVG import *
+
+style = Attrib(fill="red")
+
+
+def scene(columnar):
+    a = Axis((100, 100), columnar=columnar)
+    rs = [rect(a, 0, i, i + 0.5, 5, 5, attrib=style) for i in range(3)]
+    c = circle(a, 0, 1.5, 2.5, 3)
+    rect(a, 0, 9, 9, 5, 5, attrib=style)
+    text(a, 1, "hi", 1, 2, 10)
+    rect(a, 1, 9, 9, 5, 5, fill="blue")
+    return a, rs, c
+
+
+a, rs, c = scene(True)
+b, rbs, cb = scene(False)
+assert draw(a) == draw(b)
+assert draw(a, minify=True, precision=1, styles=True) == draw(b, minify=True, precision=1, styles=True)
+assert len(a.elements) == 5
+
+rs[1].attrib.fill = "blue"
+rbs[1].attrib.fill = "blue"
+rs[2].attrib.y = 7
+rbs[2].attrib.y = 7
+assert rs[2].attrib.y == 7
+assert draw(a, cache=True) == draw(b)
+
+rs[2].attrib.stroke = "black"
+rbs[2].attrib.stroke = "black"
+del rs[0].attrib.fill
+del rbs[0].attrib.fill
+assert draw(a, cache=True) == draw(b)
+
+c.level = 2
+cb.level = 2
+assert draw(a) == draw(b)
+
+rs[1].remove()
+b.removeElement(rbs[1])
+assert draw(a) == draw(b)
+
+# Rows that change level keep the order they were added in, like elements.
+# Rows added after an element of another level are ordered after it too.
+def interleaved(columnar):
+    a = Axis((100, 100), columnar=columnar)
+    rs = [rect(a, 0, i, i, 5, 5, attrib=style) for i in range(3)]
+    rect(a, 1, 9, 9, 5, 5, fill="blue")
+    rs += [rect(a, 0, i, i, 5, 5, attrib=style) for i in range(3, 6)]
+    rs.append(rect(a, 1, 8, 8, 5, 5, fill="blue"))
+    return a, rs
+
+
+a2, rs = interleaved(True)
+b2, rbs = interleaved(False)
+for i in (4, 1, 2, 5):
+    rs[i].level = 1
+    rbs[i].level = 1
+    assert draw(a2) == draw(b2)
+rect(a2, 1, 7, 7, 5, 5, attrib=style)
+rect(b2, 1, 7, 7, 5, 5, attrib=style)
+rs[0].level = 1
+rbs[0].level = 1
+assert draw(a2) == draw(b2)
+rs[2].level = 0
+rbs[2].level = 0
+assert draw(a2) == draw(b2)
+
+# A row moved to make room keeps its handle.
+rs[6].attrib.fill = "green"
+rbs[6].attrib.fill = "green"
+assert draw(a2) == draw(b2)
+for i in (3, 2):
+    rs[i].level = 2
+    rbs[i].level = 2
+assert draw(a2) == draw(b2) and rs[2].level == 2
+
+draw(a, "test.svg")
@@ -0,0 +1,46 @@
+from ASVG import *
+
+a = Axis((1000, 1000), viewBox=(0, 0, 200, 200))
+near = circle(a, 0, 100, 100, 10, fill="red")
+far = circle(a, 0, 900, 900, 10, fill="blue")
+edge = rect(a, 0, 203, 50, 10, 10, stroke="black", stroke_width=4)
+moved = rect(a, 0, 500, 500, 10, 10, transform="translate(-400 -400)")
+label = text(a, 0, "a long label", 230, 100, 10, anchor="end")
+
+e = ComposedElement((300, 300), 1)
+inside = circle(e, 0, 10, 10, 5, fill="green")
+outside = circle(e, 0, 250, 250, 5, fill="yellow")
+a.addElement(e, (150, 150))
+hidden = labeledCircle(1, 20, "X", 20)
+a.addElement(hidden, (600, 600))
+
+s = draw(a, cull=True)
+assert 'fill="red"' in s
+assert 'fill="blue"' not in s
+assert 'x="203"' in s
+assert 'translate(-400 -400)' in s
+assert "a long label" in s
+assert 'fill="green"' in s
+assert 'fill="yellow"' not in s
+assert ">\nX\n" not in s
+assert len(s) < len(draw(a))
+
+region = draw(a, cull=(800, 800, 1000, 1000))
+assert 'fill="blue"' in region and 'fill="red"' not in region
+
+assert draw(a, cull=(0, 0, 1000, 1000)) == draw(a)
+draw(a, "test.svg", cull=True)
+
+# The viewBox is letterboxed when the aspect ratios differ: x from -100 to
+# 300 is shown here.
+wide = Axis((1000, 500), viewBox=(0, 0, 200, 200))
+circle(wide, 0, 250, 100, 10, fill="red")
+circle(wide, 0, -80, 100, 10, fill="green")
+circle(wide, 0, 350, 100, 10, fill="blue")
+s = draw(wide, cull=True)
+assert 'fill="red"' in s and 'fill="green"' in s and 'fill="blue"' not in s
+wide.attrib.preserveAspectRatio = "xMinYMin meet"
+s = draw(wide, cull=True)
+assert 'fill="red"' in s and 'fill="green"' not in s
+wide.attrib.preserveAspectRatio = "none"
+assert 'fill="red"' not in draw(wide, cull=True)
@@ -0,0 +1,37 @@
+import re
+
+from ASVG import *
+
+a = Axis((300, 200))
+for i in range(3):
+    a.addElement(labeledCircle(1, 20, "PE", 20, circleAttrib=Attrib(fill="white")), (i * 50, 10))
+for i in range(2):
+    outer = ComposedElement((100, 60), 2, Attrib(opacity=0.5))
+    outer.addElement(labeledCircle(1, 20, "PE", 20, circleAttrib=Attrib(fill="white")), (1, 2))
+    a.addElement(outer, (i * 150, 100))
+a.addElement(labeledCircle(1, 20, "X", 20), (200, 10))
+
+s = draw(a, dedup=True)
+assert s.count("<symbol") == 2
+assert s.count("<use") == 6
+symbolId = re.search(r'<use xlink:href="#(asvg-s[0-9a-f]{8})" x="50" y="10" />', s).group(1)
+assert f'<symbol id="{symbolId}"' in s
+assert s.count("X\n") == 1
+assert 'xmlns:xlink="http://www.w3.org/1999/xlink"' in s.split("\n")[0]
+assert len(s) < len(draw(a))
+
+# Pictures inlined in one page only share ids for the same content.
+c = Axis((300, 200))
+for i in range(2):
+    c.addElement(labeledCircle(1, 20, "PE", 20, circleAttrib=Attrib(fill="white")), (i * 50, 10))
+assert symbolId in draw(c, dedup=True)
+d = Axis((300, 200))
+for i in range(2):
+    d.addElement(labeledCircle(1, 20, "Q", 20), (i * 50, 10))
+assert symbolId not in draw(d, dedup=True)
+
+b = Axis((100, 100))
+b.addElement(labeledCircle(1, 20, "PE", 20), (0, 0))
+assert draw(b, dedup=True) == draw(b)
+
+draw(a, "test.svg", dedup=True)
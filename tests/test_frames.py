@@ -0,0 +1,53 @@
+import gzip
+import os
+
+from ASVG import *
+from ASVG.frames import WINDOW
+
+
+def frame(t):
+    a = Axis((200, 200))
+    circle(a, 0, 100, 100, 10 + t, fill='red')
+    rect(a, 1, t, t, 20, 20, fill='blue')
+    return a
+
+
+if __name__ == "__main__":
+    params = list(range(8))
+    timings = renderFrames(frame, params, "frame_{:02d}.svg", workers=2)
+    assert [t.index for t in timings] == params
+    for t in timings:
+        with open(t.file, encoding="utf-8") as fin:
+            assert fin.read() == draw(frame(t.index))
+        os.remove(t.file)
+
+    # Frames are drawn a few per worker ahead of the one written.
+    drawn = []
+
+    def counted(n):
+        for i in range(n):
+            drawn.append(i)
+            yield i
+
+    ahead = []
+    timings = renderFrames(frame, counted(40), "frame_{:02d}.svg", workers=2,
+                           onFrame=lambda t: ahead.append(len(drawn) - t.index))
+    assert [t.index for t in timings] == list(range(40))
+    assert max(ahead) <= 2 * WINDOW + 1
+    for t in timings:
+        os.remove(t.file)
+
+    timings = renderFrames(frame, params[:2], "frame_{:02d}.svg", workers=1)
+    for t in timings:
+        os.remove(t.file)
+
+    # Frames are written like the painter writes a file.
+    for workers in (1, 2):
+        for pattern, painter, compressed in (("frame_{:02d}.svgz", None, True),
+                                             ("frame_{:02d}.svg", DefaultPainter(compress=True), True),
+                                             ("frame_{:02d}.svg", StreamingPainter(chunkSize=64), False)):
+            timings = renderFrames(frame, params[:3], pattern, workers=workers, painter=painter)
+            for t in timings:
+                with (gzip.open if compressed else open)(t.file, "rt", encoding="utf-8") as fin:
+                    assert fin.read() == draw(frame(t.index))
+                os.remove(t.file)
@@ -0,0 +1,49 @@
+from ASVG import *
+from ASVG.core import LevelBuckets
+
+
+def names(a):
+    return [e.attrib.id for e in a.elements]
+
+
+a = Axis((100, 100))
+r = {}
+for name, level in [("a", 1), ("b", 0), ("c", 1), ("d", 2), ("e", 0)]:
+    r[name] = rect(a, level, 0, 0, 1, 1, id=name)
+
+# Levels first, then the order of adding.
+assert names(a) == ["b", "e", "a", "c", "d"]
+assert a.elements[0] is r["b"] and a.elements[-1] is r["d"] and len(a.elements) == 5
+assert [e.attrib.id for e in a.elements[1:3]] == ["e", "a"]
+try:
+    a.elements[5]
+    assert False
+except IndexError:
+    pass
+
+# A changed level keeps the element's place among the others added.
+r["d"].level = 1
+assert names(a) == ["b", "e", "a", "c", "d"]
+r["a"].level = 0
+assert names(a) == ["a", "b", "e", "c", "d"]
+r["e"].level = 3
+assert names(a) == ["a", "b", "c", "d", "e"]
+
+a.removeElement(r["c"])
+assert names(a) == ["a", "b", "d", "e"] and r["c"] not in a.elements
+
+# Adding an element again moves it to the end of its level.
+a.addElement(r["a"])
+assert names(a) == ["b", "a", "d", "e"]
+
+buckets = LevelBuckets()
+for e in a.elements:
+    buckets.append(e)
+new = rect(Axis((1, 1)), 0, 0, 0, 1, 1, id="x")
+buckets.replace(r["a"], new)
+assert [e.attrib.id for e in buckets] == ["b", "x", "d", "e"]
+copy = buckets.copy()
+copy.remove(new)
+assert len(buckets) == 4 and [e.attrib.id for e in copy] == ["b", "d", "e"]
+assert buckets.ordered([r["e"], new, r["b"]]) == [r["b"], new, r["e"]]
+assert buckets.last(0) is new and buckets.last(7) is None
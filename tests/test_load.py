@@ -0,0 +1,80 @@
+import gzip
+import io
+import os
+import shutil
+
+from ASVG import *
+from ASVG.load import Group, RawElement
+
+FOREIGN = b"""<?xml version="1.0"?>
+<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" viewBox="0 0 200 100">
+  <style>.a { fill: #FF0000 }</style>
+  <defs><linearGradient id="g"><stop offset="0" stop-color="red"/></linearGradient></defs>
+  <!-- <rect fill="#ff0000"/> -->
+  <g id="layer" fill="url(#g)">
+    <rect class="a" x="0" y="0" width="10" height="10" style="fill:#ff0000;stroke-width:2"/>
+    <use xlink:href="#g" x="3"/>
+  </g>
+  <text x="1" y="60" font-size="10px">Hello <tspan font-weight="bold">big</tspan> world</text>
+</svg>
+"""
+
+
+if __name__ == "__main__":
+    a = Axis((100, 100))
+    rect(a, 0, 1, 2, 3, 4, fill="red")
+    circle(a, 1, 5, 5, 2, stroke="blue")
+    path(a, 1, PathD.fromCommands("M 0 0 L 10 10"))
+    ce = ComposedElement((50, 50), 2)
+    a.addElement(ce, (10, 10))
+    polygon(ce, 0, [(0, 0), (1, 0), (1, 1)])
+    text(a, 3, "hi" + TextSpan("!", fill="red"), 5, 5, 12)
+    s = draw(a)
+    b = load(io.BytesIO(s.encode("utf-8")))
+    assert draw(b) == s
+    small = draw(a, minify=True)
+    assert draw(load(io.BytesIO(small.encode("utf-8"))), minify=True) == small
+    assert [type(e).__name__ for e in b.elements] == \
+        ["BasicElement", "BasicElement", "BasicElement", "ComposedElement", "Text"]
+    assert b.size == (100, 100) and b.contentBBox() == a.contentBBox()
+
+    draw(a, "test_load.svgz")
+    assert draw(load("test_load.svgz")) == s
+    os.remove("test_load.svgz")
+
+    b = load(io.BytesIO(FOREIGN))
+    kinds = [type(e) for e in b.elements]
+    assert kinds == [RawElement, RawElement, Group, Text]
+    assert b.size == (200.0, 100.0)
+    group = list(b.elements)[2]
+    use = group.axis.elements.last(0)
+    assert group.attrib.id == "layer" and use.SVGType == "use" and use.attrib.get("xlink:href") == "#g"
+    s = draw(b, minify=True)
+    assert 'xmlns:xlink="http://www.w3.org/1999/xlink"' in s and "<!--" not in s
+    assert '<text x="1" y="60" font-size="10">Hello <tspan font-weight="bold">big </tspan> world</text>' in s
+
+    os.makedirs("test_restyle/sub", exist_ok=True)
+    with open("test_restyle/a.svg", "wb") as fout:
+        fout.write(FOREIGN)
+    with gzip.open("test_restyle/sub/b.svgz", "wb") as fout:
+        fout.write(FOREIGN)
+    with open("test_restyle/c.svg", "wb") as fout:
+        fout.write(b'<svg xmlns="http://www.w3.org/2000/svg"><rect fill="green"/></svg>')
+    counts = restyle("test_restyle", {"fill": {"#ff0000": "#d62728"}, "stop_color": {"red": "orange"}},
+                     workers=2, out="test_restyled")
+    assert counts == {os.path.join("test_restyle", "a.svg"): 3,
+                      os.path.join("test_restyle", "sub", "b.svgz"): 3}
+    with open("test_restyled/a.svg", "rb") as fin:
+        restyled = fin.read()
+    assert restyled == FOREIGN.replace(b"{ fill: #FF0000", b"{ fill: #d62728") \
+        .replace(b"fill:#ff0000", b"fill:#d62728").replace(b'stop-color="red"', b'stop-color="orange"')
+    with gzip.open("test_restyled/sub/b.svgz", "rb") as fin:
+        assert fin.read() == restyled
+    assert os.path.exists("test_restyled/c.svg")
+
+    assert restyle("test_restyle/a.svg", {"font_weight": "normal"}, workers=1) == \
+        {"test_restyle/a.svg": 1}
+    with open("test_restyle/a.svg", "rb") as fin:
+        assert b'font-weight="normal"' in fin.read()
+    shutil.rmtree("test_restyle")
+    shutil.rmtree("test_restyled")
@@ -0,0 +1,40 @@
+import gzip
+import io
+import os
+import shutil
+import tempfile
+
+from ASVG import *
+
+a = Axis((500, 300))
+polyArrow(a, 0, [(10, 10), (10, 30), (50, 30), (50, 100)], stroke="black")
+arrow(a, 1, 100.25, 100, 10, 200, tipFilled=False, stroke="blue")
+text(a, 2, "a" + TextSpan("b", fill="red"), 10, 10, 12)
+circles(a, 3, [0.5, 1.0], [2.123456, 3], 1, fill="red")
+
+s = draw(a, minify=True, precision=2)
+assert "\n" not in s
+assert "  " not in s
+assert 'x2="90.74"' in s
+assert 'points="50 100,55 91.34,45 91.34"' in s
+assert 'cx=".5" cy="2.12"' in s
+assert len(s) < len(draw(a))
+
+directory = tempfile.mkdtemp()
+try:
+    name = os.path.join(directory, "test.svgz")
+    draw(a, name, stream=True, minify=True, precision=2)
+    with gzip.open(name, "rt", encoding="utf-8") as fin:
+        assert fin.read() == s
+finally:
+    shutil.rmtree(directory)
+
+buf = io.BytesIO()
+draw(a, buf, compress=True)
+assert gzip.decompress(buf.getvalue()).decode("utf-8") == draw(a)
+
+try:
+    draw(a, painter=DefaultPainter(), minify=True)
+    assert False, "options next to a painter would be ignored"
+except TypeError:
+    pass
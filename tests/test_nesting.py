@@ -0,0 +1,88 @@
+import sys
+from html import escape
+
+from ASVG import *
+from ASVG.core import INDENT
+
+# The output of the recursive makeSVG this library used to have.
+EXPECTED = """<svg xmlns="http://www.w3.org/2000/svg" width="200" height="100" viewBox="0 0 400 200">
+  <circle cx="5" cy="5" r="3" stroke="black" />
+  <rect x="0" y="0" width="10" height="20" rx="0.0" ry="0.0" fill="red" />
+  <svg width="50" height="50" x="20" y="30">
+  <g opacity="0.5">
+    <line x1="0" y1="0" x2="10" y2="10" stroke="blue" />
+    <svg width="20" height="20" x="5" y="5">
+      <polygon points="0 0, 5 5, 0 5" />
+    </svg>
+  </g>
+  </svg>
+  <text x="50" y="50" font-size="12" font-family="Arial" text-anchor="middle">
+a &lt; b
+    <tspan font-weight="bold">
+!
+    </tspan>
+  </text>
+</svg>"""
+
+
+def scene():
+    a = Axis((200, 100), viewBox=(0, 0, 400, 200))
+    rect(a, 1, 0, 0, 10, 20, fill="red")
+    circle(a, 0, 5, 5, 3, stroke="black")
+    c = ComposedElement((50, 50), 2, Attrib(opacity=0.5))
+    line(c, 0, 0, 0, 10, 10, stroke="blue")
+    inner = ComposedElement((20, 20), 1)
+    polygon(inner, 0, [(0, 0), (5, 5), (0, 5)])
+    c.addElement(inner, (5, 5))
+    a.addElement(c, (20, 30))
+    text(a, 3, "a < b" + TextSpan("!", font_weight="bold"), 50, 50, 12)
+    return a
+
+
+def recursive(maker, indent=0):
+    # A recursive walk of the same tree, as makeSVG did it.
+    if isinstance(maker, str):
+        return [escape(maker)]
+    tag = maker.svgTag()
+    if tag is not None and maker.svgLeaf:
+        return [" " * indent + f"<{tag[0]} {tag[1]} />"]
+    lines = []
+    inner = indent
+    if tag is not None:
+        opening = f"<{tag[0]} {tag[1]}>" if tag[1] is not None and len(tag[1]) else f"<{tag[0]}>"
+        lines.append(" " * indent + opening)
+        if maker.svgIndentChildren:
+            inner += INDENT
+    for child in maker.svgChildren():
+        lines.extend(recursive(child, inner))
+    if tag is not None:
+        lines.append(" " * indent + f"</{tag[0]}>")
+    return lines
+
+
+if __name__ == "__main__":
+    a = scene()
+    assert draw(a) == EXPECTED
+    assert draw(a) == "\n".join(recursive(a))
+    assert "".join(draw(a, stream=True, chunkSize=16)) == EXPECTED
+    assert draw(a, cache=True) == draw(a, cache=True) == EXPECTED
+
+    # Deeper than the recursion limit, which the recursive walk could not draw.
+    depth = sys.getrecursionlimit() + 100
+    root = Axis((100, 100))
+    outer = root
+    for i in range(depth):
+        e = ComposedElement((100, 100), 0)
+        circle(e, 1, 1, 1, 1)
+        outer.addElement(e)
+        outer = e
+    s = draw(root)
+    assert s.count("<circle ") == depth and s.count("</svg>") == depth + 1
+    assert s.endswith("  </svg>\n</svg>")
+    assert "".join(draw(root, stream=True)) == s
+    assert draw(root, cache=True) == s
+    try:
+        recursive(root)
+        assert False
+    except RecursionError:
+        pass
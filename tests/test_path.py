@@ -0,0 +1,67 @@
+from array import array
+
+import numpy as np
+
+from ASVG import *
+from ASVG.basicElements import trimNumbers
+
+# Commands are kept as one opcode byte each and a flat array of doubles.
+d = PathD()
+d.moveTo(0, 0)
+d.lineTo(10, 10)
+d.hlineFor(5)
+d.close()
+assert isinstance(d.ops, bytearray) and d.ops == bytearray(b"MLh")
+assert isinstance(d.coords, array) and d.coords.typecode == "d"
+assert d.coords.tolist() == [0, 0, 10, 10, 5]
+assert str(d) == "M 0 0 L 10 10 h 5 Z" and len(d) == 3
+d.open()
+assert str(d) == "M 0 0 L 10 10 h 5"
+
+# Strings are parsed, a repeated command without a letter repeats the last one.
+p = PathD.fromCommands("M 0 0 L 10 10 20 5 h 5 Z")
+assert p.ops == bytearray(b"MLLhZ")
+assert p.commands == ["M 0 0", "L 10 10", "L 20 5", "h 5", "Z"]
+assert str(PathD.fromCommands(["M80,80", "h90", "z"])) == "M 80 80 h 90 z"
+assert str(PathD(commands=["M 1 2"], precision=1)) == "M 1 2"
+try:
+    PathD.fromCommands("M 0 0 L 10")
+    assert False, "an odd number of L coordinates is invalid"
+except ValueError:
+    pass
+try:
+    PathD(["M 0 0"])
+    assert False, "commands can only be given by keyword"
+except TypeError:
+    pass
+
+# Many segments at once, from pairs or an N x 2 array.
+q = PathD()
+q.moveTo(0, 0)
+q.lineToMany([(1, 2), (3, 4)])
+q.lineToMany(np.array([[5, 6], [7, 8]], dtype=np.int32))
+q.lineForMany(np.array([[1.5, -0.5]]))
+assert q.ops == bytearray(b"MLLLLl")
+assert q.coords.tolist() == [0, 0, 1, 2, 3, 4, 5, 6, 7, 8, 1.5, -0.5]
+assert str(q) == "M 0 0 L 1 2 L 3 4 L 5 6 L 7 8 l 1.5 -0.5"
+try:
+    q.lineToMany(np.arange(3.0))
+    assert False, "coordinates must come in pairs"
+except ValueError:
+    pass
+
+# Precision rounds when formatted, and trailing zeros are trimmed.
+r = PathD(precision=2)
+r.moveTo(0, 0)
+r.lineToMany(np.array([[1 / 3, 2 / 3], [1.5, -0.001]]))
+assert str(r) == "M 0 0 L 0.33 0.67 L 1.5 0"
+assert r.format(4) == "M 0 0 L 0.3333 0.6667 L 1.5 -0.001"
+assert trimNumbers("1.50 2.00 -0.00", 2) == "1.5 2 0"
+assert trimNumbers("1.0 2.5", None) == "1 2.5"
+assert r.bounds() == (0, -0.001, 1.5, 2 / 3)
+
+# path() writes the d attribute, with the precision of draw() over the path's.
+a = Axis((10, 10))
+path(a, 0, r, fill="none")
+assert '<path d="M 0 0 L 0.33 0.67 L 1.5 0" fill="none" />' in draw(a)
+assert '<path d="M 0 0 L 0.3 0.7 L 1.5 0" fill="none"/>' in draw(a, precision=1, minify=True)
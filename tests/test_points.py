@@ -0,0 +1,82 @@
+from array import array
+
+import numpy as np
+
+from ASVG import *
+
+pairs = [(0, 0), (10, 5.5), (20, 0.25), (30, -0.5)]
+a = Axis((100, 100))
+polyline(a, 0, pairs, stroke="black")
+b = Axis((100, 100))
+polyline(b, 0, np.array(pairs), stroke="black")
+c = Axis((100, 100))
+polyline(c, 0, array("d", [v for p in pairs for v in p]), stroke="black")
+
+# Pairs are written as given, arrays as doubles, in the same format.
+assert 'points="0 0, 10 5.5, 20 0.25, 30 -0.5"' in draw(a)
+assert 'points="0.0 0.0, 10.0 5.5, 20.0 0.25, 30.0 -0.5"' in draw(b)
+for minify, precision in ((True, None), (False, 1), (True, 1)):
+    expected = draw(a, minify=minify, precision=precision)
+    assert draw(b, minify=minify, precision=precision) == expected
+    assert draw(c, minify=minify, precision=precision) == expected
+assert 'points="0 0,10 5.5,20 .25,30 -.5"' in draw(a, minify=True)
+assert 'points="0 0, 10 5.5, 20 0.2, 30 -0.5"' in draw(a, precision=1)
+assert a.contentBBox() == b.contentBBox()
+
+p = Points(np.arange(6).reshape(3, 2))
+assert str(p) == "0 1, 2 3, 4 5" and len(p) == 3 and p[-1] == (4, 5)
+
+# Decimation keeps the ends and every extreme of a long series.
+t = np.linspace(0, 100, 1000000)
+y = np.sin(t) * 40 + 50
+y[123457] = 99
+y[654321] = 1
+xy = np.column_stack([t, y])
+d = Axis((100, 100))
+line = polyline(d, 0, xy, decimate="minmax")
+kept = np.asarray(line.attrib.points.coords).reshape(-1, 2)
+assert len(kept) <= 400 and kept.min(axis=0).tolist() == [0, 1]
+assert kept.max(axis=0).tolist() == [100, 99]
+assert (np.diff(kept[:, 0]) >= 0).all()
+
+e = Axis((100, 100), viewBox=(0, 0, 10, 10))
+line = polyline(e, 0, xy, decimate="lttb")
+assert len(line.attrib.points) == 2 * 1001
+line = polyline(d, 0, xy, decimate="lttb")
+assert len(line.attrib.points) == 2 * 101
+assert line.attrib.points[0] == (0, y[0]) and line.attrib.points[-1] == (100, y[-1])
+
+polyArrow(d, 1, xy, decimate="minmax", stroke="black")
+try:
+    polyline(d, 0, xy[::-1], decimate="minmax")
+    assert False
+except ValueError:
+    pass
+
+# float32 values are written as they were given, not as their doubles.
+f = Axis((10, 10))
+polyline(f, 0, np.array([[0.1, 0.2], [1.5, 2]], dtype=np.float32))
+assert 'points="0.1 0.2, 1.5 2.0"' in draw(f)
+v = (np.random.default_rng(1).standard_normal(20000) * 1e3).astype(np.float32)
+assert (np.asarray(Points(v).coords).astype(np.float32) == v).all()
+assert Points(np.array([3.3, 1e-7, 0, -250.75], dtype=np.float32)).coords.tolist() == [3.3, 1e-7, 0, -250.75]
+
+# Short lists of pairs are written at once, longer ones are kept as Points.
+g = Axis((100, 100))
+assert polyline(g, 0, pairs).attrib.points == "0 0, 10 5.5, 20 0.25, 30 -0.5"
+assert isinstance(polyline(g, 0, pairs * 20).attrib.points, Points)
+
+try:
+    Points(np.array([[True, False]]))
+    assert False
+except TypeError:
+    pass
+
+# On a columnar axis the arrow tip is found as well.
+g = Axis((100, 100), columnar=True)
+polyArrow(g, 0, [(0, 0), (50, 50), (90, 10)], stroke="black")
+polyArrow(g, 0, xy, decimate="minmax", stroke="black")
+h = Axis((100, 100))
+polyArrow(h, 0, [(0, 0), (50, 50), (90, 10)], stroke="black")
+polyArrow(h, 0, xy, decimate="minmax", stroke="black")
+assert draw(g) == draw(h)
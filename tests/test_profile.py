@@ -0,0 +1,28 @@
+from ASVG import *
+
+a = Axis((100, 100))
+for i in range(10):
+    rect(a, 0, i, i, 1, 1, fill="red")
+    circle(a, 1, i, i, 1)
+ce = ComposedElement((50, 50), 2)
+a.addElement(ce, (10, 10))
+path(ce, 0, PathD.fromCommands("M 0 0 L 10 10"))
+text(ce, 1, "hi" + TextSpan("!", fill="red"), 5, 5, 12)
+circles(a, 3, [1, 2, 3], [4, 5, 6], 1)
+
+profile = Profile()
+s = draw(a, profile=profile)
+assert s == draw(a)
+assert profile.byType["rect"].count == 10 and profile.byType["circle"].count == 10
+assert profile.byType["BatchElement:circle"].count == 3
+assert profile.subtrees["svg"].count == sum(stats.count for stats in profile.byType.values())
+assert profile.subtrees["svg;svg[0]"].count >= 3
+assert abs(profile.subtrees["svg"].bytes - len(s)) <= 1
+for line in profile.folded("bytes").splitlines():
+    assert int(line.rsplit(" ", 1)[1]) > 0
+assert "rect" in profile.report()
+
+draw(a, profile=profile)
+assert profile.byType["rect"].count == 20
+profile.clear()
+assert not profile.byType
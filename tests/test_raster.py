@@ -0,0 +1,52 @@
+import io
+import os
+
+from ASVG import *
+from ASVG.raster import RasterPainter, encodeGIF, writeGIF
+
+
+def frame(t):
+    a = Axis((40, 20))
+    rect(a, 0, t, 0, 10, 10, fill="red")
+    return a
+
+
+if __name__ == "__main__":
+    a = Axis((100, 50))
+    rect(a, 0, 0, 0, 50, 50, fill="#0000ff")
+    circle(a, 1, 75, 25, 10, fill="red", stroke="black", stroke_width=2)
+    line(a, 1, 0, 45, 100, 45, stroke="lime", stroke_width=4)
+    ce = ComposedElement((20, 20), 1)
+    a.addElement(ce, (10, 10))
+    rect(ce, 0, 10, 10, 40, 40, fill="white")
+    circles(a, 2, [5, 95], [5, 5], 3, fill="yellow")
+
+    image = RasterPainter()(a)
+    assert image.shape == (50, 100, 4)
+    assert tuple(image[5, 30]) == (0, 0, 255, 255)
+    assert tuple(image[25, 75]) == (255, 0, 0, 255)
+    assert tuple(image[25, 84]) == (0, 0, 0, 255)
+    assert tuple(image[45, 60]) == (0, 255, 0, 255)
+    assert tuple(image[25, 25]) == (255, 255, 255, 255)
+    assert tuple(image[35, 35]) == (0, 0, 255, 255)
+    assert tuple(image[5, 95]) == (255, 255, 0, 255)
+    assert image[0, 99, 3] == 0
+    assert ((image[:, 50:, 3] > 0) & (image[:, 50:, 3] < 255)).any()
+
+    big = RasterPainter(scale=2, background="white")(a)
+    assert big.shape == (100, 200, 4) and tuple(big[0, 199]) == (255, 255, 255, 255)
+
+    out = io.BytesIO()
+    draw(a, out, painter=RasterPainter())
+    assert out.getvalue().startswith(b"\x89PNG\r\n\x1a\n")
+
+    gif = encodeGIF([RasterPainter()(frame(t)) for t in range(4)], duration=50)
+    assert gif.startswith(b"GIF89a") and gif.endswith(b"\x3B") and b"NETSCAPE2.0" in gif
+    writeGIF("test.gif", [image])
+    os.remove("test.gif")
+
+    timings = renderFrames(frame, range(2), "frame_{:02d}.png", workers=1, painter=RasterPainter())
+    for t in timings:
+        with open(t.file, "rb") as fin:
+            assert fin.read(8) == b"\x89PNG\r\n\x1a\n"
+        os.remove(t.file)
@@ -0,0 +1,93 @@
+import base64
+import struct
+import zlib
+
+import numpy as np
+
+from ASVG import *
+from ASVG.raster import RasterPainter, denseSubtrees
+
+
+def heatmap(k):
+    e = ComposedElement((100, 100), 1, Attrib(opacity=0.5))
+    xs, ys = np.meshgrid(np.arange(k) * 100 / k, np.arange(k) * 100 / k)
+    v = (xs.ravel() + ys.ravel()) / 200
+    fills = ["#%02x00%02x" % (int(c * 255), 255 - int(c * 255)) for c in v]
+    rects(e, 0, xs.ravel(), ys.ravel(), 100 / k, 100 / k, fill=fills)
+    return e
+
+
+def pixels(png):
+    # The RGBA pixels of a PNG written by encodePNG, which filters no row.
+    width, height = struct.unpack(">II", png[16:24])
+    size = struct.unpack(">I", png[33:37])[0]
+    raw = np.frombuffer(zlib.decompress(png[41:41 + size]), dtype=np.uint8)
+    return raw.reshape(height, width * 4 + 1)[:, 1:].reshape(height, width, 4)
+
+
+def figure(k):
+    a = Axis((300, 120))
+    a.addElement(heatmap(k), (10, 10))
+    labeled = ComposedElement((150, 120), 1)
+    labeled.addElement(heatmap(k), (0, 0))
+    text(labeled, 2, "title", 120, 20, 10)
+    a.addElement(labeled, (120, 0))
+    circle(a, 2, 5, 5, 3, fill="red")
+    return a
+
+
+if __name__ == "__main__":
+    a = figure(20)
+    assert draw(a, raster=1000) == draw(a)
+    s = draw(a, raster=100)
+    # Both heatmaps become images, the text and the circle stay vector.
+    assert s.count("<image ") == 2 and s.count("<rect ") == 0
+    assert "<text" in s and "<circle" in s and 'xmlns:xlink="http://www.w3.org/1999/xlink"' in s
+    assert 'x="10" y="10" width="100" height="100" preserveAspectRatio="none"' in s
+    data = s.split("data:image/png;base64,")[1].split('"')[0]
+    assert base64.b64decode(data).startswith(b"\x89PNG\r\n\x1a\n")
+    assert len(denseSubtrees(a, 100)) == 2 and not denseSubtrees(a, 400)
+
+    # The output no longer grows with the data.
+    assert len(draw(figure(100), raster=100, rasterDPI=96)) < 2 * len(draw(a, raster=100, rasterDPI=96))
+    assert draw(a, raster=100, minify=True).count("<image ") == 2
+    assert draw(a, raster=100, dedup=True).count("<image ") == 2
+
+    # Fills that vary per row are painted at once, as one by one.
+    b = Axis((20, 10))
+    c = Axis((20, 10))
+    fills = ["red", "blue", "none", "#00ff00"] * 5
+    xs = np.arange(20) * 1.0
+    rects(b, 0, xs, 2, 1, 6, fill=fills)
+    for x, fill in zip(xs, fills):
+        rect(c, 0, x, 2, 1, 6, fill=fill)
+    assert (RasterPainter(scale=2)(b) == RasterPainter(scale=2)(c)).all()
+
+    # Styles inherited from the vector part are painted into the image, and
+    # the element's own attributes other than presentation are kept.
+    d = Axis((60, 60))
+    parent = ComposedElement((60, 60), 1, Attrib(fill="blue"))
+    dense = ComposedElement((40, 40), 1, Attrib(id="cells", opacity=0.5))
+    rects(dense, 0, np.arange(20) * 2.0, 0, 2, 40)
+    parent.addElement(dense, (10, 10))
+    text(parent, 2, "label", 30, 55, 5)
+    d.addElement(parent)
+    s = draw(d, raster=10, rasterDPI=96)
+    assert '<image x="10" y="10" width="40" height="40" id="cells" ' in s
+    assert "opacity" not in s.split("<image")[1]
+    data = s.split("data:image/png;base64,")[1].split('"')[0]
+    assert tuple(pixels(base64.b64decode(data))[20, 20]) == (0, 0, 255, 128)
+    assert (denseSubtrees(d, 10)[0][1]) == {"fill": "blue"}
+
+    # Fragments cached by a vector drawing are not reused for a raster one.
+    e = Axis((60, 60))
+    outer = ComposedElement((60, 60), 1, Attrib(fill="blue"))
+    cells = ComposedElement((40, 40), 1)
+    rects(cells, 0, np.arange(20) * 2.0, 0, 2, 40)
+    outer.addElement(cells, (10, 10))
+    e.addElement(outer)
+    draw(e, cache=True)
+    assert outer._fragment is not None
+    s = draw(e, raster=10, rasterDPI=96)
+    assert s.count("<image ") == 1
+    assert draw(e, raster=10, rasterDPI=72) != s
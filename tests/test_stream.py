@@ -0,0 +1,21 @@
+import io
+
+from ASVG import *
+
+a = Axis((500, 300))
+for i in range(2000):
+    rect(a, i % 7, i % 500, i % 300, 10, 10, fill='red')
+e = labeledRect(3, 40, 20, "PE", 10, fill="blue")
+a.addElement(e, (20, 20))
+
+expected = draw(a)
+
+buf = io.StringIO()
+draw(a, buf, stream=True)
+assert buf.getvalue() == expected
+
+chunks = list(draw(a, painter=StreamingPainter(chunkSize=1024)))
+assert len(chunks) > 1
+assert "".join(chunks) == expected
+
+draw(a, "test.svg", stream=True)
@@ -0,0 +1,37 @@
+import re
+
+from ASVG import *
+
+a = Axis((300, 200))
+for i in range(3):
+    rect(a, 0, i * 50, 10, 40, 40, fill="red", stroke="black", stroke_width=2)
+rect(a, 0, 0, 100, 40, 40, fill="red", stroke="black", stroke_width=2, **{"class": "hi"})
+circle(a, 1, 150, 150, 20, fill="blue")
+circles(a, 1, [10, 20, 30], [10, 20, 30], 5, fill="red", stroke="black", stroke_width=2)
+
+s = draw(a, styles=True)
+name = re.search(r"\.(s[0-9a-f]{6}-0) ", s).group(1)
+assert f".{name} {{ fill: red; stroke: black; stroke-width: 2px }}" in s
+assert s.count("<style>") == 1
+assert f'<rect x="0" y="10" width="40" height="40" rx="0.0" ry="0.0" class="{name}" />' in s
+assert f'class="{name} hi"' in s
+assert '<circle cx="150" cy="150" r="20" fill="blue" />' in s
+assert f'<circle cx="10" cy="10" r="5" class="{name}" />' in s
+assert len(s) < len(draw(a))
+
+m = draw(a, styles=True, minify=True)
+assert f"<style>.{name}{{fill:red;stroke:black;stroke-width:2px}}</style>" in m
+
+# Pictures inlined in one page only share class names for the same rules.
+c = Axis((300, 200))
+for i in range(2):
+    rect(c, 0, i * 50, 10, 40, 40, fill="green")
+other = draw(c, styles=True)
+assert name not in other and re.search(r"\.(s[0-9a-f]{6}-0) ", other)
+assert name in draw(a.clone(), styles=True)
+
+b = Axis((100, 100))
+circle(b, 0, 50, 50, 20, fill="blue")
+assert draw(b, styles=True) == draw(b)
+
+draw(a, "test.svg", styles=True)
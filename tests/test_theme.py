@@ -0,0 +1,50 @@
+from ASVG import *
+
+
+class Dark(ASVGStyle):
+    fg = "#eeeeee"
+    bg = "#000000"
+
+
+a = Axis((100, 100))
+rect(a, 0, 0, 0, 100, 100, fill=ASVGStyle.ref("bg"))
+plain = ComposedElement((50, 50), 1)
+circle(plain, 0, 5, 5, 4, fill="blue")
+a.addElement(plain)
+themed = ComposedElement((50, 50), 1)
+circle(themed, 0, 5, 5, 4, fill=ASVGStyle.ref("emph"), stroke_width=StyleRef("width", 2))
+a.addElement(themed, (50, 0))
+circles(a, 2, [1, 2], [3, 4], 1, fill=ASVGStyle.ref("fg"))
+
+# Without a theme the defaults are written, as the constants were.
+s = draw(a)
+assert 'fill="#ffffff"' in s and 'fill="#ff0000"' in s and 'stroke-width="2"' in s
+assert draw(a, theme=ASVGStyle) == s
+
+dark = draw(a, theme=Dark)
+assert 'fill="#000000"' in dark and dark.count('fill="#eeeeee"') == 2
+assert 'fill="#ff0000"' in dark and 'rx="0.0"' in dark
+assert 'stroke-width="3"' in draw(a, theme={"width": 3})
+assert 'fill="#00ff00"' in draw(a, theme={"emph": "#00ff00"}, minify=True)
+
+# Fragments are kept per theme, and shared by all themes where no style
+# reference is resolved.
+for theme in (ASVGStyle, Dark, {"emph": "#00ff00"}):
+    assert draw(a, theme=theme, cache=True) == draw(a, theme=theme)
+    assert draw(a, theme=theme, cache=True) == draw(a, theme=theme)
+assert isinstance(themed._fragment, dict) and len(themed._fragment) == 3
+assert isinstance(plain._fragment, tuple)
+themed.attrib.opacity = 0.5
+assert themed._fragment is None
+assert 'opacity="0.5"' in draw(a, theme=Dark, cache=True)
+
+assert draw(a, theme=Dark, styles=True).count('fill="#eeeeee"') == 2
+
+b = Axis((10, 10))
+rect(b, 0, 0, 0, 10, 10, fill=StyleRef("accent"))
+assert 'fill="#123456"' in draw(b, theme={"accent": "#123456"})
+try:
+    draw(b)
+    assert False
+except KeyError:
+    pass